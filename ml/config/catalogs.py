@@ -0,0 +1,84 @@
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+CATALOGS_DIR = os.path.join(os.path.dirname(__file__), "data")
+PROTOCOLS_PATH = os.path.join(CATALOGS_DIR, "protocols.json")
+TOKENS_PATH = os.path.join(CATALOGS_DIR, "tokens.json")
+
+
+def _read_json(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_protocols() -> Dict[int, Dict[str, Dict[str, str]]]:
+    """
+    Protocol catalog {chain_id: {contract_address: {"name", "type", "key_method", ...}}},
+    read from ml/config/data/protocols.json on first use.
+    """
+    return {
+        int(chain_id): contracts
+        for chain_id, contracts in _read_json(PROTOCOLS_PATH).items()
+    }
+
+
+@lru_cache(maxsize=None)
+def load_tokens() -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    Token catalog {chain_id: {symbol: {"address", "decimals", "price"}}},
+    read from ml/config/data/tokens.json on first use.
+    """
+    return {
+        int(chain_id): tokens
+        for chain_id, tokens in _read_json(TOKENS_PATH)["tokens"].items()
+    }
+
+
+@lru_cache(maxsize=None)
+def load_default_tokens() -> List[str]:
+    return _read_json(TOKENS_PATH)["default_tokens"]
+
+
+@lru_cache(maxsize=None)
+def get_protocol_index() -> Dict[Tuple[int, str], Dict[str, str]]:
+    """
+    Flat {(chain_id, contract_address): protocol} lookup.
+    """
+    return {
+        (chain_id, address.lower()): meta
+        for chain_id, contracts in load_protocols().items()
+        for address, meta in contracts.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def get_token_index() -> Dict[Tuple[int, str], Dict[str, Any]]:
+    """
+    Flat {(chain_id, lowercased token contract): token} lookup, with the symbol included.
+    """
+    return {
+        (chain_id, info["address"].lower()): {"symbol": symbol, **info}
+        for chain_id, tokens in load_tokens().items()
+        for symbol, info in tokens.items()
+    }
+
+
+def save_tokens(tokens: Dict[int, Dict[str, Dict[str, Any]]], path: str = TOKENS_PATH):
+    """
+    Writes the token catalog back to its data file and drops the cached copies.
+    """
+    catalog = {
+        "tokens": {
+            str(chain_id): chain_tokens for chain_id, chain_tokens in tokens.items()
+        },
+        "default_tokens": load_default_tokens(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=4)
+        f.write("\n")
+    load_tokens.cache_clear()
+    load_default_tokens.cache_clear()
+    get_token_index.cache_clear()
@@ -9,4 +9,19 @@ COLLECT_RAW_DATA_DEFAULT_CONFIG = {
     "max_workers": 3,  # required
     "use_cache": False,  # required
     "eoa_max_pages": 2,  # required
+    "logs_source": "getLogs",  # optional, "getLogs" or "tokentx"
+    "balance_source": "live",  # optional, "live", "transfers" or "snapshot"
+    "balance_snapshot_ttl_days": 7,  # optional
+    "tail_poll_seconds": 60,  # optional
+    "tail_batch_size": 50,  # optional
+    "tail_api_url": None,  # optional
+    "senders_source": "txlist",  # optional, "txlist" or "events"
+    "activity_probe": False,  # optional
+    "tx_columns": None,  # optional, None keeps TX_COLUMNS
+    "collect_mode": "batch",  # optional, "batch" or "staged"
+    "decode_processes": 0,  # optional, 0 decodes in threads
+    "pipeline_queue_size": 64,  # optional
+    "dry_run": False,  # optional
+    "api_daily_quota": None,  # optional, e.g. 100000
+    "api_calls_per_second": 5,  # optional
 }
@@ -7,6 +7,13 @@ FEATURES_ENGINEERING_DEFAULT_CONFIG = {
     ],
     "active_days_threshold": 730,  # optional
     "assets_lookback_months": 12,  # optional
+    "use_balance_snapshot": False,  # optional
+    "n_jobs": 1,  # optional
+    "chunksize": None,  # optional
+    "export_csv": True,  # optional
+    "backend": "pandas",  # optional
+    "lazy_features": False,  # optional
+    "feature_cache": True,  # optional
     "max_tx_burst_intervals": {  # optional
         "hourly": 1, # 1 hour  
         "daily": 24, # 24 hours
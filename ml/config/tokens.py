@@ -1,113 +1,12 @@
-TOKENS = {
-    1: {
-        "ETH": {
-            "address": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-            "decimals": 18,
-            "price": 3790.79,
-        },
-        "USDC": {
-            "address": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
-            "decimals": 6,
-            "price": 0.999837,
-        },
-        "USDT": {
-            "address": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
-            "decimals": 6,
-            "price": 1.0,
-        },
-        "WBTC": {
-            "address": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",
-            "decimals": 8,
-            "price": 118928.0,
-        },
-        "WETH": {
-            "address": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
-            "decimals": 18,
-            "price": 3794.6,
-        },
-        "DAI": {
-            "address": "0x6B175474E89094C44Da98b954EedeAC495271d0F",
-            "decimals": 18,
-            "price": 0.999993,
-        },
-        "SHIB": {
-            "address": "0x95aD61b0a150d79219dCF64E1E6Cc01f0B64C4cE",
-            "decimals": 18,
-            "price": 1.565e-05,
-        },
-        "PEPE": {
-            "address": "0x6982508145454Ce325dDbE47a25d4ec3d2311933",
-            "decimals": 18,
-            "price": 1.436e-05,
-        },
-    },
-    8453: {
-        "DAI": {
-            "address": "0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb",
-            "decimals": 18,
-            "price": 0.999382,
-        },
-        "ETH": {
-            "address": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-            "decimals": 18,
-            "price": 3790.79,
-        },
-        "USDC": {
-            "address": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
-            "decimals": 6,
-            "price": 0.999837,
-        },
-        "WBTC": {
-            "address": "0x0555E30da8f98308EdB960aa94C0Db47230d2B9c",
-            "decimals": 8,
-            "price": 118543.0,
-        },
-        "WETH": {
-            "address": "0x4200000000000000000000000000000000000006",
-            "decimals": 18,
-            "price": 3791.84,
-        },
-    },
-    42161: {
-        "DAI": {
-            "address": "0xDA10009cBd5D07dd0CeCc66161FC93D7c9000da1",
-            "decimals": 18,
-            "price": 1.0,
-        },
-        "ETH": {
-            "address": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-            "decimals": 18,
-            "price": 3790.79,
-        },
-        "USDC": {
-            "address": "0xaf88d065e77c8cC2239327C5EDb3A432268e5831",
-            "decimals": 6,
-            "price": 0.999837,
-        },
-        "USDT": {
-            "address": "0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9",
-            "decimals": 6,
-            "price": 1.002,
-        },
-        "WBTC": {
-            "address": "0x2f2a2543B76A4166549F7aaB2e75Bef0aefC5B0f",
-            "decimals": 8,
-            "price": 119000.0,
-        },
-        "WETH": {
-            "address": "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1",
-            "decimals": 18,
-            "price": 3791.37,
-        },
-    },
-}
+# The token catalog lives in ml/config/data/tokens.json and is loaded lazily
+# by ml.config.catalogs; TOKENS and DEFAULT_TOKENS are kept importable from here
+# for compatibility.
+from ml.config.catalogs import load_default_tokens, load_tokens
 
 
-DEFAULT_TOKENS = [
-    "USDC",
-    "USDT",
-    "WETH",
-    "WBTC",
-    "DAI",
-    "ETH",
-]
+def __getattr__(name):
+    if name == "TOKENS":
+        return load_tokens()
+    if name == "DEFAULT_TOKENS":
+        return load_default_tokens()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
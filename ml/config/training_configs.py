@@ -9,6 +9,21 @@ COLLECT_RAW_DATA_CONFIG = {
     "max_workers": 3,  # optional, min:1
     "use_cache": False,  # optional
     "eoa_max_pages": 2,  # optional, default:2, fetches up to (max_pages * 100) most recent transactions for a given EOA address.
+    "logs_source": "getLogs",  # optional, "getLogs" (WETH/WBTC per contract) or "tokentx" (all TOKENS in one stream per address)
+    "balance_source": "live",  # optional, "live" (tokenbalance per token) or "transfers" (rebuilt from complete tokentx history, live fallback) or "snapshot" (left to `make balance_snapshot`)
+    "balance_snapshot_ttl_days": 7,  # optional, max age of a dormant address balance in the snapshot
+    "tail_poll_seconds": 60,  # optional, `make tail` polling interval
+    "tail_batch_size": 50,  # optional, addresses per tail micro-batch
+    "tail_api_url": None,  # optional, overrides the ENDPOINTS api_url in tail mode (e.g. a local stand-in API)
+    "senders_source": "txlist",  # optional, "txlist" (key_method on contract txs) or "events" (key_event logs, falls back to txlist); with senders_max_pages, txlist samples the newest senders and events the oldest after timestamp_threshold
+    "activity_probe": False,  # optional, skip (sender, chain) pairs without any tx since timestamp_threshold, except on based_chain_id
+    "tx_columns": None,  # optional, txlist fields stored in collected_txs_*.csv, None keeps TX_COLUMNS (no input calldata, methodId kept)
+    "collect_mode": "batch",  # optional, "batch" (Step 3 then Step 4) or "staged" (fetch/decode/balances/write overlap per sender, ignored with use_cache)
+    "decode_processes": 0,  # optional, staged mode: processes building the tx DataFrames, 0 uses a thread
+    "pipeline_queue_size": 64,  # optional, staged mode: max items buffered between stages
+    "dry_run": False,  # optional, only log the estimated API calls and wall time per chain and stage, then exit
+    "api_daily_quota": None,  # optional, max API calls per key per day, senders are capped so the run fits
+    "api_calls_per_second": 5,  # optional, API rate limit per key, used for the wall time estimate
 }
 
 FEATURES_ENGINEERING_CONFIG = {
@@ -21,6 +36,13 @@ FEATURES_ENGINEERING_CONFIG = {
     ],
     "active_days_threshold": 730,  # optional
     "assets_lookback_months": 12,  # optional
+    "use_balance_snapshot": False,  # optional, join balances from ml/data/raw/balance_snapshot.arrow
+    "n_jobs": 1,  # optional, > 1 computes per-address features in that many processes, one address-hash shard each
+    "chunksize": None,  # optional, rows per batch; set to stream the raw data into per-address aggregates out of core
+    "export_csv": True,  # optional, also write the features as CSV to ml/data/processed (the pipeline reads the Arrow files)
+    "backend": "pandas",  # optional, "duckdb" aggregates the raw data with the embedded DuckDB engine (pip install duckdb)
+    "lazy_features": False,  # optional, compute only the feature blocks the selected "features" depend on
+    "feature_cache": True,  # optional, reuse the feature blocks whose inputs, config and code are unchanged
     "max_tx_burst_intervals": {  # optional
         "hourly": 1, # 1 hour  
         "daily": 24, # 24 hours
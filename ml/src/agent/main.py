@@ -6,7 +6,7 @@ import pandas as pd
 
 def get_address_transactions(address: str) -> pd.DataFrame:
     df = pd.read_csv("ml/data/raw/collected_transactions.csv")
-    df = df.drop(columns=["input", "blockHash", "hash"])
+    df = df.drop(columns=["input", "blockHash", "hash"], errors="ignore")
 
     return df[(df["address"] == address)]
 
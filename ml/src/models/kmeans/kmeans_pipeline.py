@@ -5,8 +5,6 @@ from datetime import datetime
 
 import joblib
 import pandas as pd
-import pyarrow as pa
-import pyarrow.feather as feather
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 
@@ -21,6 +19,7 @@ from ml.src.models.kmeans.kmeans_analysis import (
     measure_performances,
     optimize_hyperparams,
 )
+from ml.src.utils.arrow_io import write_arrow
 from ml.src.utils.comparison import clusters_analysis
 from ml.src.utils.logger import get_logger_with_timestamp
 from ml.src.utils.splitting import splitting
@@ -145,8 +144,7 @@ class KMeansPipeline:
         results = pd.DataFrame({"address": self.y_all, "cluster": self.clusters})
         self.logger.info(f"Clustered {len(results)} addresses")
 
-        table = pa.Table.from_pandas(results)
-        feather.write_feather(table, self.predictions_path)
+        write_arrow(results, self.predictions_path)
         self.logger.info(f"Saved predictions to {self.predictions_path}")
 
         csv_path = self.predictions_path.replace(".arrow", ".csv")
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+from tqdm import tqdm
+
+from ml.config.endpoints import ENDPOINTS
+from ml.src.preprocessing.block_index import get_block_by_timestamp
+from ml.src.utils.json_io import decode_response, dumps, loads
+from ml.src.utils.single_flight import single_flight
+
+ACTIVITY_PROBE_CACHE_DIR = "ml/data/raw/cache/activity_probe"
+
+_inactive_lock = threading.Lock()
+
+
+def _inactive_cache_path(chain_id: int) -> str:
+    return f"{ACTIVITY_PROBE_CACHE_DIR}/inactive_{chain_id}.json"
+
+
+def load_inactive_cache(chain_id: int) -> Dict[str, Dict[str, int]]:
+    """
+    Loads the negative probe results of a chain: {address: {"start_block", "probed_at"}}.
+    """
+    path = _inactive_cache_path(chain_id)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def save_inactive_cache(chain_id: int, inactive: Dict[str, Dict[str, int]]):
+    path = _inactive_cache_path(chain_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(dumps(inactive))
+
+
+@single_flight
+def has_activity(address: str, chain_id: int, start_block: int = 0) -> bool:
+    """
+    Checks with a single 1-row txlist call whether an address has any transaction
+    on chain_id since start_block. Errors count as active so that nothing is skipped
+    because of a flaky probe.
+    """
+    params = {
+        "chainid": chain_id,
+        "module": "account",
+        "action": "txlist",
+        "address": address,
+        "startblock": start_block,
+        "endblock": 99999999,
+        "page": 1,
+        "offset": 1,
+        "sort": "desc",
+        "apikey": ENDPOINTS[chain_id]["api_key"],
+    }
+    try:
+        resp = requests.get(ENDPOINTS[chain_id]["api_url"], params=params, timeout=10)
+        resp = decode_response(resp)
+        if resp.get("status") == "1" and resp.get("result"):
+            return True
+        if resp.get("message") == "No transactions found":
+            return False
+        raise Exception(f"API error: {resp.get('message')}, {resp.get('result')}")
+    except Exception as e:
+        logging.warning(f"has_activity failed for {address} on chain {chain_id}: {e}")
+        return True
+
+
+def probe_active_senders(
+    sender_list: List[str],
+    chain_id: int,
+    timestamp_threshold: int = 0,
+    max_workers: int = 3,
+    ttl_seconds: int = 7 * 24 * 3600,
+) -> List[str]:
+    """
+    Keeps only the senders with at least one transaction on chain_id since timestamp_threshold.
+    Negative results are cached per chain and reused until they are older than ttl_seconds.
+    """
+    start_block = get_block_by_timestamp(chain_id, timestamp_threshold)
+    now = int(time.time())
+    inactive = load_inactive_cache(chain_id)
+
+    def is_cached_inactive(address):
+        entry = inactive.get(address)
+        return (
+            entry is not None
+            and entry["start_block"] <= start_block
+            and now - entry["probed_at"] < ttl_seconds
+        )
+
+    to_probe = [addr for addr in sender_list if not is_cached_inactive(addr)]
+    active_senders = []
+
+    def probe(address):
+        if has_activity(address, chain_id, start_block):
+            return True
+        with _inactive_lock:
+            inactive[address] = {"start_block": start_block, "probed_at": now}
+        return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(probe, to_probe)
+        for address, active in tqdm(
+            zip(to_probe, results), total=len(to_probe), desc="Probing activity"
+        ):
+            if active:
+                active_senders.append(address)
+
+    save_inactive_cache(chain_id, inactive)
+    logging.info(
+        f"Activity probe on chain {chain_id}: {len(active_senders)} active, "
+        f"{len(sender_list) - len(active_senders)} skipped "
+        f"({len(sender_list) - len(to_probe)} from cache)."
+    )
+
+    return active_senders
@@ -0,0 +1,81 @@
+import logging
+from typing import Dict
+
+import pandas as pd
+
+from ml.config.catalogs import load_tokens
+
+NATIVE_TOKEN_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+
+BALANCE_KEYS = ["address", "chain_id", "contract"]
+
+
+def calc_balance_history(event_logs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the running token balance after every Transfer log, per (address, chain_id, contract).
+    event_logs_df holds signed decimal amounts (negative = outgoing), as written to event_logs_*.csv.
+    """
+    columns = BALANCE_KEYS + [
+        "timestamp",
+        "tx_hash",
+        "amount",
+        "balance",
+        "balance_usd",
+    ]
+    if event_logs_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = event_logs_df.sort_values(
+        BALANCE_KEYS + ["timestamp", "block_number"], kind="stable"
+    )
+    df["balance"] = df.groupby(BALANCE_KEYS)["amount"].cumsum()
+    df["balance_usd"] = df["balance"] * df["price"]
+
+    return df[columns].reset_index(drop=True)
+
+
+def calc_latest_balances(event_logs_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Last known token balance per (address, chain_id, contract).
+    """
+    history = calc_balance_history(event_logs_df)
+    return history.groupby(BALANCE_KEYS).tail(1).reset_index(drop=True)
+
+
+def get_known_balances(
+    event_logs_df: pd.DataFrame, chain_id: int
+) -> Dict[str, Dict[str, float]]:
+    """
+    Returns {address: {contract: balance}} for the addresses whose Transfer history
+    on chain_id is complete (not truncated by pagination or a start block).
+    Tokens without any transfer are known to be 0; the native token is never included
+    since it has no Transfer logs and still needs a live balance call.
+    """
+    if event_logs_df.empty:
+        return {}
+    if "history_complete" not in event_logs_df.columns:
+        logging.warning(
+            "Event logs carry no history_complete flag (collected with getLogs?), "
+            "all balances fall back to live calls."
+        )
+        return {}
+
+    df = event_logs_df[event_logs_df["chain_id"].astype(int) == int(chain_id)]
+    df = df[df["history_complete"].fillna(False).astype(bool)]
+    if df.empty:
+        return {}
+
+    erc20_contracts = [
+        info["address"].lower()
+        for info in load_tokens().get(chain_id, {}).values()
+        if info["address"] != NATIVE_TOKEN_ADDRESS
+    ]
+    latest = calc_latest_balances(df)
+    latest["balance"] = latest["balance"].clip(lower=0)
+    balances = (
+        latest.pivot(index="address", columns="contract", values="balance")
+        .reindex(columns=erc20_contracts)
+        .fillna(0)
+    )
+
+    return balances.to_dict(orient="index")
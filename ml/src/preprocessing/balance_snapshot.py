@@ -0,0 +1,161 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pandas as pd
+from tqdm import tqdm
+
+from ml.config.catalogs import load_tokens
+from ml.src.preprocessing.balance_store import (
+    BALANCE_SNAPSHOT_PATH,
+    SNAPSHOT_COLUMNS,
+    load_balance_snapshot,
+    save_balance_snapshot,
+)
+from ml.src.preprocessing.collect_raw_data import get_balances, get_config_value
+
+
+def get_last_activity(chain_ids: List[int]) -> pd.DataFrame:
+    """
+    Latest transaction or Transfer log timestamp per (address, chain_id) in the raw store.
+    """
+    activity = []
+    for chain_id in chain_ids:
+        txs_path = f"ml/data/raw/collected_txs_{chain_id}.csv"
+        if os.path.exists(txs_path):
+            txs = pd.read_csv(txs_path, usecols=["address", "timeStamp"])
+            activity.append(
+                txs.rename(columns={"timeStamp": "timestamp"}).assign(chain_id=chain_id)
+            )
+        logs_path = f"ml/data/raw/event_logs_{chain_id}.csv"
+        if os.path.exists(logs_path):
+            try:
+                logs = pd.read_csv(logs_path, usecols=["address", "timestamp"])
+            except (pd.errors.EmptyDataError, ValueError):
+                logs = pd.DataFrame(columns=["address", "timestamp"])
+            activity.append(logs.assign(chain_id=chain_id))
+    if not activity:
+        return pd.DataFrame(columns=["address", "chain_id", "last_activity_timestamp"])
+
+    activity = pd.concat(activity, ignore_index=True)
+    activity["timestamp"] = pd.to_numeric(activity["timestamp"], errors="coerce")
+    return (
+        activity.groupby(["address", "chain_id"])["timestamp"]
+        .max()
+        .reset_index(name="last_activity_timestamp")
+    )
+
+
+def select_stale_pairs(
+    last_activity: pd.DataFrame, snapshot: pd.DataFrame, ttl_seconds: int, now: int
+) -> pd.DataFrame:
+    """
+    (address, chain_id) pairs whose snapshot is missing or lacks a token, older than
+    their last activity, or older than ttl_seconds.
+    """
+    snapshot_time = (
+        snapshot.groupby(["address", "chain_id"])
+        .agg(
+            snapshot_timestamp=("snapshot_timestamp", "min"),
+            n_tokens=("token", "nunique"),
+        )
+        .reset_index()
+    )
+    snapshot_time["chain_id"] = snapshot_time["chain_id"].astype(int)
+    pairs = last_activity.merge(snapshot_time, on=["address", "chain_id"], how="left")
+    # a missing snapshot counts as taken at epoch 0, i.e. always expired
+    snapshot_timestamp = pd.to_numeric(pairs["snapshot_timestamp"]).fillna(0)
+    # a token whose balance could never be fetched is retried on the next run
+    n_catalog_tokens = pairs["chain_id"].map(
+        lambda chain_id: len(load_tokens().get(chain_id, {}))
+    )
+    is_stale = (
+        (pairs["last_activity_timestamp"] > snapshot_timestamp)
+        | (now - snapshot_timestamp > ttl_seconds)
+        | (pairs["n_tokens"].fillna(0) < n_catalog_tokens)
+    )
+    return pairs.loc[is_stale, ["address", "chain_id"]].reset_index(drop=True)
+
+
+def refresh_balances(
+    pairs: pd.DataFrame, now: int, max_workers: int = 3
+) -> pd.DataFrame:
+    """
+    Fetches live balances for the given (address, chain_id) pairs as snapshot rows.
+    Tokens whose balance could not be fetched are left out.
+    """
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(get_balances, address, chain_id, skip_failed=True)
+            for address, chain_id in zip(pairs["address"], pairs["chain_id"])
+        ]
+        for (address, chain_id), future in zip(
+            zip(pairs["address"], pairs["chain_id"]),
+            tqdm(futures, total=len(futures), desc="Refreshing balances"),
+        ):
+            balances = future.result()
+            for symbol in load_tokens()[chain_id]:
+                if f"{symbol.lower()}_balance" not in balances:
+                    continue
+                rows.append(
+                    {
+                        "address": address,
+                        "chain_id": chain_id,
+                        "token": symbol,
+                        "balance": balances[f"{symbol.lower()}_balance"],
+                        "snapshot_timestamp": now,
+                    }
+                )
+    return pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+
+
+def update_balance_snapshot(
+    chain_ids: List[int],
+    ttl_seconds: int = 7 * 24 * 3600,
+    max_workers: int = 3,
+    path: str = BALANCE_SNAPSHOT_PATH,
+) -> pd.DataFrame:
+    """
+    Refreshes only the balances of addresses that moved funds since their last snapshot,
+    or whose snapshot expired, and keeps every other last-known balance as is. A
+    balance that fails to refresh keeps its previous row and timestamp, so its pair
+    stays stale and is retried on the next run.
+    """
+    now = int(time.time())
+    snapshot = load_balance_snapshot(path)
+    last_activity = get_last_activity(chain_ids)
+    stale_pairs = select_stale_pairs(last_activity, snapshot, ttl_seconds, now)
+    logging.info(
+        f"Refreshing balances of {len(stale_pairs)} / {len(last_activity)} (address, chain) pairs..."
+    )
+    if stale_pairs.empty:
+        return snapshot
+
+    refreshed = refresh_balances(stale_pairs, now, max_workers)
+    refreshed_keys = pd.MultiIndex.from_arrays(
+        [refreshed["address"], refreshed["chain_id"].astype(int), refreshed["token"]]
+    )
+    snapshot_keys = pd.MultiIndex.from_arrays(
+        [
+            snapshot["address"],
+            snapshot["chain_id"].astype(int),
+            snapshot["token"].astype(str),
+        ]
+    )
+    snapshot = pd.concat(
+        [snapshot[~snapshot_keys.isin(refreshed_keys)], refreshed], ignore_index=True
+    )
+    save_balance_snapshot(snapshot, path)
+
+    return snapshot
+
+
+if __name__ == "__main__":
+    chain_ids = get_config_value("chain_ids")
+    max_workers = get_config_value("max_workers")
+    ttl_days = get_config_value("balance_snapshot_ttl_days")
+
+    update_balance_snapshot(chain_ids, ttl_days * 24 * 3600, max_workers)
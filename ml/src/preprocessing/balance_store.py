@@ -0,0 +1,34 @@
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+BALANCE_SNAPSHOT_PATH = "ml/data/raw/balance_snapshot.arrow"
+
+SNAPSHOT_COLUMNS = [
+    "address",
+    "chain_id",
+    "token",
+    "balance",
+    "snapshot_timestamp",
+]
+
+
+def load_balance_snapshot(path: str = BALANCE_SNAPSHOT_PATH) -> pd.DataFrame:
+    """
+    Loads the last-known balances per (address, chain_id, token).
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    return feather.read_table(path).to_pandas()
+
+
+def save_balance_snapshot(snapshot: pd.DataFrame, path: str = BALANCE_SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    snapshot = snapshot[SNAPSHOT_COLUMNS].reset_index(drop=True)
+    snapshot["chain_id"] = snapshot["chain_id"].astype("int64")
+    snapshot["token"] = snapshot["token"].astype("category")
+    feather.write_feather(pa.Table.from_pandas(snapshot), path)
+    logging.info(f"Balance snapshot saved to {path}")
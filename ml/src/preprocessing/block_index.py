@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from typing import Dict
+
+import requests
+
+from ml.config.endpoints import ENDPOINTS
+from ml.src.utils.json_io import decode_response, dumps, loads
+
+BLOCK_INDEX_CACHE_DIR = "ml/data/raw/cache/block_index"
+
+_block_indexes: Dict[int, Dict[str, Dict[int, int]]] = {}
+_block_index_lock = threading.Lock()
+
+
+def _block_index_path(chain_id: int) -> str:
+    return f"{BLOCK_INDEX_CACHE_DIR}/block_index_{chain_id}.json"
+
+
+def load_block_index(chain_id: int) -> Dict[str, Dict[int, int]]:
+    """
+    Loads the local block-number <-> timestamp index of a chain, from memory or disk.
+    """
+    if chain_id in _block_indexes:
+        return _block_indexes[chain_id]
+
+    index = {"timestamp_to_block": {}, "block_to_timestamp": {}}
+    path = _block_index_path(chain_id)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            cached = loads(f.read())
+        for timestamp, block in cached.get("timestamp_to_block", {}).items():
+            index["timestamp_to_block"][int(timestamp)] = int(block)
+            index["block_to_timestamp"][int(block)] = int(timestamp)
+        logging.info(f"Loaded block index for chain {chain_id} from {path}")
+    _block_indexes[chain_id] = index
+
+    return index
+
+
+def save_block_index(chain_id: int):
+    index = load_block_index(chain_id)
+    path = _block_index_path(chain_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    timestamp_to_block = {str(k): v for k, v in index["timestamp_to_block"].items()}
+    with open(path, "wb") as f:
+        f.write(dumps({"timestamp_to_block": timestamp_to_block}))
+
+
+def fetch_block_by_timestamp(chain_id: int, timestamp: int) -> int:
+    """
+    Fetches the first block mined at or after the given unix timestamp.
+    """
+    params = {
+        "chainid": chain_id,
+        "module": "block",
+        "action": "getblocknobytime",
+        "timestamp": timestamp,
+        "closest": "after",
+        "apikey": ENDPOINTS[chain_id]["api_key"],
+    }
+    resp = requests.get(ENDPOINTS[chain_id]["api_url"], params=params, timeout=10)
+    resp = decode_response(resp)
+    if resp.get("status") != "1":
+        raise Exception(f"API error: {resp.get('message')}, {resp.get('result')}")
+    return int(resp["result"])
+
+
+def get_block_by_timestamp(chain_id: int, timestamp: int) -> int:
+    """
+    Translates a unix timestamp into a start block using the local index,
+    falling back to the block-by-time API (and caching the answer) on a miss.
+    Returns 0 (unbounded) when the timestamp is unset or the lookup fails.
+    """
+    if not timestamp:
+        return 0
+
+    timestamp = int(timestamp)
+    with _block_index_lock:
+        index = load_block_index(chain_id)
+        if timestamp in index["timestamp_to_block"]:
+            return index["timestamp_to_block"][timestamp]
+
+        try:
+            block = fetch_block_by_timestamp(chain_id, timestamp)
+        except Exception as e:
+            logging.warning(
+                f"get_block_by_timestamp failed for chain {chain_id} at {timestamp}: {e}"
+            )
+            return 0
+
+        index["timestamp_to_block"][timestamp] = block
+        index["block_to_timestamp"][block] = timestamp
+        save_block_index(chain_id)
+        logging.info(f"Block index for chain {chain_id}: {timestamp} -> {block}")
+
+    return block
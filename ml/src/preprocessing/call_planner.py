@@ -0,0 +1,146 @@
+import logging
+import math
+import os
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from ml.config.catalogs import load_protocols, load_tokens
+from ml.config.endpoints import ENDPOINTS
+from ml.src.preprocessing.block_index import load_block_index
+
+PLAN_COLUMNS = [
+    "chain_id",
+    "stage",
+    "fixed_calls",
+    "calls_per_sender",
+    "calls",
+]
+
+
+def _stage_row(
+    chain_id: int, stage: str, n_senders: int, fixed_calls: int, calls_per_sender: int
+) -> Dict[str, Any]:
+    return {
+        "chain_id": chain_id,
+        "stage": stage,
+        "fixed_calls": fixed_calls,
+        "calls_per_sender": calls_per_sender,
+        "calls": fixed_calls + calls_per_sender * n_senders,
+    }
+
+
+def plan_collection(config: Dict[str, Any], n_senders: int = None) -> pd.DataFrame:
+    """
+    Estimates the API calls of a collect_raw_data run, per chain and stage, from the
+    config and the local caches. Pagination counts are upper bounds (every page full),
+    so a plan that fits a quota is safe to run.
+    n_senders defaults to senders_count_threshold.
+    """
+    based_chain_id = config["based_chain_id"]
+    timestamp_threshold = config["timestamp_threshold"]
+    balance_source = config.get("balance_source", "live")
+    n_senders = config["senders_count_threshold"] if n_senders is None else n_senders
+
+    rows = []
+    for chain_id in config["chain_ids"]:
+        cached_blocks = load_block_index(chain_id)["timestamp_to_block"]
+        block_calls = 0 if timestamp_threshold in cached_blocks else 1
+        if balance_source == "transfers" and 0 not in cached_blocks:
+            block_calls += 1
+        rows.append(_stage_row(chain_id, "block_index", n_senders, block_calls, 0))
+
+        if chain_id == based_chain_id:
+            senders_cache = f"ml/data/raw/cache/senders_{config['based_protocol_type']}_{chain_id}.jsonl.gz"
+            contracts = [
+                address
+                for address, meta in load_protocols()[chain_id].items()
+                if meta.get("type") == config["based_protocol_type"]
+            ]
+            senders_calls = (
+                0
+                if config["use_cache"] and os.path.exists(senders_cache)
+                else len(contracts) * config["senders_max_pages"]
+            )
+            rows.append(_stage_row(chain_id, "senders", n_senders, senders_calls, 0))
+        elif config.get("activity_probe"):
+            rows.append(_stage_row(chain_id, "activity_probe", n_senders, 0, 1))
+
+        if config.get("logs_source", "getLogs") == "getLogs":
+            # WETH and WBTC, sent and received; pages 0..logs_max_pages
+            logs_calls = 2 * 2 * (config["logs_max_pages"] + 1)
+        else:
+            logs_calls = config["logs_max_pages"]
+        rows.append(_stage_row(chain_id, "event_logs", n_senders, 0, logs_calls))
+
+        txs_cache = f"ml/data/raw/cache/single_chain_txs_{chain_id}.jsonl.gz"
+        txs_calls = (
+            0
+            if config["use_cache"] and os.path.exists(txs_cache)
+            else config["eoa_max_pages"]
+        )
+        rows.append(_stage_row(chain_id, "transactions", n_senders, 0, txs_calls))
+
+        # with "transfers", complete histories skip the ERC-20 calls; counted anyway
+        balance_calls = (
+            0 if balance_source == "snapshot" else len(load_tokens()[chain_id])
+        )
+        rows.append(_stage_row(chain_id, "balances", n_senders, 0, balance_calls))
+
+    return pd.DataFrame(rows, columns=PLAN_COLUMNS)
+
+
+def _key_groups(chain_ids: List[int]) -> Dict[str, List[int]]:
+    """
+    Chains sharing an API key share its quota and rate limit.
+    """
+    groups = {}
+    for chain_id in chain_ids:
+        groups.setdefault(ENDPOINTS[chain_id]["api_key"], []).append(chain_id)
+    return groups
+
+
+def summarize_plan(plan: pd.DataFrame, calls_per_second: float) -> pd.DataFrame:
+    """
+    Total calls and estimated wall time per API key (labelled by its chains).
+    """
+    rows = []
+    for chain_ids in _key_groups(plan["chain_id"].unique().tolist()).values():
+        calls = int(plan.loc[plan["chain_id"].isin(chain_ids), "calls"].sum())
+        rows.append(
+            {
+                "chain_ids": ",".join(str(chain_id) for chain_id in chain_ids),
+                "calls": calls,
+                "est_seconds": round(calls / calls_per_second, 1),
+            }
+        )
+    return pd.DataFrame(rows, columns=["chain_ids", "calls", "est_seconds"])
+
+
+def fit_senders_to_quota(plan: pd.DataFrame, daily_quota: int) -> int:
+    """
+    Largest number of senders whose full run stays within daily_quota on every API key.
+    Senders are collected whole, so a capped run never stops halfway through a sender.
+    """
+    max_senders = None
+    for chain_ids in _key_groups(plan["chain_id"].unique().tolist()).values():
+        group = plan[plan["chain_id"].isin(chain_ids)]
+        fixed_calls = int(group["fixed_calls"].sum())
+        calls_per_sender = int(group["calls_per_sender"].sum())
+        if calls_per_sender == 0:
+            continue
+        fitting = max(0, math.floor((daily_quota - fixed_calls) / calls_per_sender))
+        max_senders = fitting if max_senders is None else min(max_senders, fitting)
+    return max_senders
+
+
+def log_plan(
+    plan: pd.DataFrame, calls_per_second: float, daily_quota: int = None
+) -> None:
+    logging.info(f"API call plan per chain and stage:\n{plan.to_string(index=False)}")
+    summary = summarize_plan(plan, calls_per_second)
+    logging.info(f"API call plan per API key:\n{summary.to_string(index=False)}")
+    if daily_quota:
+        max_senders = fit_senders_to_quota(plan, daily_quota)
+        if max_senders is not None:
+            logging.info(f"At most {max_senders} senders fit a quota of {daily_quota}.")
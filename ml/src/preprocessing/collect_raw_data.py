@@ -1,39 +1,95 @@
-import json
 import logging
 import os
 import random
+import sys
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List
+from functools import partial
+from typing import Any, Dict, Iterable, List, Tuple
 
 import pandas as pd
 import requests
 from tqdm import tqdm
 
+from ml.config.catalogs import (
+    get_token_index,
+    load_default_tokens,
+    load_protocols,
+    load_tokens,
+)
 from ml.config.collect_raw_data_config import COLLECT_RAW_DATA_DEFAULT_CONFIG
 from ml.config.endpoints import ENDPOINTS
-from ml.config.protocols import PROTOCOLS
-from ml.config.tokens import DEFAULT_TOKENS, TOKENS
 from ml.config.training_configs import COLLECT_RAW_DATA_CONFIG
+from ml.src.preprocessing.activity_probe import probe_active_senders
+from ml.src.preprocessing.balance_engine import (
+    calc_balance_history,
+    get_known_balances,
+)
+from ml.src.preprocessing.block_index import get_block_by_timestamp
+from ml.src.preprocessing.call_planner import (
+    fit_senders_to_quota,
+    log_plan,
+    plan_collection,
+)
+from ml.src.utils.json_io import decode_response, iter_jsonl_gz, write_jsonl_gz
+from ml.src.utils.pipeline import Stage, run_pipeline
+from ml.src.utils.single_flight import merged_calls_count, single_flight
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# txlist fields kept in collected_txs_*.csv; input (calldata), blockHash,
+# cumulativeGasUsed and confirmations are dropped at ingestion
+TX_COLUMNS = [
+    "address",
+    "chain_id",
+    "hash",
+    "blockNumber",
+    "timeStamp",
+    "nonce",
+    "transactionIndex",
+    "from",
+    "to",
+    "value",
+    "gas",
+    "gasPrice",
+    "gasUsed",
+    "isError",
+    "txreceipt_status",
+    "contractAddress",
+    "methodId",
+    "functionName",
+]
+
+
+@single_flight
+def fetch_senders(
+    contract_address: str,
+    chain_id: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
+    senders_source: str = "txlist",
+):
+    key_event = load_protocols()[chain_id][contract_address].get("key_event")
+    if senders_source == "events" and key_event:
+        return fetch_senders_by_event(
+            contract_address, chain_id, max_pages, timestamp_threshold
+        )
 
-def fetch_senders(contract_address: str, chain_id: str, max_pages: int = 10):
     local_senders = set()
     page = 1
     api_key = ENDPOINTS[chain_id]["api_key"]
     base_url = ENDPOINTS[chain_id]["api_url"]
-    key_method = PROTOCOLS[chain_id][contract_address].get("key_method")
+    key_method = load_protocols()[chain_id][contract_address].get("key_method")
+    start_block = get_block_by_timestamp(chain_id, timestamp_threshold)
     while page <= max_pages:
         params = {
             "chainid": chain_id,
             "module": "account",
             "action": "txlist",
             "address": contract_address,
-            "startblock": 0,
+            "startblock": start_block,
             "endblock": 99999999,
             "page": page,
             "offset": 100,
@@ -41,13 +97,15 @@ def fetch_senders(contract_address: str, chain_id: str, max_pages: int = 10):
             "apikey": api_key,
         }
         try:
-            resp = requests.get(base_url, params=params).json()
+            resp = decode_response(requests.get(base_url, params=params))
             if resp["status"] != "1" or not resp["result"]:
                 break
             txs = resp["result"]
             for tx in txs:
                 if tx.get("methodId") == key_method:
                     local_senders.add(tx["from"].lower())
+            if crossed_timestamp_threshold(txs, timestamp_threshold):
+                break
             page += 1
             time.sleep(0.1)
         except requests.exceptions.RequestException as e:
@@ -58,21 +116,73 @@ def fetch_senders(contract_address: str, chain_id: str, max_pages: int = 10):
     return local_senders
 
 
+@single_flight
+def fetch_senders_by_event(
+    contract_address: str,
+    chain_id: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
+):
+    """
+    Fetches senders from the protocol's own key_event logs (e.g. Supply/Deposit), filtered
+    server-side by topic0, so calls routed through multicall or routers are also found.
+    The beneficiary (dst/onBehalfOf/owner) is indexed as topic2 in every supported event.
+    getLogs has no sort order: pages run oldest first from the timestamp_threshold
+    block, so max_pages keeps the earliest senders (txlist keeps the newest).
+    """
+    local_senders = set()
+    api_key = ENDPOINTS[chain_id]["api_key"]
+    base_url = ENDPOINTS[chain_id]["api_url"]
+    key_event = load_protocols()[chain_id][contract_address]["key_event"]
+    from_block = get_block_by_timestamp(chain_id, timestamp_threshold)
+    for page in range(1, max_pages + 1):
+        params = {
+            "chainid": chain_id,
+            "module": "logs",
+            "action": "getLogs",
+            "fromBlock": from_block,
+            "toBlock": 99999999,
+            "address": contract_address,
+            "topic0": key_event,
+            "page": page,
+            "offset": 1000,
+            "apikey": api_key,
+        }
+        try:
+            resp = decode_response(requests.get(base_url, params=params))
+            if resp.get("status") != "1" or not resp.get("result"):
+                break
+            for log in resp["result"]:
+                topics = log.get("topics") or []
+                if len(topics) > 2:
+                    local_senders.add(bytes32_to_address(topics[2]).lower())
+            if len(resp["result"]) < 1000:
+                break
+            time.sleep(0.1)
+        except requests.exceptions.RequestException as e:
+            logging.error(
+                f"API request failed on page {page} for contract {contract_address} logs: {e}"
+            )
+            break
+    return local_senders
+
+
 def get_contract_sender_list(
     protocol_type: str,
     chain_id: str,
     max_pages: int = 10,
     use_cache: bool = False,
     max_workers: int = 3,
+    timestamp_threshold: int = 0,
+    senders_source: str = "txlist",
 ) -> List[str]:
     """
     Fetches a list of unique senders who interacted with all contracts of a given type.
     """
-    cache_path = f"ml/data/raw/cache/senders_{protocol_type}_{chain_id}.json"
+    cache_path = f"ml/data/raw/cache/senders_{protocol_type}_{chain_id}.jsonl.gz"
     os.makedirs(os.path.dirname(cache_path), exist_ok=True)
     if use_cache and os.path.exists(cache_path):
-        with open(cache_path, "r") as f:
-            sender_list = json.load(f)
+        sender_list = list(iter_jsonl_gz(cache_path))
         logging.info(f"Loaded sender_list from cache: {cache_path}")
 
         return sender_list
@@ -80,12 +190,19 @@ def get_contract_sender_list(
     sender_list = set()
     target_contracts = [
         addr
-        for addr, data in PROTOCOLS[chain_id].items()
+        for addr, data in load_protocols()[chain_id].items()
         if data.get("type") == protocol_type
     ]
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = {
-            executor.submit(fetch_senders, contract, chain_id, max_pages): contract
+            executor.submit(
+                fetch_senders,
+                contract,
+                chain_id,
+                max_pages,
+                timestamp_threshold,
+                senders_source,
+            ): contract
             for contract in target_contracts
         }
         for future in tqdm(
@@ -101,21 +218,23 @@ def get_contract_sender_list(
                 logging.error(f"Error fetching senders for contract {contract}: {e}")
 
     sender_list = list(sender_list)
-    with open(cache_path, "w") as f:
-        json.dump(sender_list, f)
+    write_jsonl_gz(cache_path, sender_list)
     logging.info(f"Saved sender_list to cache: {cache_path}")
 
     return sender_list
 
 
+@single_flight
 def get_eoa_transactions(
-    eoa_address: str, chain_id: int, max_pages: int = 10
+    eoa_address: str, chain_id: int, max_pages: int = 10, timestamp_threshold: int = 0
 ) -> List[Dict[str, Any]]:
     """
-    Fetches up to (max_pages * 100) most recent transactions for a given EOA address.
+    Fetches up to (max_pages * 100) most recent transactions for a given EOA address,
+    starting from the first block at or after timestamp_threshold, each hash once.
     """
     api_key = ENDPOINTS[chain_id]["api_key"]
     base_url = ENDPOINTS[chain_id]["api_url"]
+    start_block = get_block_by_timestamp(chain_id, timestamp_threshold)
     all_results = []
     for page in range(1, max_pages + 1):
         params = {
@@ -123,7 +242,7 @@ def get_eoa_transactions(
             "module": "account",
             "action": "txlist",
             "address": eoa_address,
-            "startblock": 0,
+            "startblock": start_block,
             "endblock": 99999999,
             "page": page,
             "offset": 100,
@@ -131,7 +250,7 @@ def get_eoa_transactions(
             "apikey": api_key,
         }
         try:
-            resp = requests.get(base_url, params=params).json()
+            resp = decode_response(requests.get(base_url, params=params))
             if resp["status"] == "1" and resp.get("result"):
                 for tx in resp["result"]:
                     tx["address"] = eoa_address
@@ -139,6 +258,8 @@ def get_eoa_transactions(
                 all_results.extend(resp["result"])
                 if len(resp["result"]) < 100:
                     break
+                if crossed_timestamp_threshold(resp["result"], timestamp_threshold):
+                    break
             else:
                 logging.warning(
                     f"Could not fetch txs for {eoa_address} page {page}: {resp.get('message', 'No message')}, {resp.get('result', 'No result')}"
@@ -149,7 +270,24 @@ def get_eoa_transactions(
                 f"API request failed for get_eoa_transactions {eoa_address} page {page}: {e}"
             )
             break
-    return all_results
+    # a tx mined between two calls shifts the newest-first pages, repeating a row
+    return list({tx["hash"]: tx for tx in all_results}.values())
+
+
+def project_transactions(
+    transactions: Iterable[Dict[str, Any]], columns: List[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Keeps only the given txlist fields of each transaction (TX_COLUMNS by default).
+    The 4-byte selector is kept as methodId, derived from input when missing.
+    """
+    columns = columns or TX_COLUMNS
+    projected = []
+    for tx in transactions:
+        if "methodId" not in tx and "input" in tx:
+            tx["methodId"] = tx["input"][:10] if len(tx["input"]) >= 10 else "0x"
+        projected.append({col: tx[col] for col in columns if col in tx})
+    return projected
 
 
 def fetch_transactions_concurrently(
@@ -158,21 +296,28 @@ def fetch_transactions_concurrently(
     use_cache: bool = False,
     max_workers: int = 3,
     eoa_max_pages: int = 2,
+    timestamp_threshold: int = 0,
+    tx_columns: List[str] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Fetches transactions for a list of addresses concurrently using a thread pool.
+    Fetches transactions for a list of addresses concurrently using a thread pool,
+    keeping only the tx_columns fields.
     """
     single_chain_txs = []
+    cache_path = f"ml/data/raw/cache/single_chain_txs_{chain_id}.jsonl.gz"
     if use_cache:
-        with open(f"ml/data/raw/cache/single_chain_txs_{chain_id}.json", "r") as f:
-            single_chain_txs = json.load(f)
+        single_chain_txs = project_transactions(iter_jsonl_gz(cache_path), tx_columns)
         logging.info(f"Loaded single_chain_txs_{chain_id} from cache.")
 
         return single_chain_txs
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_sender = {
             executor.submit(
-                get_eoa_transactions, sender, chain_id, eoa_max_pages
+                get_eoa_transactions,
+                sender,
+                chain_id,
+                eoa_max_pages,
+                timestamp_threshold,
             ): sender
             for sender in sender_list
         }
@@ -186,20 +331,22 @@ def fetch_transactions_concurrently(
             try:
                 txs = future.result(timeout=5)
                 if txs:
-                    single_chain_txs.extend(txs)
+                    single_chain_txs.extend(project_transactions(txs, tx_columns))
             except Exception as exc:
                 logging.error(f"Sender {sender} generated an exception: {exc}")
 
-    with open(f"ml/data/raw/cache/single_chain_txs_{chain_id}.json", "w") as f:
-        json.dump(single_chain_txs, f)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    write_jsonl_gz(cache_path, single_chain_txs)
     logging.info(f"Saved single_chain_txs_{chain_id} to cache.")
 
     return single_chain_txs
 
 
+@single_flight
 def get_token_balance(token_contract, user_address, chain_id):
     """
-    Fetches the balance of a specific token for a given user address.
+    Fetches the balance of a specific token for a given user address, or None if
+    the API call failed.
     """
     api_key = ENDPOINTS[chain_id]["api_key"]
     base_url = ENDPOINTS[chain_id]["api_url"]
@@ -223,7 +370,7 @@ def get_token_balance(token_contract, user_address, chain_id):
             "apikey": api_key,
         }
     try:
-        resp = requests.get(base_url, params=params, timeout=10).json()
+        resp = decode_response(requests.get(base_url, params=params, timeout=10))
         if resp.get("status") != "1":
             raise Exception(f"API error: {resp.get('message')}, {resp.get('result')}")
         return int(resp["result"])
@@ -231,25 +378,37 @@ def get_token_balance(token_contract, user_address, chain_id):
         logging.warning(
             f"get_token_balance failed for {user_address} on {token_contract}: {e}"
         )
-        return 0
+        return None
 
 
-def get_balances(user_address, chain_id):
-    if chain_id not in TOKENS:
+def get_balances(user_address, chain_id, known_balances=None, skip_failed=False):
+    """
+    Fetches the latest balance of every token in TOKENS[chain_id] for a given user address.
+    Balances already reconstructed from a complete Transfer history (known_balances,
+    keyed by lowercased token contract) are used as is instead of a live call.
+    A failed call counts as a 0 balance, or leaves the token out with skip_failed.
+    """
+    if chain_id not in load_tokens():
         raise ValueError(f"No token config for chain ID {chain_id}")
 
     balances = {}
-    tokens = TOKENS[chain_id]
+    tokens = load_tokens()[chain_id]
     token_symbols = set(tokens.keys())
+    known_balances = known_balances or {}
 
     for symbol, info in tokens.items():
-        raw_balance = get_token_balance(info["address"], user_address, chain_id)
         price = float(info["price"])
-        balance = float(raw_balance) / (10 ** int(info["decimals"]))
+        if info["address"].lower() in known_balances:
+            balance = float(known_balances[info["address"].lower()])
+        else:
+            raw_balance = get_token_balance(info["address"], user_address, chain_id)
+            if raw_balance is None and skip_failed:
+                continue
+            balance = float(raw_balance or 0) / (10 ** int(info["decimals"]))
         balances[f"{symbol.lower()}_balance"] = round(balance, 4)
         balances[f"{symbol.lower()}_balance_usd"] = round(balance * price, 4)
 
-    for symbol in DEFAULT_TOKENS:
+    for symbol in load_default_tokens():
         if symbol not in token_symbols:
             balances[f"{symbol.lower()}_balance"] = 0.0
             balances[f"{symbol.lower()}_balance_usd"] = 0.0
@@ -257,15 +416,46 @@ def get_balances(user_address, chain_id):
     return balances
 
 
+def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts the txlist string fields to numbers and adds timestamp_dt.
+    Fields projected away at ingestion are skipped.
+    """
+    numeric_cols = [
+        "value",
+        "gas",
+        "gasPrice",
+        "gasUsed",
+        "cumulativeGasUsed",
+        "blockNumber",
+        "timeStamp",
+        "nonce",
+        "transactionIndex",
+        "confirmations",
+    ]
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    df["timestamp_dt"] = pd.to_datetime(df["timeStamp"], unit="s")
+    df["isError"] = df["isError"].astype(int)
+
+    return df
+
+
 def convert_txs_to_raw_data(
     transactions: List[Dict[str, Any]],
     chain_id: int,
     timestamp_threshold: int = 1672531200,
+    known_balances: Dict[str, Dict[str, float]] = None,
+    fetch_balances: bool = True,
 ) -> pd.DataFrame:
     """
     Converts a list of transaction data into a pandas DataFrame,
-    and saves it to a CSV file.
+    and saves it to a CSV file. Balances are left to the balance snapshot job
+    when fetch_balances is False.
     """
+    known_balances = known_balances or {}
     output_filename = f"ml/data/raw/collected_txs_{chain_id}.csv"
     if not transactions:
         logging.warning("No transactions to convert.")
@@ -277,23 +467,12 @@ def convert_txs_to_raw_data(
     df = df[pd.to_numeric(df["timeStamp"], errors="coerce") >= timestamp_threshold]
     logging.info(f"Filtered {len(df)} transactions...")
 
-    numeric_cols = [
-        "value",
-        "gas",
-        "gasPrice",
-        "gasUsed",
-        "cumulativeGasUsed",
-        "blockNumber",
-        "timeStamp",
-        "nonce",
-        "transactionIndex",
-        "confirmations",
-    ]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = normalize_transactions(df)
 
-    df["timestamp_dt"] = pd.to_datetime(df["timeStamp"], unit="s")
-    df["isError"] = df["isError"].astype(int)
+    if not fetch_balances:
+        df.to_csv(output_filename, index=False)
+        logging.info(f"All collected transactions saved to '{output_filename}'")
+        return df
 
     unique_addresses = df["address"].unique()
 
@@ -301,7 +480,10 @@ def convert_txs_to_raw_data(
     address_to_balance = {}
     with ThreadPoolExecutor(max_workers=3) as executor:
         futures = [
-            executor.submit(get_balances, addr, chain_id) for addr in unique_addresses
+            executor.submit(
+                get_balances, addr, chain_id, known_balances.get(addr.lower())
+            )
+            for addr in unique_addresses
         ]
         for addr, future in zip(
             unique_addresses,
@@ -322,6 +504,100 @@ def convert_txs_to_raw_data(
     return df
 
 
+def append_to_csv(df: pd.DataFrame, path: str):
+    """
+    Appends rows to a raw CSV, aligned on its existing header.
+    """
+    if df.empty:
+        return
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        header = pd.read_csv(path, nrows=0).columns
+        df.reindex(columns=header).to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def decode_transactions(
+    transactions: List[Dict[str, Any]],
+    timestamp_threshold: int = 0,
+    tx_columns: List[str] = None,
+) -> pd.DataFrame:
+    """
+    Builds the normalized DataFrame of one sender's transactions.
+    """
+    if not transactions:
+        return None
+    df = pd.DataFrame(project_transactions(transactions, tx_columns))
+    df = df[pd.to_numeric(df["timeStamp"], errors="coerce") >= timestamp_threshold]
+    if df.empty:
+        return None
+    return normalize_transactions(df)
+
+
+def collect_transactions_staged(
+    sender_list: List[str],
+    chain_id: int,
+    max_workers: int = 3,
+    eoa_max_pages: int = 2,
+    timestamp_threshold: int = 0,
+    known_balances: Dict[str, Dict[str, float]] = None,
+    fetch_balances: bool = True,
+    tx_columns: List[str] = None,
+    decode_processes: int = 0,
+    queue_size: int = 64,
+) -> int:
+    """
+    Runs Step 3 and Step 4 per sender as a staged pipeline:
+    fetch (threads) -> decode (threads, or processes when decode_processes > 0)
+    -> enrich with balances (threads) -> write (single writer),
+    so API calls, DataFrame building and CSV writing overlap instead of alternating.
+    Returns the number of transactions written to collected_txs_{chain_id}.csv, or
+    raises a PipelineError once every sender went through if any of them failed.
+    """
+    known_balances = known_balances or {}
+    output_filename = f"ml/data/raw/collected_txs_{chain_id}.csv"
+    if os.path.exists(output_filename):
+        os.remove(output_filename)
+
+    def fetch(sender):
+        return get_eoa_transactions(
+            sender, chain_id, eoa_max_pages, timestamp_threshold
+        )
+
+    def enrich(df):
+        if fetch_balances:
+            address = df["address"].iloc[0]
+            balances = get_balances(
+                address, chain_id, known_balances.get(address.lower())
+            )
+            df = df.assign(**balances)
+        return df
+
+    def write(df):
+        append_to_csv(df, output_filename)
+        return len(df)
+
+    stages = [
+        Stage("fetch", fetch, max_workers),
+        Stage(
+            "decode",
+            partial(
+                decode_transactions,
+                timestamp_threshold=timestamp_threshold,
+                tx_columns=tx_columns,
+            ),
+            decode_processes,
+            processes=decode_processes > 0,
+        ),
+        Stage("enrich", enrich, max_workers),
+        Stage("write", write),
+    ]
+    written = sum(run_pipeline(sender_list, stages, queue_size))
+    logging.info(f"{written} collected transactions saved to '{output_filename}'")
+
+    return written
+
+
 def merge_collected_txs(chain_ids: list) -> pd.DataFrame:
     dfs = []
     for chain_id in chain_ids:
@@ -365,7 +641,11 @@ def merge_event_logs(chain_ids: list) -> pd.DataFrame:
 
 
 def get_transfer_event_logs_from(
-    chain_id: int, contract_address: str, target_address: str, max_pages: int = 10
+    chain_id: int,
+    contract_address: str,
+    target_address: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
 ) -> List[Dict[str, Any]]:
     logs = get_transfer_event_logs(
         chain_id,
@@ -374,6 +654,7 @@ def get_transfer_event_logs_from(
         topic1=True,
         topic2=False,
         max_pages=max_pages,
+        timestamp_threshold=timestamp_threshold,
     )
     results = []
     for log in logs:
@@ -395,7 +676,11 @@ def get_transfer_event_logs_from(
 
 
 def get_transfer_event_logs_to(
-    chain_id: int, contract_address: str, target_address: str, max_pages: int = 10
+    chain_id: int,
+    contract_address: str,
+    target_address: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
 ) -> List[Dict[str, Any]]:
     logs = get_transfer_event_logs(
         chain_id,
@@ -404,6 +689,7 @@ def get_transfer_event_logs_to(
         topic1=False,
         topic2=True,
         max_pages=max_pages,
+        timestamp_threshold=timestamp_threshold,
     )
     results = []
     for log in logs:
@@ -424,6 +710,7 @@ def get_transfer_event_logs_to(
     return results
 
 
+@single_flight
 def get_transfer_event_logs(
     chain_id: int,
     contract_address: str,
@@ -431,18 +718,20 @@ def get_transfer_event_logs(
     topic1: bool = False,
     topic2: bool = False,
     max_pages: int = 10,
+    timestamp_threshold: int = 0,
 ) -> List[Dict[str, Any]]:
     transactions = []
     page = 0
     api_key = ENDPOINTS[chain_id]["api_key"]
     base_url = ENDPOINTS[chain_id]["api_url"]
+    from_block = get_block_by_timestamp(chain_id, timestamp_threshold)
     while page <= max_pages:
         if topic1:
             params = {
                 "chainid": chain_id,
                 "module": "logs",
                 "action": "getLogs",
-                "fromBlock": 0,
+                "fromBlock": from_block,
                 "toBlock": 99999999,
                 "address": contract_address,
                 "topic0": "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
@@ -457,7 +746,7 @@ def get_transfer_event_logs(
                 "chainid": chain_id,
                 "module": "logs",
                 "action": "getLogs",
-                "fromBlock": 0,
+                "fromBlock": from_block,
                 "toBlock": 99999999,
                 "address": contract_address,
                 "topic0": "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
@@ -471,7 +760,7 @@ def get_transfer_event_logs(
             raise ValueError("Invalid topic")
         try:
             page += 1
-            resp = requests.get(base_url, params=params).json()
+            resp = decode_response(requests.get(base_url, params=params))
             if resp.get("status") != "1":
                 if resp.get("message") == "No records found":
                     break
@@ -479,6 +768,8 @@ def get_transfer_event_logs(
                     f"API error: {resp.get('message')}, {resp.get('result')}"
                 )
             transactions.extend(resp.get("result"))
+            if len(resp.get("result")) < 1000:
+                break
             time.sleep(0.1)
         except Exception as e:
             logging.error(
@@ -489,30 +780,27 @@ def get_transfer_event_logs(
 
 
 def get_decimals(row):
-    chain_id = row["chain_id"]
-    contract = row["contract"].lower()
-    for _, info in TOKENS.get(chain_id, {}).items():
-        if info["address"].lower() == contract:
-            return info["decimals"]
-    return None
+    token = get_token_index().get((row["chain_id"], row["contract"].lower()))
+    return token["decimals"] if token else None
 
 
 def get_price(row):
-    chain_id = row["chain_id"]
-    contract = row["contract"].lower()
-    for _, info in TOKENS.get(chain_id, {}).items():
-        if info["address"].lower() == contract:
-            return info["price"]
+    token = get_token_index().get((row["chain_id"], row["contract"].lower()))
+    return token["price"] if token else None
 
 
 def get_event_logs_combined(
-    chain_id: int, contract_address: str, target_address: str, max_pages: int = 10
+    chain_id: int,
+    contract_address: str,
+    target_address: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
 ) -> pd.DataFrame:
     from_logs = get_transfer_event_logs_from(
-        chain_id, contract_address, target_address, max_pages
+        chain_id, contract_address, target_address, max_pages, timestamp_threshold
     )
     to_logs = get_transfer_event_logs_to(
-        chain_id, contract_address, target_address, max_pages
+        chain_id, contract_address, target_address, max_pages, timestamp_threshold
     )
     all_logs = from_logs + to_logs
     if len(all_logs) == 0:
@@ -542,6 +830,193 @@ def get_event_logs_combined(
     return df
 
 
+@single_flight
+def get_token_transfers(
+    chain_id: int,
+    target_address: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Fetches all ERC-20 transfers of an address in one paginated stream (account tokentx),
+    most recent first. Also returns whether the whole history since the start block was
+    reached, i.e. it was not truncated by max_pages or an API error.
+    """
+    transfers = []
+    complete = False
+    api_key = ENDPOINTS[chain_id]["api_key"]
+    base_url = ENDPOINTS[chain_id]["api_url"]
+    start_block = get_block_by_timestamp(chain_id, timestamp_threshold)
+    for page in range(1, max_pages + 1):
+        params = {
+            "chainid": chain_id,
+            "module": "account",
+            "action": "tokentx",
+            "address": target_address,
+            "startblock": start_block,
+            "endblock": 99999999,
+            "page": page,
+            "offset": 1000,
+            "sort": "desc",
+            "apikey": api_key,
+        }
+        try:
+            resp = decode_response(requests.get(base_url, params=params))
+            if resp.get("status") != "1":
+                if resp.get("message") == "No transactions found":
+                    complete = True
+                    break
+                raise Exception(
+                    f"API error: {resp.get('message')}, {resp.get('result')}"
+                )
+            transfers.extend(resp["result"])
+            if len(resp["result"]) < 1000:
+                complete = True
+                break
+            if crossed_timestamp_threshold(resp["result"], timestamp_threshold):
+                break
+            time.sleep(0.1)
+        except Exception as e:
+            logging.error(
+                f"EOA {target_address} token transfers not found on page {page}: {e}"
+            )
+            break
+    return transfers, complete and start_block == 0
+
+
+def get_event_logs_from_token_transfers(
+    chain_id: int,
+    target_address: str,
+    max_pages: int = 10,
+    timestamp_threshold: int = 0,
+) -> pd.DataFrame:
+    """
+    Builds event_logs rows for every token in TOKENS[chain_id] from a single tokentx
+    stream, with the same columns as get_event_logs_combined.
+    """
+    transfers, history_complete = get_token_transfers(
+        chain_id, target_address, max_pages, timestamp_threshold
+    )
+    if len(transfers) == 0:
+        logging.warning(
+            f"No token transfers found for {target_address} on chain {chain_id}."
+        )
+        return pd.DataFrame()
+
+    return token_transfers_to_event_logs(
+        transfers, chain_id, target_address, history_complete
+    )
+
+
+def token_transfers_to_event_logs(
+    transfers: List[Dict[str, Any]],
+    chain_id: int,
+    target_address: str,
+    history_complete: bool = False,
+) -> pd.DataFrame:
+    """
+    Converts raw tokentx rows into event_logs rows, keeping only the tokens in TOKENS[chain_id].
+    """
+    if len(transfers) == 0:
+        return pd.DataFrame()
+
+    tokens = pd.DataFrame(
+        [
+            {
+                "contract": info["address"].lower(),
+                "decimals": info["decimals"],
+                "price": info["price"],
+            }
+            for info in load_tokens().get(chain_id, {}).values()
+        ]
+    )
+    df = pd.DataFrame(transfers)
+    df["contract"] = df["contractAddress"].str.lower()
+    df = df.merge(tokens, on="contract", how="inner")
+    if df.empty:
+        return pd.DataFrame()
+
+    target_address = target_address.lower()
+    df["from"] = df["from"].str.lower()
+    df["to"] = df["to"].str.lower()
+    value = df["value"].astype(float)
+    is_outgoing = df["from"] == target_address
+    is_incoming = df["to"] == target_address
+    # same layout as the getLogs path: one negative row per outgoing transfer
+    # and one positive row per incoming transfer
+    outgoing = df[is_outgoing].assign(raw_amount=-value[is_outgoing])
+    incoming = df[is_incoming].assign(raw_amount=value[is_incoming])
+    df = pd.concat([outgoing, incoming], ignore_index=True)
+    df["address"] = target_address
+    df["chain_id"] = int(chain_id)
+    df["tx_hash"] = df["hash"]
+    df["block_number"] = pd.to_numeric(df["blockNumber"], errors="coerce")
+    df["timestamp"] = pd.to_numeric(df["timeStamp"], errors="coerce")
+    df["amount"] = df["raw_amount"] / (10 ** df["decimals"].astype(float))
+    df["amount_usd"] = df["amount"] * df["price"]
+    df["history_complete"] = history_complete
+
+    logging.info(
+        f"Found {len(df)} token transfers for {target_address} on chain {chain_id}."
+    )
+    return df[
+        [
+            "address",
+            "chain_id",
+            "contract",
+            "from",
+            "to",
+            "amount",
+            "tx_hash",
+            "block_number",
+            "timestamp",
+            "raw_amount",
+            "decimals",
+            "price",
+            "amount_usd",
+            "history_complete",
+        ]
+    ]
+
+
+def fetch_event_logs(
+    sender_list: List[str],
+    chain_id: int,
+    logs_max_pages: int = 2,
+    timestamp_threshold: int = 0,
+    logs_source: str = "getLogs",
+) -> pd.DataFrame:
+    """
+    Fetches Transfer event logs of every sender, either per (token contract, direction)
+    with getLogs or per address with a single tokentx stream.
+    """
+    event_logs_list = []
+    for sender in tqdm(sender_list, desc="Fetching event logs"):
+        if logs_source == "tokentx":
+            event_logs_list.append(
+                get_event_logs_from_token_transfers(
+                    chain_id, sender, logs_max_pages, timestamp_threshold
+                )
+            )
+        elif logs_source == "getLogs":
+            for symbol in ["WETH", "WBTC"]:
+                token_address = load_tokens()[chain_id][symbol]["address"]
+                event_logs_list.append(
+                    get_event_logs_combined(
+                        chain_id,
+                        token_address,
+                        sender,
+                        logs_max_pages,
+                        timestamp_threshold,
+                    )
+                )
+        else:
+            raise ValueError("logs_source only allows 'getLogs' or 'tokentx'")
+    if not event_logs_list:
+        return pd.DataFrame()
+    return pd.concat(event_logs_list, ignore_index=True)
+
+
 def parse_amount(data_hex: str) -> int:
     return int(data_hex, 16)
 
@@ -566,6 +1041,19 @@ def hex_to_decimal(hex_str: str) -> int:
     return int(hex_str, 16)
 
 
+def crossed_timestamp_threshold(
+    txs: List[Dict[str, Any]], timestamp_threshold: int = 0
+) -> bool:
+    """
+    Returns True if a page sorted by desc timestamp already reaches rows older than
+    timestamp_threshold, so the following pages would only be discarded.
+    """
+    if not timestamp_threshold or not txs:
+        return False
+    oldest = pd.to_numeric(txs[-1].get("timeStamp"), errors="coerce")
+    return pd.notnull(oldest) and oldest < timestamp_threshold
+
+
 def get_config_value(key):
     return COLLECT_RAW_DATA_CONFIG.get(key, COLLECT_RAW_DATA_DEFAULT_CONFIG.get(key))
 
@@ -582,12 +1070,39 @@ if __name__ == "__main__":
     logs_max_pages = get_config_value("logs_max_pages")
     senders_count_threshold = get_config_value("senders_count_threshold")
     eoa_max_pages = get_config_value("eoa_max_pages")
+    logs_source = get_config_value("logs_source")
+    balance_source = get_config_value("balance_source")
+    senders_source = get_config_value("senders_source")
+    activity_probe = get_config_value("activity_probe")
+    tx_columns = get_config_value("tx_columns")
+    collect_mode = get_config_value("collect_mode")
+    decode_processes = get_config_value("decode_processes")
+    pipeline_queue_size = get_config_value("pipeline_queue_size")
+    dry_run = get_config_value("dry_run")
+    api_daily_quota = get_config_value("api_daily_quota")
+    api_calls_per_second = get_config_value("api_calls_per_second")
+    if balance_source == "transfers" and logs_source != "tokentx":
+        # getLogs only covers WETH / WBTC and never marks a history as complete
+        raise ValueError("balance_source 'transfers' requires logs_source 'tokentx'")
+
+    plan = plan_collection(
+        {**COLLECT_RAW_DATA_DEFAULT_CONFIG, **COLLECT_RAW_DATA_CONFIG}
+    )
+    log_plan(plan, api_calls_per_second, api_daily_quota)
+    if dry_run:
+        sys.exit(0)
 
     logging.info(
         f"Step 1: Fetching list of senders who interacted with the target contracts on based CHAIN_ID: {based_chain_id}..."
     )
     sender_list = get_contract_sender_list(
-        based_protocol_type, based_chain_id, senders_max_pages, use_cache, max_workers
+        based_protocol_type,
+        based_chain_id,
+        senders_max_pages,
+        use_cache,
+        max_workers,
+        timestamp_threshold,
+        senders_source,
     )
 
     if not sender_list:
@@ -602,35 +1117,87 @@ if __name__ == "__main__":
             logging.info(
                 f"Found {len(sender_list)} unique senders on CHAIN_ID: {based_chain_id}."
             )
+        if api_daily_quota:
+            max_senders = fit_senders_to_quota(plan, api_daily_quota)
+            if max_senders is not None and len(sender_list) > max_senders:
+                sender_list = sender_list[:max_senders]
+                logging.warning(
+                    f"Kept {len(sender_list)} senders to fit the daily API quota of {api_daily_quota} calls."
+                )
 
     for chain_id in chain_ids:
+        chain_sender_list = sender_list
+        if activity_probe and chain_id != based_chain_id:
+            logging.info(f"Probing sender activity on CHAIN_ID: {chain_id}...")
+            chain_sender_list = probe_active_senders(
+                sender_list, chain_id, timestamp_threshold, max_workers
+            )
+
         logging.info(f"Step 2: Fetching event logs on CHAIN_ID: {chain_id}...")
-        event_logs_list = []
-        for sender in tqdm(sender_list, desc="Fetching event logs"):
-            weth_address = TOKENS[chain_id]["WETH"]["address"]
-            event_logs = get_event_logs_combined(
-                chain_id, weth_address, sender, logs_max_pages
+        # reconstructing balances needs the full Transfer history, not only
+        # the part after timestamp_threshold
+        logs_timestamp_threshold = (
+            0 if balance_source == "transfers" else timestamp_threshold
+        )
+        event_logs_df = fetch_event_logs(
+            chain_sender_list,
+            chain_id,
+            logs_max_pages,
+            logs_timestamp_threshold,
+            logs_source,
+        )
+        event_logs_df.to_csv(f"ml/data/raw/event_logs_{chain_id}.csv", index=False)
+
+        known_balances = {}
+        if balance_source == "transfers":
+            known_balances = get_known_balances(event_logs_df, chain_id)
+            logging.info(
+                f"Reconstructed balances of {len(known_balances)} addresses from transfers on CHAIN_ID: {chain_id}."
             )
-            event_logs_list.append(event_logs)
-            wbtc_address = TOKENS[chain_id]["WBTC"]["address"]
-            event_logs = get_event_logs_combined(
-                chain_id, wbtc_address, sender, logs_max_pages
+            calc_balance_history(event_logs_df).to_csv(
+                f"ml/data/raw/balance_history_{chain_id}.csv", index=False
             )
-            event_logs_list.append(event_logs)
-        event_logs_df = pd.concat(event_logs_list, ignore_index=True)
-        event_logs_df.to_csv(f"ml/data/raw/event_logs_{chain_id}.csv", index=False)
 
         logging.info(
             f"Step 3: Fetching recent transactions for each sender concurrently on CHAIN_ID: {chain_id}..."
         )
-        txs_by_chain = fetch_transactions_concurrently(
-            sender_list, chain_id, use_cache, max_workers, eoa_max_pages
-        )
+        if collect_mode == "staged" and not use_cache:
+            logging.info(
+                f"Step 4: Saving transactions as they are fetched on CHAIN_ID: {chain_id}..."
+            )
+            collect_transactions_staged(
+                chain_sender_list,
+                chain_id,
+                max_workers,
+                eoa_max_pages,
+                timestamp_threshold,
+                known_balances,
+                fetch_balances=balance_source != "snapshot",
+                tx_columns=tx_columns,
+                decode_processes=decode_processes,
+                queue_size=pipeline_queue_size,
+            )
+        else:
+            txs_by_chain = fetch_transactions_concurrently(
+                chain_sender_list,
+                chain_id,
+                use_cache,
+                max_workers,
+                eoa_max_pages,
+                timestamp_threshold,
+                tx_columns,
+            )
 
-        logging.info(
-            f"Step 4: Saving {len(txs_by_chain)} transactions on CHAIN_ID: {chain_id}..."
-        )
-        df = convert_txs_to_raw_data(txs_by_chain, chain_id, timestamp_threshold)
+            logging.info(
+                f"Step 4: Saving {len(txs_by_chain)} transactions on CHAIN_ID: {chain_id}..."
+            )
+            df = convert_txs_to_raw_data(
+                txs_by_chain,
+                chain_id,
+                timestamp_threshold,
+                known_balances,
+                fetch_balances=balance_source != "snapshot",
+            )
 
         logging.info(f"Workflow finished on CHAIN_ID: {chain_id}.")
 
@@ -643,3 +1210,4 @@ if __name__ == "__main__":
     merged_event_logs_df = merge_event_logs(chain_ids)
     merged_event_logs_df.to_csv("ml/data/raw/event_logs_all.csv", index=False)
     logging.info(f"All event logs saved to 'ml/data/raw/event_logs_all.csv'")
+    logging.info(f"Coalesced {merged_calls_count()} duplicate in-flight API calls.")
@@ -0,0 +1,74 @@
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+
+def group_weights(df: pd.DataFrame, keys: list, weight_col: str = None) -> pd.Series:
+    """
+    Total weight per group: the row count when weight_col is None, else the sum of
+    weight_col (e.g. the counts of pre-aggregated rows). keys are column names or
+    key Series aligned with df.
+    """
+    if weight_col is None:
+        return df.groupby(keys).size()
+    return df.groupby(keys)[weight_col].sum()
+
+
+def first_max_rows(df: pd.DataFrame, group_cols: List[str], weights) -> pd.DataFrame:
+    """
+    Row of df with the largest weight in each group (the first one in row order on
+    ties, like idxmax), for all groups at once: one stable sort by descending weight,
+    then the first row of each group. Sorted by group_cols.
+    """
+    order = np.argsort(-np.asarray(weights, dtype=float), kind="stable")
+    first = df.iloc[order].drop_duplicates(group_cols)
+    return first.sort_values(group_cols, kind="stable")
+
+
+def grouped_shares(
+    df: pd.DataFrame, group_cols: List[str], category_col: str, weight_col: str = None
+) -> pd.DataFrame:
+    """
+    Share of each category within its group, for all groups at once:
+    one row per (group_cols..., category_col) with its weight (row count when
+    weight_col is None) and share = weight / group total weight.
+    """
+    weights = group_weights(df, group_cols + [category_col], weight_col)
+    shares = weights.rename("weight").reset_index()
+    total = shares.groupby(group_cols)["weight"].transform("sum")
+    shares["share"] = shares["weight"] / total
+
+    return shares
+
+
+def calc_grouped_hhi(shares: pd.DataFrame, group_cols: List[str]) -> pd.Series:
+    """
+    Herfindahl-Hirschman index (sum of squared shares) per group.
+    """
+    return (shares["share"] ** 2).groupby([shares[col] for col in group_cols]).sum()
+
+
+def calc_grouped_entropy(
+    shares: pd.DataFrame, group_cols: List[str], log: Callable = np.log
+) -> pd.Series:
+    """
+    Shannon entropy -sum(p * log(p)) per group, over the categories with p > 0.
+    log sets the base (np.log, np.log2).
+    """
+    p = shares["share"].where(shares["share"] > 0)
+    terms = -(p * log(p)).fillna(0)
+    return terms.groupby([shares[col] for col in group_cols]).sum().abs()
+
+
+def calc_grouped_normalized_entropy(
+    shares: pd.DataFrame, group_cols: List[str], log: Callable = np.log
+) -> pd.Series:
+    """
+    Entropy per group divided by its maximum log(n_categories), in [0, 1];
+    0 for groups with a single category or no weight at all.
+    """
+    entropy = calc_grouped_entropy(shares, group_cols, log)
+    n_categories = shares.groupby(group_cols).size()
+    max_entropy = log(n_categories)
+    return (entropy / max_entropy).where(n_categories > 1, 0).fillna(0)
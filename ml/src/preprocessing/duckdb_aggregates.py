@@ -0,0 +1,186 @@
+import logging
+import os
+from typing import Dict, List
+
+import pandas as pd
+
+from ml.src.utils.arrow_io import read_arrow
+
+try:
+    import duckdb
+except ImportError:  # optional, only the duckdb backend needs it
+    duckdb = None
+
+DUCKDB_TEMP_DIR = "ml/data/raw/duckdb_tmp"
+
+
+def _scan(con, path: str, name: str) -> List[str]:
+    """
+    Exposes the raw file at path as the view name and returns its columns. CSV
+    columns are read as text and cast by the queries, like pd.to_numeric(coerce);
+    Parquet is scanned in place and Arrow IPC is memory-mapped.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".arrow", ".feather", ".ipc"):
+        con.register(f"{name}_arrow", read_arrow(path))
+        source = f"{name}_arrow"
+    elif ext == ".parquet":
+        source = f"read_parquet('{path}')"
+    else:
+        source = f"read_csv('{path}', header = true, all_varchar = true)"
+    con.execute(f"CREATE VIEW {name} AS SELECT * FROM {source}")
+    return [row[0] for row in con.execute(f"DESCRIBE {name}").fetchall()]
+
+
+def _timestamp_hour(seconds: str) -> str:
+    return f"make_timestamp(({seconds} // 3600) * 3600 * 1000000)"
+
+
+def _aggregate_transactions(con, path: str) -> Dict[str, pd.DataFrame]:
+    columns = _scan(con, path, "raw_txs")
+    balance_columns = [col for col in columns if col.endswith("balance_usd")]
+    balance_select = "".join(
+        f', TRY_CAST("{col}" AS DOUBLE) AS "{col}"' for col in balance_columns
+    )
+    # materialized in file order, so rowid is the row position used for first_seq
+    con.execute(f"""
+        CREATE TABLE txs AS
+        SELECT
+            address,
+            TRY_CAST(chain_id AS BIGINT) AS chain_id,
+            "from",
+            "to",
+            "functionName",
+            TRY_CAST("value" AS DOUBLE) AS "value",
+            TRY_CAST("timeStamp" AS BIGINT) AS "timeStamp"
+            {balance_select}
+        FROM raw_txs
+        """)
+    balance_aggregates = "".join(
+        f', COALESCE(SUM("{col}"), 0) AS "{col}_sum", COUNT("{col}") AS "{col}_count"'
+        for col in balance_columns
+    )
+    queries = {
+        "chains": f"""
+            SELECT
+                address,
+                chain_id,
+                COUNT(*) AS tx_count,
+                COALESCE(SUM("value") FILTER (WHERE "to" = address), 0)
+                    AS received_wei,
+                COALESCE(SUM("value") FILTER (WHERE "from" = address), 0) AS sent_wei,
+                MAX("value") FILTER (WHERE "to" = address) AS received_wei_max,
+                MAX("value") FILTER (WHERE "from" = address) AS sent_wei_max,
+                COUNT(*) FILTER (WHERE "to" = address) AS inflow_count,
+                COUNT(*) FILTER (WHERE "from" = address) AS outflow_count,
+                MIN("timeStamp") AS first_timestamp,
+                MAX("timeStamp") AS last_timestamp
+                {balance_aggregates}
+            FROM txs
+            GROUP BY address, chain_id
+        """,
+        "protocols": """
+            SELECT address, chain_id, "to", COUNT(*) AS tx_count, MIN(rowid) AS first_seq
+            FROM txs
+            GROUP BY address, chain_id, "to"
+        """,
+        "methods": """
+            SELECT address, chain_id, "functionName", COUNT(*) AS tx_count
+            FROM txs
+            GROUP BY address, chain_id, "functionName"
+        """,
+        "activity": f"""
+            SELECT
+                address,
+                chain_id,
+                {_timestamp_hour('"timeStamp"')} AS hour_start,
+                COUNT(*) AS tx_count
+            FROM txs
+            GROUP BY ALL
+        """,
+    }
+    return {name: con.execute(query).df() for name, query in queries.items()}
+
+
+def _aggregate_event_logs(
+    con, path: str, token_contracts: Dict[str, Dict[int, str]]
+) -> Dict[str, pd.DataFrame]:
+    _scan(con, path, "raw_event_logs")
+    contracts = pd.DataFrame(
+        [
+            {"token": token, "chain_id": int(chain_id), "contract": address.lower()}
+            for token, addresses in token_contracts.items()
+            for chain_id, address in addresses.items()
+        ],
+        columns=["token", "chain_id", "contract"],
+    )
+    con.register("token_contracts", contracts)
+    token_flows = con.execute(f"""
+        WITH logs AS (
+            SELECT
+                c.token,
+                l."from",
+                l."to",
+                TRY_CAST(l.amount AS DOUBLE) AS amount,
+                {_timestamp_hour('TRY_CAST(l."timestamp" AS BIGINT)')} AS hour_start
+            FROM raw_event_logs l
+            JOIN token_contracts c
+                ON TRY_CAST(l.chain_id AS BIGINT) = c.chain_id
+                AND lower(l.contract) = c.contract
+        ),
+        flows AS (
+            SELECT token, "to" AS address, hour_start, amount AS in_amount,
+                NULL AS out_amount
+            FROM logs
+            WHERE "to" IS NOT NULL
+            UNION ALL
+            SELECT token, "from" AS address, hour_start, NULL AS in_amount,
+                amount AS out_amount
+            FROM logs
+            WHERE "from" IS NOT NULL
+        )
+        SELECT
+            token,
+            address,
+            hour_start,
+            COALESCE(SUM(in_amount), 0) AS in_amount,
+            COALESCE(SUM(out_amount), 0) AS out_amount
+        FROM flows
+        WHERE hour_start IS NOT NULL
+        GROUP BY token, address, hour_start
+        """).df()
+    return {"token_flows": token_flows}
+
+
+def aggregate_tables(
+    txs_path: str,
+    event_logs_path: str,
+    token_contracts: Dict[str, Dict[int, str]],
+    memory_limit: str = None,
+    temp_dir: str = DUCKDB_TEMP_DIR,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Computes the aggregate tables of AGGREGATE_TABLES (see summarize_transactions)
+    with DuckDB instead of pandas: the raw files (CSV, Parquet or Arrow IPC) are
+    scanned and grouped in parallel by the in-process engine, which spills to
+    temp_dir past memory_limit (default: DuckDB's, 80% of RAM). token_contracts maps
+    each inflow token to its {chain_id: contract address}. Without event_logs_path
+    token_flows is left out.
+    """
+    if duckdb is None:
+        raise ImportError("The duckdb backend requires duckdb (pip install duckdb)")
+
+    os.makedirs(temp_dir, exist_ok=True)
+    config = {"temp_directory": temp_dir, "preserve_insertion_order": True}
+    if memory_limit:
+        config["memory_limit"] = memory_limit
+    with duckdb.connect(config=config) as con:
+        tables = _aggregate_transactions(con, txs_path)
+        if event_logs_path:
+            tables.update(_aggregate_event_logs(con, event_logs_path, token_contracts))
+
+    for table in tables.values():
+        if "hour_start" in table.columns:
+            table["hour_start"] = table["hour_start"].astype("datetime64[ns]")
+    logging.info(f"Aggregated {len(tables['chains'])} (address, chain_id) with DuckDB")
+    return tables
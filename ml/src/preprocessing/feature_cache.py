@@ -0,0 +1,172 @@
+import glob
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from ml.src.preprocessing.feature_registry import FEATURE_BLOCKS, block_dependencies
+from ml.src.utils.arrow_io import read_arrow_frame, write_arrow
+from ml.src.utils.json_io import dumps, loads
+
+FEATURE_CACHE_DIR = "ml/data/raw/cache/features"
+# bump to invalidate every cached block, e.g. after a change outside CODE_FILES
+CACHE_VERSION = 1
+# sources whose content is the code version of the cached blocks
+CODE_FILES = [
+    os.path.join(os.path.dirname(__file__), name)
+    for name in [
+        "features_engineering.py",
+        "feature_registry.py",
+        "concentration.py",
+        "method_classifier.py",
+        "duckdb_aggregates.py",
+        "balance_store.py",
+        "feature_shards.py",
+        "../../config/catalogs.py",
+        "../utils/arrow_io.py",
+    ]
+]
+# bytes hashed at a time by file_checksum
+CHECKSUM_PARTITION = 1 << 24
+
+
+def file_checksum(path: str) -> Optional[str]:
+    """
+    sha1 of the file at path, hashed one CHECKSUM_PARTITION at a time; None if the
+    file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    checksum = hashlib.sha1()
+    with open(path, "rb") as f:
+        for partition in iter(lambda: f.read(CHECKSUM_PARTITION), b""):
+            checksum.update(partition)
+    return checksum.hexdigest()
+
+
+class FeatureCache:
+    """
+    Per-block feature columns of past runs, kept in cache_dir as Arrow IPC files
+    (one per block and key). A block's key fingerprints everything its columns
+    depend on: the checksums of its inputs (see FEATURE_BLOCKS), its config slice,
+    the code version (CODE_FILES, CACHE_VERSION), the computation mode, the day for
+    the blocks relative to the current time, and for scores the keys of the blocks
+    they weight. A block whose key is unchanged loads from the cache instead of being
+    recomputed, so changing e.g. whale_score_settings only recomputes whale_score.
+
+    Input checksums are kept in cache_dir/inputs.json with the size and mtime of
+    each file, so unchanged raw files are not read again.
+    """
+
+    def __init__(
+        self,
+        input_paths: Dict[str, str],
+        settings: Dict,
+        mode: str,
+        cache_dir: str = FEATURE_CACHE_DIR,
+        max_entries: int = 4,
+    ):
+        self.cache_dir = cache_dir
+        self.settings = settings
+        self.max_entries = max_entries
+        self._keys: Dict[str, str] = {}
+        self.fingerprint = {
+            "version": CACHE_VERSION,
+            "code": hashlib.sha1(
+                b"".join(file_checksum(path).encode() for path in CODE_FILES)
+            ).hexdigest(),
+            "mode": mode,
+            "day": str(pd.Timestamp.now().date()),
+        }
+        self.input_checksums = self._input_checksums(input_paths)
+
+    def _input_checksums(self, input_paths: Dict[str, str]) -> Dict[str, str]:
+        memo_path = f"{self.cache_dir}/inputs.json"
+        memo = {}
+        if os.path.exists(memo_path):
+            with open(memo_path, "rb") as f:
+                memo = loads(f.read())
+
+        checksums = {}
+        for source, path in input_paths.items():
+            if not path or not os.path.exists(path):
+                checksums[source] = None
+                continue
+            stat = os.stat(path)
+            record = memo.get(path)
+            if record is None or [record["size"], record["mtime_ns"]] != [
+                stat.st_size,
+                stat.st_mtime_ns,
+            ]:
+                record = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "checksum": file_checksum(path),
+                }
+                memo[path] = record
+            checksums[source] = record["checksum"]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(memo_path, "wb") as f:
+            f.write(dumps(memo))
+        return checksums
+
+    def key(self, name: str) -> str:
+        if name not in self._keys:
+            block = FEATURE_BLOCKS[name]
+            fingerprint = {
+                "block": name,
+                "version": self.fingerprint["version"],
+                "code": self.fingerprint["code"],
+                "mode": self.fingerprint["mode"],
+                "inputs": {
+                    source: self.input_checksums.get(source)
+                    for source in block.get("inputs", [])
+                },
+                "config": {key: self.settings[key] for key in block.get("config", [])},
+                "day": (
+                    self.fingerprint["day"] if block.get("relative_to_now") else None
+                ),
+                "dependencies": {
+                    dependency: self.key(dependency)
+                    for dependency in sorted(block_dependencies(name, self.settings))
+                },
+            }
+            self._keys[name] = hashlib.sha1(dumps(fingerprint)).hexdigest()
+        return self._keys[name]
+
+    def _path(self, name: str) -> str:
+        return f"{self.cache_dir}/{name}/{self.key(name)}.arrow"
+
+    def load(self, blocks: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Cached columns of each of blocks whose key is unchanged, indexed by address.
+        """
+        frames = {}
+        for name in blocks:
+            path = self._path(name)
+            if os.path.exists(path):
+                frames[name] = read_arrow_frame(path).set_index("address")
+                os.utime(path)  # most recently used, see store
+        if frames:
+            logging.info(
+                f"Loaded feature blocks from cache: {', '.join(sorted(frames))}"
+            )
+        return frames
+
+    def store(self, frames: Dict[str, pd.DataFrame]):
+        """
+        Caches the columns of each block (indexed by address), keeping the
+        max_entries most recently used keys of each block.
+        """
+        for name, frame in frames.items():
+            write_arrow(frame.rename_axis("address"), self._path(name))
+            entries = sorted(
+                glob.glob(f"{self.cache_dir}/{name}/*.arrow"),
+                key=os.path.getmtime,
+                reverse=True,
+            )
+            for path in entries[self.max_entries :]:
+                os.remove(path)
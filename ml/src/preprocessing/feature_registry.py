@@ -0,0 +1,193 @@
+import logging
+from fnmatch import fnmatchcase
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+
+# Feature blocks, in matching order: the feature columns each one computes (fnmatch
+# patterns, population norms included), the inputs it reads (raw data and catalogs),
+# the config keys it depends on, whether it is relative to the current time, and for
+# scores the settings whose weighted columns it depends on. A feature belongs to the
+# first block with a matching pattern, so the catch-all *_focus / *_ratio come last.
+FEATURE_BLOCKS = {
+    # assets distribution
+    "balances": {
+        "columns": [
+            "*_balance_usd",
+            "*_balance_usd_norm",
+            "*_balance_ratio",
+            "total_assets_usd",
+            "n_chains_with_asset",
+            "stable_token_ratio",
+            "meme_token_ratio",
+            "erc20_token_ratio",
+            "native_token_ratio",
+        ],
+        "inputs": ["txs", "tokens", "balance_snapshot"],
+        "config": ["use_balance_snapshot"],
+    },
+    "eth_flows": {
+        "columns": [
+            "user_received_eth",
+            "user_sent_eth",
+            "max_received_eth",
+            "max_sent_eth",
+            "*_eth_norm",
+            "user_net_flow_eth_log_abs_norm",
+        ],
+        "inputs": ["txs"],
+    },
+    "recent_activity": {
+        "columns": ["n_chains_with_activity"],
+        "inputs": ["txs"],
+        "relative_to_now": True,
+    },
+    "inflow_months": {
+        "columns": ["*_positive_inflow_months"],
+        "inputs": ["event_logs", "tokens"],
+        "config": ["assets_lookback_months"],
+        "relative_to_now": True,
+    },
+    "whale_score": {
+        "columns": ["whale_score"],
+        "config": ["whale_score_settings"],
+        "settings": "whale_score_settings",
+    },
+    # tx behavior
+    "protocol_counts": {
+        "columns": [
+            "total_protocol_count",
+            "total_protocol_type",
+            "total_protocol_count_norm",
+            "total_protocol_type_norm",
+        ],
+        "inputs": ["txs", "protocols"],
+    },
+    "method_counts": {
+        "columns": ["total_methods", "total_methods_norm", "method_diversity"],
+        "inputs": ["txs", "method_weights"],
+    },
+    "tx_counts": {
+        "columns": ["total_tx_count", "total_tx_count_norm"],
+        "inputs": ["txs"],
+    },
+    "flow_usd": {
+        "columns": ["avg_tx_usd_value_*", "total_tx_usd_value_*"],
+        "inputs": ["txs", "tokens"],
+    },
+    "activity": {
+        "columns": [
+            "active_days",
+            "active_tx_count",
+            "active_days_ratio",
+            "active_daily_txs",
+            "active_tx_count_norm",
+            "active_daily_txs_norm",
+        ],
+        "inputs": ["txs"],
+        "config": ["active_days_threshold"],
+        "relative_to_now": True,
+    },
+    "max_tx_bursts": {
+        "columns": ["max_tx_burst_*"],
+        "inputs": ["txs"],
+        "config": ["max_tx_burst_intervals"],
+    },
+    "most_used_protocols": {"columns": ["most_used_*"], "inputs": ["txs", "protocols"]},
+    "most_active_times": {
+        "columns": [
+            "most_active_weekday",
+            "most_active_1h_interval",
+            "most_active_4h_interval",
+        ],
+        "inputs": ["txs"],
+    },
+    "most_active_chain": {"columns": ["most_active_chain"], "inputs": ["txs"]},
+    "chain_focus": {
+        "columns": ["n_chains_used", "chain_focus", "chain_entropy", "chain_*_ratio"],
+        "inputs": ["txs"],
+    },
+    "tx_timing": {
+        "columns": [
+            "first_timestamp_dt",
+            "last_timestamp_dt",
+            "lifetime_days",
+            "lifetime_*_txs",
+            "lifetime_*_txs_norm",
+        ],
+        "inputs": ["txs"],
+    },
+    "active_score": {
+        "columns": ["active_score"],
+        "config": ["active_score_settings"],
+        "settings": "active_score_settings",
+    },
+    "protocol_focus": {"columns": ["*_focus"], "inputs": ["txs", "protocols"]},
+    "protocol_type_ratios": {"columns": ["*_ratio"], "inputs": ["txs", "protocols"]},
+}
+
+ALL_BLOCKS: FrozenSet[str] = frozenset(FEATURE_BLOCKS)
+ASSETS_DISTRIBUTION_BLOCKS: FrozenSet[str] = frozenset(
+    ["balances", "eth_flows", "recent_activity", "inflow_months", "whale_score"]
+)
+SCORE_BLOCKS: FrozenSet[str] = frozenset(
+    name for name, block in FEATURE_BLOCKS.items() if "settings" in block
+)
+
+
+def find_block(feature: str) -> Optional[str]:
+    for name, block in FEATURE_BLOCKS.items():
+        if any(fnmatchcase(feature, pattern) for pattern in block["columns"]):
+            return name
+    return None
+
+
+def block_dependencies(name: str, settings: Dict) -> Set[str]:
+    """
+    Blocks computing the columns weighted in the settings of a score block (none for
+    the other blocks).
+    """
+    settings_key = FEATURE_BLOCKS[name].get("settings")
+    dependencies = set()
+    for col in settings[settings_key] if settings_key else []:
+        dependency = find_block(col)
+        if dependency is None:
+            logging.warning(f"{settings_key}: no feature block computes {col}")
+            continue
+        dependencies.add(dependency)
+    return dependencies
+
+
+def resolve_blocks(features: Iterable[str], settings: Dict) -> Set[str]:
+    """
+    Dependency closure of the blocks computing features: their own blocks plus, for
+    a score, the blocks of the columns weighted in its settings (e.g.
+    whale_score_settings). All blocks when features is empty.
+    """
+    if not features:
+        return set(ALL_BLOCKS)
+
+    pending = []
+    for feature in features:
+        name = find_block(feature)
+        if name is None:
+            raise ValueError(f"No feature block computes {feature}")
+        pending.append(name)
+
+    blocks = set()
+    while pending:
+        name = pending.pop()
+        if name in blocks:
+            continue
+        blocks.add(name)
+        pending.extend(block_dependencies(name, settings))
+
+    return blocks
+
+
+def required_inputs(blocks: Iterable[str]) -> Set[str]:
+    """
+    Inputs ("txs", "event_logs", catalogs) read by blocks (e.g. a resolve_blocks
+    closure).
+    """
+    return {
+        source for name in blocks for source in FEATURE_BLOCKS[name].get("inputs", [])
+    }
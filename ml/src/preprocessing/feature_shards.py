@@ -0,0 +1,87 @@
+import logging
+import os
+import shutil
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml.config.catalogs import get_protocol_index
+
+SHARDS_DIR = "ml/data/raw/shards"
+
+
+def shard_of(addresses: pd.Series, n_shards: int) -> np.ndarray:
+    """
+    Stable shard number of each address (case-insensitive).
+    """
+    hashes = pd.util.hash_pandas_object(addresses.astype(str).str.lower(), index=False)
+    return (hashes.to_numpy() % n_shards).astype(int)
+
+
+def _append(df: pd.DataFrame, path: str):
+    df.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+
+def partition_raw_data(
+    txs_path: str,
+    event_logs_path: str,
+    n_shards: int,
+    shards_dir: str = SHARDS_DIR,
+    chunksize: int = 200_000,
+) -> Dict[str, Any]:
+    """
+    Splits the raw transactions by address hash into n_shards files, streaming them in
+    chunks. An event log goes to the shards of both its from and to addresses, since
+    inflow features of an address read every log sent to or from it.
+    Also returns the protocol types and chain ids of the whole population, which fix
+    the per-type / per-chain feature columns of every shard.
+    """
+    shutil.rmtree(shards_dir, ignore_errors=True)
+    os.makedirs(shards_dir)
+    protocol_types = {key: meta["type"] for key, meta in get_protocol_index().items()}
+    shards = [
+        {
+            "txs_path": f"{shards_dir}/txs_{i}.csv",
+            "event_logs_path": f"{shards_dir}/event_logs_{i}.csv",
+        }
+        for i in range(n_shards)
+    ]
+
+    seen_types, seen_chain_ids = set(), set()
+    for chunk in pd.read_csv(txs_path, chunksize=chunksize, low_memory=False):
+        keys = zip(chunk["chain_id"], chunk["to"])
+        seen_types.update(protocol_types.get(key, "Unknown") for key in keys)
+        seen_chain_ids.update(chunk["chain_id"].dropna().unique().tolist())
+        for i, part in chunk.groupby(shard_of(chunk["address"], n_shards)):
+            _append(part, shards[i]["txs_path"])
+
+    for chunk in pd.read_csv(event_logs_path, chunksize=chunksize, low_memory=False):
+        to_shard = shard_of(chunk["to"], n_shards)
+        from_shard = shard_of(chunk["from"], n_shards)
+        for i in range(n_shards):
+            part = chunk[(to_shard == i) | (from_shard == i)]
+            if not part.empty:
+                _append(part, shards[i]["event_logs_path"])
+
+    shards = [shard for shard in shards if os.path.exists(shard["txs_path"])]
+    event_logs_header = pd.read_csv(event_logs_path, nrows=0)
+    for shard in shards:
+        if not os.path.exists(shard["event_logs_path"]):
+            event_logs_header.to_csv(shard["event_logs_path"], index=False)
+    logging.info(f"Partitioned raw data into {len(shards)} shards in {shards_dir}")
+
+    return {
+        "shards": shards,
+        "protocol_types": sorted(seen_types),
+        "chain_ids": sorted(seen_chain_ids),
+    }
+
+
+def read_shard(shard: Dict[str, str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Loads the transactions and event logs of one shard.
+    """
+    df = pd.read_csv(shard["txs_path"], low_memory=False)
+    event_logs_df = pd.read_csv(shard["event_logs_path"], low_memory=False)
+    return df, event_logs_df
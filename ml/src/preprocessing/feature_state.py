@@ -0,0 +1,264 @@
+import hashlib
+import io
+import logging
+import os
+import shutil
+from typing import Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from ml.config.catalogs import load_tokens
+from ml.src.preprocessing.feature_registry import (
+    ALL_BLOCKS,
+    required_inputs,
+    resolve_blocks,
+)
+from ml.src.preprocessing.features_engineering import (
+    AGGREGATE_TABLES,
+    INFLOW_TOKENS,
+    check_balance_source,
+    derive_assets_distribution,
+    derive_tx_behavior,
+    fold_aggregates,
+    get_config_value,
+    get_token_contracts,
+    merge_and_save_features,
+    normalize_assets_distribution,
+    normalize_tx_behavior,
+    save_features,
+    summarize_event_logs,
+    summarize_transactions,
+)
+from ml.src.utils.json_io import dumps, loads
+
+STATE_DIR = "ml/data/raw/state"
+STATE_VERSION = 1
+# bytes before the folded offset checked to tell an append from a rewrite
+CHECKSUM_BYTES = 1 << 16
+
+SOURCE_TABLES = {
+    "txs": ["chains", "protocols", "methods", "activity"],
+    "event_logs": ["token_flows"],
+}
+SUMMARIZERS = {
+    "txs": summarize_transactions,
+    "event_logs": lambda chunk, _: summarize_event_logs(chunk),
+}
+
+
+def _source_record(f, offset: int, rows: int) -> Dict:
+    start = max(0, offset - CHECKSUM_BYTES)
+    f.seek(start)
+    checksum = hashlib.sha1(f.read(offset - start)).hexdigest()
+    return {"offset": offset, "rows": rows, "checksum": checksum}
+
+
+def _line_end(f, start: int, end: int) -> int:
+    """
+    Offset just after the last newline of f in [start, end), or start if none.
+    """
+    pos = end
+    while pos > start:
+        block_start = max(start, pos - CHECKSUM_BYTES)
+        f.seek(block_start)
+        i = f.read(pos - block_start).rfind(b"\n")
+        if i >= 0:
+            return block_start + i + 1
+        pos = block_start
+    return start
+
+
+class _ByteRange(io.RawIOBase):
+    """
+    Read-only view of an open file up to end, to stream rows appended up to a point.
+    """
+
+    def __init__(self, f, end: int):
+        self.f = f
+        self.end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = min(len(buffer), self.end - self.f.tell())
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class FeatureState:
+    """
+    Mergeable per-address aggregates of the raw transactions and event logs, kept in
+    state_dir across runs: tx counts, ETH sums / maxes, first / last timestamps and
+    balance sums per (address, chain_id); protocol (by `to`) and method histograms;
+    hourly activity counts, from which active days, burst windows and most active
+    hours / weekdays are derived; hourly WBTC / WETH flows.
+
+    update() folds only the rows appended to the raw CSVs since the last run, so a
+    refresh costs time proportional to the new rows plus the (much smaller) state.
+    A raw CSV rewritten by a full collection, a change of the token contracts or of
+    STATE_VERSION rebuilds the affected tables from scratch.
+    """
+
+    def __init__(self, state_dir: str = STATE_DIR):
+        self.state_dir = state_dir
+        self.tables: Dict[str, pd.DataFrame] = {}
+        self.meta = {"fingerprint": self._fingerprint(), "sources": {}}
+
+    @staticmethod
+    def _fingerprint() -> str:
+        contracts = {
+            token: sorted(
+                f"{chain_id}:{address.lower()}"
+                for chain_id, address in get_token_contracts(
+                    token, load_tokens()
+                ).items()
+            )
+            for token in INFLOW_TOKENS
+        }
+        return hashlib.sha1(
+            dumps({"version": STATE_VERSION, "contracts": contracts})
+        ).hexdigest()
+
+    @classmethod
+    def load(cls, state_dir: str = STATE_DIR) -> "FeatureState":
+        state = cls(state_dir)
+        meta_path = f"{state_dir}/meta.json"
+        if not os.path.exists(meta_path):
+            return state
+        with open(meta_path, "rb") as f:
+            meta = loads(f.read())
+        if meta.get("fingerprint") != state.meta["fingerprint"]:
+            logging.info("Feature state is outdated, rebuilding it.")
+            return state
+        state.meta = meta
+        for name in AGGREGATE_TABLES:
+            path = f"{state_dir}/{name}.arrow"
+            if os.path.exists(path):
+                state.tables[name] = feather.read_table(path).to_pandas()
+        return state
+
+    def save(self):
+        """
+        Writes the tables and meta next to the current state, then swaps them in, so
+        an interrupted save never leaves offsets that do not match the tables.
+        """
+        tmp_dir = f"{self.state_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, table in self.tables.items():
+            feather.write_feather(
+                pa.Table.from_pandas(table, preserve_index=False),
+                f"{tmp_dir}/{name}.arrow",
+            )
+        with open(f"{tmp_dir}/meta.json", "wb") as f:
+            f.write(dumps(self.meta))
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.state_dir)
+        logging.info(f"Feature state saved to {self.state_dir}")
+
+    def fold(self, source: str, path: str, chunksize: int = 200_000) -> int:
+        """
+        Folds the rows appended to the raw CSV at path into the tables of source.
+        Returns the number of rows folded.
+        """
+        if not os.path.exists(path):
+            return 0
+        size = os.path.getsize(path)
+        record = self.meta["sources"].get(source)
+        with open(path, "rb") as f:
+            header = f.readline()
+            is_append = (
+                record is not None
+                and record["offset"] <= size
+                and _source_record(f, record["offset"], record["rows"]) == record
+            )
+            if not is_append:
+                if record is not None:
+                    logging.info(f"{path} was rewritten, rebuilding its state.")
+                for name in SOURCE_TABLES[source]:
+                    self.tables.pop(name, None)
+                record = {"offset": len(header), "rows": 0}
+
+            # stop after the last complete line, a writer may be halfway through one
+            end = _line_end(f, record["offset"], size)
+            folded = 0
+            if end > record["offset"]:
+                f.seek(record["offset"])
+                folded = fold_aggregates(
+                    self.tables,
+                    pd.read_csv(
+                        io.BufferedReader(_ByteRange(f, end)),
+                        header=None,
+                        names=pd.read_csv(io.BytesIO(header), nrows=0).columns,
+                        chunksize=chunksize,
+                        low_memory=False,
+                    ),
+                    SUMMARIZERS[source],
+                    first_row=record["rows"],
+                )
+            self.meta["sources"][source] = _source_record(
+                f, end, record["rows"] + folded
+            )
+
+        logging.info(f"Folded {folded} new rows of {path} into the feature state.")
+        return folded
+
+    def update(self, txs_path: str, event_logs_path: str, chunksize: int = 200_000):
+        self.fold("txs", txs_path, chunksize)
+        self.fold("event_logs", event_logs_path, chunksize)
+
+
+if __name__ == "__main__":
+    logging.info("Loading features engineering config...")
+    columns_to_features = get_config_value("features")
+    active_days_threshold = get_config_value("active_days_threshold")
+    assets_lookback_months = get_config_value("assets_lookback_months")
+    whale_score_settings = get_config_value("whale_score_settings")
+    active_score_settings = get_config_value("active_score_settings")
+    max_tx_burst_intervals = get_config_value("max_tx_burst_intervals")
+    use_balance_snapshot = get_config_value("use_balance_snapshot")
+    check_balance_source(use_balance_snapshot)
+    chunksize = get_config_value("chunksize") or 200_000
+    blocks = set(ALL_BLOCKS)
+    if get_config_value("lazy_features"):
+        blocks = resolve_blocks(
+            columns_to_features,
+            {
+                "whale_score_settings": whale_score_settings,
+                "active_score_settings": active_score_settings,
+            },
+        )
+
+    logging.info("Folding new raw data into the feature state...")
+    state = FeatureState.load()
+    state.fold("txs", "ml/data/raw/collected_txs_all.csv", chunksize)
+    if "event_logs" in required_inputs(blocks):
+        state.fold("event_logs", "ml/data/raw/event_logs_all.csv", chunksize)
+    state.save()
+
+    logging.info("Deriving assets distribution...")
+    assets_distribution_df, net_flow_log = derive_assets_distribution(
+        state.tables, assets_lookback_months, use_balance_snapshot, blocks
+    )
+    assets_distribution_df = normalize_assets_distribution(
+        assets_distribution_df, net_flow_log, whale_score_settings, blocks
+    )
+    save_features(assets_distribution_df, "assets_distribution")
+
+    logging.info("Deriving tx behavior...")
+    tx_behavior_df = derive_tx_behavior(
+        state.tables, active_days_threshold, max_tx_burst_intervals, blocks
+    )
+    tx_behavior_df = normalize_tx_behavior(
+        tx_behavior_df, active_score_settings, blocks
+    )
+    save_features(tx_behavior_df, "tx_behavior")
+
+    logging.info("Merging and saving features...")
+    merge_and_save_features(assets_distribution_df, tx_behavior_df, columns_to_features)
@@ -1,20 +1,70 @@
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List
 
 import numpy as np
 import pandas as pd
-import pyarrow as pa
-import pyarrow.feather as feather
 
+from ml.config.catalogs import (
+    PROTOCOLS_PATH,
+    TOKENS_PATH,
+    get_protocol_index,
+    load_tokens,
+)
+from ml.config.collect_raw_data_config import COLLECT_RAW_DATA_DEFAULT_CONFIG
 from ml.config.features_engineering_config import FEATURES_ENGINEERING_DEFAULT_CONFIG
-from ml.config.method_weights import METHOD_WEIGHTS
-from ml.config.protocols import PROTOCOLS
-from ml.config.tokens import TOKENS
-from ml.config.training_configs import FEATURES_ENGINEERING_CONFIG
+from ml.config.training_configs import (
+    COLLECT_RAW_DATA_CONFIG,
+    FEATURES_ENGINEERING_CONFIG,
+)
+from ml.src.preprocessing.balance_store import (
+    BALANCE_SNAPSHOT_PATH,
+    load_balance_snapshot,
+)
+from ml.src.preprocessing.concentration import (
+    calc_grouped_entropy,
+    calc_grouped_hhi,
+    calc_grouped_normalized_entropy,
+    first_max_rows,
+    group_weights,
+    grouped_shares,
+)
+from ml.src.preprocessing.duckdb_aggregates import aggregate_tables
+from ml.src.preprocessing.feature_cache import FeatureCache
+from ml.src.preprocessing.feature_registry import (
+    ALL_BLOCKS,
+    ASSETS_DISTRIBUTION_BLOCKS,
+    FEATURE_BLOCKS,
+    SCORE_BLOCKS,
+    find_block,
+    required_inputs,
+    resolve_blocks,
+)
+from ml.src.preprocessing.feature_shards import partition_raw_data, read_shard
+from ml.src.preprocessing.method_classifier import MethodClassifier
+from ml.src.utils.arrow_io import write_arrow
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+INFLOW_TOKENS = ["WBTC", "WETH"]
+# feature blocks reading the protocol names / types of the txs
+PROTOCOL_BLOCKS = frozenset(
+    ["protocol_counts", "protocol_type_ratios", "protocol_focus", "most_used_protocols"]
+)
+# keys of the mergeable per-address aggregates, see summarize_transactions; their
+# tx_count counts rows, which matches the distinct hashes of the raw rows mode as
+# the collector and tail writer store each (address, chain_id, hash) once
+AGGREGATE_TABLES = {
+    "chains": ["address", "chain_id"],
+    "protocols": ["address", "chain_id", "to"],
+    "methods": ["address", "chain_id", "functionName"],
+    "activity": ["address", "chain_id", "hour_start"],
+    "token_flows": ["token", "address", "hour_start"],
+}
+
 
 def get_config_value(key):
     return FEATURES_ENGINEERING_CONFIG.get(
@@ -22,6 +72,21 @@ def get_config_value(key):
     )
 
 
+def check_balance_source(use_balance_snapshot: bool):
+    """
+    Balances collected with balance_source "snapshot" are only in the balance
+    snapshot, so the balance features need use_balance_snapshot.
+    """
+    balance_source = COLLECT_RAW_DATA_CONFIG.get(
+        "balance_source", COLLECT_RAW_DATA_DEFAULT_CONFIG.get("balance_source")
+    )
+    if balance_source == "snapshot" and not use_balance_snapshot:
+        raise ValueError(
+            "balance_source 'snapshot' requires use_balance_snapshot, "
+            "the raw transactions carry no balances"
+        )
+
+
 def parse_transaction_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     df["timeStamp"] = pd.to_numeric(df["timeStamp"], errors="coerce")
@@ -31,40 +96,70 @@ def parse_transaction_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def get_method_name(function_name):
-    for key in METHOD_WEIGHTS:
-        if key in str(function_name).lower():
-            return key
-    return None
-
-
-def get_method_weight(function_name):
-    for key, value in METHOD_WEIGHTS.items():
-        if key in str(function_name).lower():
-            return value
-    return 0
-
-
-def get_user_sent_eth(subdf):
-    address = subdf.name[0]
-    return (subdf.loc[subdf["from"] == address, "value"].sum() / 1e18).round(2)
-
+def join_balance_snapshot(df: pd.DataFrame, snapshot: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces the *_balance / *_balance_usd columns collected with the transactions by the
+    last-known balances of the balance snapshot, valued at the current TOKENS prices.
+    """
+    snapshot = snapshot.copy()
+    snapshot["chain_id"] = snapshot["chain_id"].astype(int)
+    snapshot["token"] = snapshot["token"].astype(str)
+    prices = pd.DataFrame(
+        [
+            {"chain_id": chain_id, "token": symbol, "price": info["price"]}
+            for chain_id, tokens in load_tokens().items()
+            for symbol, info in tokens.items()
+        ]
+    )
+    snapshot = snapshot.merge(prices, on=["chain_id", "token"], how="left")
+    snapshot["balance_usd"] = (snapshot["balance"] * snapshot["price"]).round(4)
+    wide = snapshot.pivot_table(
+        index=["address", "chain_id"],
+        columns="token",
+        values=["balance", "balance_usd"],
+        aggfunc="last",
+    )
+    wide.columns = [f"{token.lower()}_{value}" for value, token in wide.columns]
+    symbols = sorted({symbol for tokens in load_tokens().values() for symbol in tokens})
+    balance_columns = [
+        f"{symbol.lower()}_{value}"
+        for symbol in symbols
+        for value in ["balance", "balance_usd"]
+    ]
+    wide = wide.reindex(columns=balance_columns).fillna(0).reset_index()
 
-def get_user_received_eth(subdf):
-    address = subdf.name[0]
-    return (subdf.loc[subdf["to"] == address, "value"].sum() / 1e18).round(2)
+    df = df.drop(columns=[col for col in balance_columns if col in df.columns])
+    df = df.merge(wide, on=["address", "chain_id"], how="left")
+    df[balance_columns] = df[balance_columns].fillna(0)
 
+    return df
 
-def get_max_received_eth(subdf):
-    address = subdf.name[0]
-    vals = subdf.loc[subdf["to"] == address, "value"]
-    return (vals.max() / 1e18).round(2) if not vals.empty else 0
 
+def calc_eth_flows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    ETH received / sent (total and max) per (address, chain_id), in one grouped pass:
+    values are masked by direction first, so no per-group filtering is needed.
+    """
+    flows = pd.DataFrame(
+        {
+            "address": df["address"],
+            "chain_id": df["chain_id"],
+            "received": df["value"].where(df["to"] == df["address"]),
+            "sent": df["value"].where(df["from"] == df["address"]),
+        }
+    )
+    grouped = flows.groupby(["address", "chain_id"])
+    eth_flows = pd.concat(
+        [
+            grouped["received"].sum().rename("user_received_eth"),
+            grouped["sent"].sum().rename("user_sent_eth"),
+            grouped["received"].max().rename("max_received_eth"),
+            grouped["sent"].max().rename("max_sent_eth"),
+        ],
+        axis=1,
+    )
 
-def get_max_sent_eth(subdf):
-    address = subdf.name[0]
-    vals = subdf.loc[subdf["from"] == address, "value"]
-    return (vals.max() / 1e18).round(2) if not vals.empty else 0
+    return (eth_flows / 1e18).round(2).fillna(0)
 
 
 def calc_minmax_norm(features, col, round_to=2):
@@ -84,21 +179,13 @@ def calc_minmax_norm(features, col, round_to=2):
     return features
 
 
-def calc_weighted_method_entropy(subdf):
-    method_counts = subdf.groupby("functionName")["method_weight"].sum()
-    total = method_counts.sum()
-    if total == 0:
-        return 0
-    probs = method_counts / total
-    probs = probs[probs > 0]
-    entropy = -np.sum(probs * np.log(probs))
-    # normalize to 0~1
-    max_entropy = np.log(len(method_counts)) if len(method_counts) > 1 else 1
-    return round(entropy / max_entropy, 2) if max_entropy > 0 else 0
-
-
-def calc_hhi(ratios):
-    return round((ratios**2).sum(), 2)
+def align_blocks(index: pd.Index, blocks: list) -> pd.DataFrame:
+    """
+    Assembles feature blocks (DataFrames / named Series indexed by address) into one
+    frame on the shared address index, in a single concatenation instead of a chain
+    of merges. Addresses missing from a block get NaN, like a left merge.
+    """
+    return pd.concat([block.reindex(index) for block in blocks], axis=1)
 
 
 def calc_protocol_type_ratio(group, protocol_type):
@@ -109,29 +196,26 @@ def calc_protocol_type_ratio(group, protocol_type):
 
 
 def calc_protocol_focus(
-    df: pd.DataFrame, unknown_type: str = "unknown", fillna_focus: float = 0
+    df: pd.DataFrame,
+    unknown_type: str = "unknown",
+    fillna_focus: float = 0,
+    protocol_types: list = None,
+    weight_col: str = None,
 ) -> pd.DataFrame:
-    grouped = (
-        df.groupby(["address", "protocol_type", "protocol_name"])
-        .size()
-        .reset_index(name="count")
+    shares = grouped_shares(
+        df, ["address", "protocol_type"], "protocol_name", weight_col
     )
-    total = (
-        grouped.groupby(["address", "protocol_type"])["count"]
-        .sum()
-        .reset_index(name="total_count")
-    )
-    merged = pd.merge(grouped, total, on=["address", "protocol_type"])
-    merged["ratio"] = merged["count"] / merged["total_count"]
     protocol_type_focus = (
-        merged.groupby(["address", "protocol_type"])["ratio"]
-        .apply(calc_hhi)
+        calc_grouped_hhi(shares, ["address", "protocol_type"])
+        .round(2)
         .reset_index(name="protocol_type_focus")
     )
     focus_pivot = protocol_type_focus.pivot(
         index="address", columns="protocol_type", values="protocol_type_focus"
     )
-    focus_pivot = focus_pivot.add_suffix("_focus").reset_index()
+    if protocol_types is not None:
+        focus_pivot = focus_pivot.reindex(columns=protocol_types)
+    focus_pivot = focus_pivot.add_suffix("_focus")
     focus_pivot.columns = [col.lower() for col in focus_pivot.columns]
 
     if f"{unknown_type}_focus" in focus_pivot.columns:
@@ -141,20 +225,22 @@ def calc_protocol_focus(
 
 
 def calc_most_used_protocols(
-    df: pd.DataFrame, unknown_type: str = "unknown", fillna_protocol: str = "unknown"
+    df: pd.DataFrame,
+    unknown_type: str = "unknown",
+    fillna_protocol: str = "unknown",
+    protocol_types: list = None,
+    weight_col: str = None,
 ) -> pd.DataFrame:
-    grouped = (
-        df.groupby(["address", "protocol_type", "protocol_name"])
-        .size()
-        .reset_index(name="count")
+    weights = df[weight_col] if weight_col else pd.Series(1, index=df.index)
+    # weight of each row's (address, protocol_type, protocol_name), without merge-back
+    counts = weights.groupby(
+        [df["address"], df["protocol_type"], df["protocol_name"]]
+    ).transform("sum")
+    most_used_protocol = first_max_rows(
+        df[["address", "protocol_type", "protocol_name", "chain_id"]],
+        ["address", "protocol_type"],
+        counts,
     )
-    df_with_counts = df.merge(
-        grouped, on=["address", "protocol_type", "protocol_name"], how="left"
-    )
-    idx = df_with_counts.groupby(["address", "protocol_type"])["count"].idxmax()
-    most_used_protocol = df_with_counts.loc[
-        idx, ["address", "protocol_type", "protocol_name", "chain_id"]
-    ]
     most_used_protocol["most_used_protocol_name"] = (
         most_used_protocol["protocol_name"].astype(str)
         + "_"
@@ -166,7 +252,9 @@ def calc_most_used_protocols(
     merged_pivot = most_used_protocol.pivot(
         index="address", columns="protocol_type", values="most_used_protocol_name"
     )
-    merged_pivot = merged_pivot.add_prefix("most_used_").reset_index()
+    if protocol_types is not None:
+        merged_pivot = merged_pivot.reindex(columns=protocol_types)
+    merged_pivot = merged_pivot.add_prefix("most_used_")
     merged_pivot.columns = [col.lower() for col in merged_pivot.columns]
 
     if f"most_used_{unknown_type}" in merged_pivot.columns:
@@ -175,28 +263,18 @@ def calc_most_used_protocols(
     return merged_pivot.fillna(fillna_protocol)
 
 
-def calc_protocol_type_ratios(df: pd.DataFrame) -> pd.DataFrame:
-    type_count = (
-        df.groupby(["address", "protocol_type"]).size().reset_index(name="type_count")
-    )
-    total_type_count = (
-        type_count.groupby("address")["type_count"]
-        .sum()
-        .reset_index(name="total_type_count")
-    )
-    type_count_df = pd.merge(type_count, total_type_count, on="address", how="left")
-    type_count_df["protocol_type_ratio"] = (
-        type_count_df["type_count"] / type_count_df["total_type_count"]
-    )
-    type_ratios = type_count_df.pivot(
-        index="address", columns="protocol_type", values="protocol_type_ratio"
-    ).fillna(0)
+def calc_protocol_type_ratios(
+    df: pd.DataFrame, protocol_types: list = None, weight_col: str = None
+) -> pd.DataFrame:
+    type_count = group_weights(df, ["address", "protocol_type"], weight_col)
+    total_type_count = type_count.groupby(level="address").transform("sum")
+    type_ratios = (type_count / total_type_count).unstack("protocol_type")
+    if protocol_types is not None:
+        type_ratios = type_ratios.reindex(columns=protocol_types)
+    type_ratios = type_ratios.fillna(0)
     type_ratios.columns = [f"{col.lower()}_ratio" for col in type_ratios.columns]
-    type_ratios = type_ratios.reset_index()
-    num_cols = type_ratios.select_dtypes(include="number").columns
-    type_ratios[num_cols] = np.floor(type_ratios[num_cols] * 100) / 100
 
-    return type_ratios
+    return np.floor(type_ratios * 100) / 100
 
 
 def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -207,43 +285,31 @@ def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def calc_most_active_time_features(df: pd.DataFrame) -> tuple:
-    counts_1h_interval = (
-        df.groupby(["address", "hour"]).size().reset_index(name="count")
-    )
-    idx = counts_1h_interval.groupby("address")["count"].idxmax()
-    most_active_1h_interval = counts_1h_interval.loc[idx, ["address", "hour"]]
-    most_active_1h_interval = most_active_1h_interval.rename(
-        columns={"hour": "most_active_1h_interval"}
-    )
+def _most_active(
+    df: pd.DataFrame, col: str, name: str, weight_col: str = None
+) -> pd.Series:
+    """
+    Value of col with the most txs of each address (the smallest one on ties).
+    """
+    counts = group_weights(df, ["address", col], weight_col).reset_index(name="count")
+    most_active = first_max_rows(counts, ["address"], counts["count"])
+    return most_active.set_index("address")[col].rename(name)
 
-    counts_4h_interval = (
-        df.groupby(["address", "4h_interval"]).size().reset_index(name="count")
-    )
-    idx = counts_4h_interval.groupby("address")["count"].idxmax()
-    most_active_4h_interval = counts_4h_interval.loc[idx, ["address", "4h_interval"]]
-    most_active_4h_interval = most_active_4h_interval.rename(
-        columns={"4h_interval": "most_active_4h_interval"}
-    )
 
-    weekday_counts = df.groupby(["address", "weekday"]).size().reset_index(name="count")
-    idx = weekday_counts.groupby("address")["count"].idxmax()
-    most_active_weekday = weekday_counts.loc[idx, ["address", "weekday"]]
-    most_active_weekday = most_active_weekday.rename(
-        columns={"weekday": "most_active_weekday"}
+def calc_most_active_time_features(df: pd.DataFrame, weight_col: str = None) -> tuple:
+    most_active_1h_interval = _most_active(
+        df, "hour", "most_active_1h_interval", weight_col
     )
+    most_active_4h_interval = _most_active(
+        df, "4h_interval", "most_active_4h_interval", weight_col
+    )
+    most_active_weekday = _most_active(df, "weekday", "most_active_weekday", weight_col)
 
     return most_active_1h_interval, most_active_4h_interval, most_active_weekday
 
 
-def calc_most_active_chain(df: pd.DataFrame) -> pd.DataFrame:
-    chain_counts = df.groupby(["address", "chain_id"]).size().reset_index(name="count")
-    idx = chain_counts.groupby("address")["count"].idxmax()
-    most_active_chain = chain_counts.loc[idx, ["address", "chain_id"]]
-    most_active_chain = most_active_chain.rename(
-        columns={"chain_id": "most_active_chain"}
-    )
-    return most_active_chain
+def calc_most_active_chain(df: pd.DataFrame, weight_col: str = None) -> pd.Series:
+    return _most_active(df, "chain_id", "most_active_chain", weight_col)
 
 
 def calc_protocol_type_focus(
@@ -251,81 +317,98 @@ def calc_protocol_type_focus(
     unknown_type: str = "unknown",
     fillna_focus: float = 0,
     fillna_protocol: str = "unknown",
+    protocol_types: list = None,
+    blocks: frozenset = ALL_BLOCKS,
 ) -> pd.DataFrame:
-    df_with_time = add_time_features(df)
-    protocol_focus = calc_protocol_focus(df_with_time, unknown_type, fillna_focus)
-    most_used_protocols = calc_most_used_protocols(
-        df_with_time, unknown_type, fillna_protocol
-    )
-    protocol_type_ratios = calc_protocol_type_ratios(df_with_time)
-    most_active_1h, most_active_4h, most_active_weekday = (
-        calc_most_active_time_features(df_with_time)
-    )
-    most_active_chain = calc_most_active_chain(df_with_time)
-    result = protocol_type_ratios.merge(protocol_focus, on="address", how="left")
-    result = result.merge(most_used_protocols, on="address", how="left")
-    result = result.merge(most_active_weekday, on="address", how="left")
-    result = result.merge(most_active_1h, on="address", how="left")
-    result = result.merge(most_active_4h, on="address", how="left")
-    result = result.merge(most_active_chain, on="address", how="left")
-
-    return result
+    """
+    protocol_types fixes the per-type columns (sorted protocol_type values) instead of
+    deriving them from df, so that shards of the same population get the same columns.
+    Returns None when blocks has none of these features.
+    """
+    protocol_focus, most_used_protocols, protocol_type_ratios = None, None, None
+    most_active_times, most_active_chain = None, None
+    if "protocol_focus" in blocks:
+        protocol_focus = calc_protocol_focus(
+            df, unknown_type, fillna_focus, protocol_types
+        )
+    if "most_used_protocols" in blocks:
+        most_used_protocols = calc_most_used_protocols(
+            df, unknown_type, fillna_protocol, protocol_types
+        )
+    if "protocol_type_ratios" in blocks:
+        protocol_type_ratios = calc_protocol_type_ratios(df, protocol_types)
+    if "most_active_times" in blocks:
+        most_active_times = calc_most_active_time_features(add_time_features(df))
+    if "most_active_chain" in blocks:
+        most_active_chain = calc_most_active_chain(df)
+
+    return combine_protocol_type_focus(
+        protocol_type_ratios,
+        protocol_focus,
+        most_used_protocols,
+        most_active_times,
+        most_active_chain,
+    )
+
+
+def combine_protocol_type_focus(
+    protocol_type_ratios: pd.DataFrame,
+    protocol_focus: pd.DataFrame,
+    most_used_protocols: pd.DataFrame,
+    most_active_times: tuple,
+    most_active_chain: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Per-address protocol and activity focus blocks in one frame; None blocks (not
+    computed) are left out, None when all are.
+    """
+    most_active_1h, most_active_4h, most_active_weekday = most_active_times or (
+        None,
+        None,
+        None,
+    )
+    blocks = [
+        block
+        for block in [
+            protocol_type_ratios,
+            protocol_focus,
+            most_used_protocols,
+            most_active_weekday,
+            most_active_1h,
+            most_active_4h,
+            most_active_chain,
+        ]
+        if block is not None
+    ]
+    if not blocks:
+        return None
 
+    return align_blocks(blocks[0].index, blocks)
 
-def calc_shannon_entropy(x):
-    x = x[x > 0]
-    entropy = -(x * np.log2(x)).sum() if len(x) > 0 else 0
-    entropy = abs(entropy)
-    return round(entropy, 2)
 
+def calc_chain_focus_and_ratios(df, chain_ids: list = None, weight_col: str = None):
+    shares = grouped_shares(df, ["address"], "chain_id", weight_col)
+    n_chains_used = shares.groupby("address")["chain_id"].nunique()
+    chain_entropy = calc_grouped_entropy(shares, ["address"], np.log2).round(2)
 
-def calc_chain_focus_and_ratios(df):
-    chain_counts = df.groupby(["address", "chain_id"]).size().reset_index(name="count")
-    total_counts = (
-        chain_counts.groupby("address")["count"].sum().reset_index(name="total_count")
-    )
-    n_chains_used = (
-        chain_counts.groupby("address")["chain_id"]
-        .nunique()
-        .reset_index(name="n_chains_used")
-    )
+    chain_ratios = shares.pivot(index="address", columns="chain_id", values="share")
+    if chain_ids is not None:
+        chain_ratios = chain_ratios.reindex(columns=chain_ids)
+    chain_ratios = chain_ratios.fillna(0)
+    chain_ratios.columns = [f"chain_{col}_ratio" for col in chain_ratios.columns]
+    chain_ratios = chain_ratios.round(2)
 
-    merged = pd.merge(chain_counts, total_counts, on="address")
-    merged["chain_ratio"] = merged["count"] / merged["total_count"]
-    chain_focus = (
-        merged.groupby("address")["chain_ratio"]
-        .apply(calc_hhi)
-        .reset_index(name="chain_focus")
-    )
-    chain_entropy = (
-        merged.groupby("address")["chain_ratio"]
-        .apply(calc_shannon_entropy)
-        .reset_index(name="chain_entropy")
+    result = pd.DataFrame(
+        {
+            "n_chains_used": n_chains_used,
+            "chain_focus": calc_grouped_hhi(shares, ["address"]).round(2),
+            "chain_entropy": (chain_entropy / np.log2(n_chains_used))
+            .where(n_chains_used > 1, 0)
+            .round(2),
+        }
     )
 
-    chain_ratios = merged.pivot(
-        index="address", columns="chain_id", values="chain_ratio"
-    ).fillna(0)
-    chain_ratios.columns = [f"chain_{col}_ratio" for col in chain_ratios.columns]
-    chain_ratios = chain_ratios.reset_index()
-    num_cols = chain_ratios.select_dtypes(include="number").columns
-    chain_ratios[num_cols] = chain_ratios[num_cols].round(2)
-
-    result = (
-        n_chains_used.merge(chain_focus, on="address")
-        .merge(chain_entropy, on="address")
-        .merge(chain_ratios, on="address")
-    )
-    result["chain_entropy"] = result.apply(
-        lambda row: (
-            round(row["chain_entropy"] / np.log2(row["n_chains_used"]), 2)
-            if row["n_chains_used"] > 1
-            else 0
-        ),
-        axis=1,
-    )
-
-    return result
+    return align_blocks(result.index, [result, chain_ratios])
 
 
 def abs_minmax(series):
@@ -340,37 +423,59 @@ def abs_minmax(series):
     return result.abs()
 
 
-def calc_positive_inflow_months(df, token_symbol):
-    to_in = (
-        df.groupby(["to", "year_month"])["amount"].sum().reset_index(name="in_amount")
-    )
+def calc_token_flows(df: pd.DataFrame, period_col: str = "year_month") -> pd.DataFrame:
+    """
+    Amount received (in_amount) and sent (out_amount) by each address per period,
+    from the token's event logs.
+    """
+    to_in = df.groupby(["to", period_col])["amount"].sum().reset_index(name="in_amount")
     from_out = (
-        df.groupby(["from", "year_month"])["amount"]
-        .sum()
-        .reset_index(name="out_amount")
+        df.groupby(["from", period_col])["amount"].sum().reset_index(name="out_amount")
     )
     merged = pd.merge(
         to_in,
         from_out,
-        left_on=["to", "year_month"],
-        right_on=["from", "year_month"],
+        left_on=["to", period_col],
+        right_on=["from", period_col],
         how="outer",
     )
     merged["address"] = merged["to"].combine_first(merged["from"])
     for col in ["in_amount", "out_amount"]:
         merged[col] = merged[col].fillna(0)
         merged[col] = merged[col].astype(float)
-    merged["net_inflow"] = merged["in_amount"] - merged["out_amount"]
-    result = (
-        merged.groupby("address")
-        .apply(lambda x: (x["net_inflow"] > 0).sum(), include_groups=False)
-        .reset_index(name=f"{token_symbol}_positive_inflow_months")
-    )
-    result[f"{token_symbol}_positive_inflow_months"] = (
-        result[f"{token_symbol}_positive_inflow_months"].fillna(0).astype(int)
+
+    return merged[["address", period_col, "in_amount", "out_amount"]]
+
+
+def count_positive_inflow_months(
+    monthly_flows: pd.DataFrame, token_symbol
+) -> pd.Series:
+    net_inflow = monthly_flows["in_amount"] - monthly_flows["out_amount"]
+    return (
+        (net_inflow > 0)
+        .groupby(monthly_flows["address"])
+        .sum()
+        .astype(int)
+        .rename(f"{token_symbol}_positive_inflow_months")
     )
 
-    return result
+
+def calc_positive_inflow_months(df, token_symbol):
+    monthly_flows = calc_token_flows(df)
+    return count_positive_inflow_months(monthly_flows, token_symbol).reset_index()
+
+
+def save_features(df: pd.DataFrame, name: str, output_path="ml/data/processed"):
+    """
+    Writes a feature frame to ml/data/features/<name>.arrow, the artifact the next
+    stages memory-map, and to <output_path>/<name>.csv when export_csv is set.
+    """
+    arrow_path = f"ml/data/features/{name}.arrow"
+    write_arrow(df, arrow_path)
+    logging.info(f"Features saved to {arrow_path}")
+    if get_config_value("export_csv"):
+        df.to_csv(f"{output_path}/{name}.csv")
+        logging.info(f"Features saved to {output_path}/{name}.csv")
 
 
 def merge_and_save_features(
@@ -380,25 +485,19 @@ def merge_and_save_features(
     output_path="ml/data/processed",
 ):
     logging.info("Merging features...")
-    features = pd.merge(
-        assets_distribution_df, tx_behavior_df, on="address", how="left"
-    )
-    features.to_csv(f"{output_path}/raw_user_features.csv")
-    logging.info(f"Raw user features saved to {output_path}/raw_user_features.csv")
-    table = pa.Table.from_pandas(features)
-    feather.write_feather(table, "ml/data/features/raw_user_features.arrow")
-    logging.info("Raw user features saved to ml/data/features/raw_user_features.arrow")
+    assets_distribution_df = assets_distribution_df.set_index("address")
+    features = align_blocks(
+        assets_distribution_df.index,
+        [assets_distribution_df, tx_behavior_df.set_index("address")],
+    ).reset_index()
+    save_features(features, "raw_user_features", output_path)
 
     if columns_to_features:
         columns_to_features.append("address")
         features = features.reset_index()
         features = features[columns_to_features]
         features = features.set_index("address")
-        features.to_csv(f"{output_path}/user_features.csv")
-        logging.info(f"User features saved to {output_path}/user_features.csv")
-        table = pa.Table.from_pandas(features)
-        feather.write_feather(table, "ml/data/features/user_features.arrow")
-        logging.info("User features saved to ml/data/features/user_features.arrow")
+        save_features(features, "user_features", output_path)
 
 
 def get_token_contracts(token_symbol, tokens_config):
@@ -419,46 +518,122 @@ def filter_token_df(df, token_symbol, tokens_config):
     return df[df["chain_contract"].isin(contract_set)].copy()
 
 
-def preprocess_assets_distribution(
+def calc_assets_distribution(
     df: pd.DataFrame,
     event_logs_df: pd.DataFrame,
     lookback_months: int = 12,
-    whale_score_settings: dict = None,
-) -> pd.DataFrame:
+    blocks: frozenset = ALL_BLOCKS,
+) -> tuple:
+    """
+    Per-address part of the assets distribution features: everything that only
+    depends on the address' own rows. Returns the features and the per
+    (address, chain_id) ETH net flow log, normalized over the population later.
+    Only the feature blocks in blocks are computed (see feature_registry);
+    event_logs_df is only read by inflow_months.
+    """
     group = df.groupby(["address", "chain_id"])
-    features_address = pd.DataFrame()  # features_address: index=['address']
-    features_chain = pd.DataFrame()  # features_chain: index=['address', 'chain_id']
-    balance_usd_columns = [col for col in df.columns if col.endswith("balance_usd")]
+    # features_chain: index=['address', 'chain_id']
+    features_chain = pd.DataFrame(index=group.size().index)
+    balance_usd_columns = []
+    if "balances" in blocks:
+        balance_usd_columns = [col for col in df.columns if col.endswith("balance_usd")]
 
     for col in balance_usd_columns:
         features_chain[col] = group[col].mean()
-        features_address[col] = features_chain.groupby("address")[col].sum()
 
-    user_sent = group.apply(get_user_sent_eth, include_groups=False).rename(
-        "user_sent_eth"
-    )
-    user_received = group.apply(get_user_received_eth, include_groups=False).rename(
-        "user_received_eth"
-    )
-    max_sent = group.apply(get_max_sent_eth, include_groups=False).rename(
-        "max_sent_eth"
-    )
-    max_received = group.apply(get_max_received_eth, include_groups=False).rename(
-        "max_received_eth"
-    )
+    recent_tx_counts = None
+    if "recent_activity" in blocks:
+        # at least 1 tx in the last 30 days
+        timestamp_threshold = pd.Timestamp.now() - pd.Timedelta(days=30)
+        df_recent = df[df["timestamp_dt"] > timestamp_threshold]
+        recent_tx_counts = df_recent.groupby(["address", "chain_id"]).size()
+
+    monthly_flows = {}
+    if "inflow_months" in blocks:
+        event_logs_df = event_logs_df.copy()
+        event_logs_df["timestamp_dt"] = pd.to_datetime(
+            event_logs_df["timestamp"], unit="s"
+        )
+        cutoff = pd.Timestamp.now() - pd.DateOffset(months=lookback_months)
+        event_logs_df = event_logs_df[event_logs_df["timestamp_dt"] >= cutoff]
+        event_logs_df["year_month"] = event_logs_df["timestamp_dt"].dt.to_period("M")
+        monthly_flows = {
+            token: calc_token_flows(
+                filter_token_df(event_logs_df, token, load_tokens())
+            )
+            for token in INFLOW_TOKENS
+        }
+
+    eth_features = calc_eth_flows(df) if "eth_flows" in blocks else None
+
+    return assemble_assets_distribution(
+        features_chain, eth_features, recent_tx_counts, monthly_flows
+    )
+
+
+def assemble_assets_distribution(
+    features_chain: pd.DataFrame,
+    eth_features: pd.DataFrame,
+    recent_tx_counts: pd.Series,
+    monthly_flows: dict,
+) -> tuple:
+    """
+    Per-address assets distribution features from their per (address, chain_id)
+    aggregates: mean balances (features_chain), ETH flows (see calc_eth_flows), tx
+    counts of the last 30 days, and the monthly WBTC / WETH flows of each token (see
+    calc_token_flows). Shared by the raw rows and the incremental state modes.
+    A block whose input is missing (no balance columns, None, no monthly flows) is
+    left out; features_chain always carries the (address, chain_id) index.
+    """
+    features_chain = features_chain.copy()
+    balance_usd_columns = list(features_chain.columns)
+    balances = features_chain.groupby("address")[balance_usd_columns].sum()
+
+    eth_features_address, net_flow_log = None, None
+    if eth_features is not None:
+        eth_features_address, net_flow_log = summarize_eth_flows(eth_features)
+
+    # features_address: index=['address'], the shared index of all the blocks
+    features_address = align_blocks(
+        balances.index,
+        [block for block in [balances, eth_features_address] if block is not None],
+    )
+    if balance_usd_columns:
+        features_address = add_balance_features(features_address, features_chain)
+
+    if recent_tx_counts is not None:
+        tx_count_threshold = 1
+        recent_tx_counts = recent_tx_counts.reindex(features_chain.index, fill_value=0)
+        features_chain["is_active"] = recent_tx_counts > tx_count_threshold
+        features_address["n_chains_with_activity"] = features_chain.groupby("address")[
+            "is_active"
+        ].sum()
+
+    for token, token_monthly_flows in monthly_flows.items():
+        positive_inflow = count_positive_inflow_months(
+            token_monthly_flows, token.lower()
+        )
+        features_address[positive_inflow.name] = (
+            positive_inflow.reindex(features_address.index).fillna(0).astype(int)
+        )
+
+    features_address = features_address.rename_axis("address").reset_index()
+    return features_address, net_flow_log
 
-    eth_features = pd.concat(
-        [user_received, user_sent, max_received, max_sent], axis=1
-    ).fillna(0)
+
+def summarize_eth_flows(eth_features: pd.DataFrame) -> tuple:
+    """
+    Per-address ETH flows from their per (address, chain_id) ones, and the per
+    (address, chain_id) log net flow.
+    """
+    eth_features = eth_features.copy()
     eth_features["user_net_flow_eth"] = (
         eth_features["user_received_eth"] - eth_features["user_sent_eth"]
     ).round(2)
-    eth_features["user_net_flow_eth_log"] = eth_features["user_net_flow_eth"].apply(
-        lambda x: np.sign(x) * np.log1p(abs(x)) if abs(x) >= 1 else 0
+    net_flow = eth_features["user_net_flow_eth"]
+    eth_features["user_net_flow_eth_log"] = np.where(
+        net_flow.abs() >= 1, np.sign(net_flow) * np.log1p(net_flow.abs()), 0
     )
-    eth_features["user_net_flow_eth_log_abs_norm"] = abs_minmax(
-        eth_features["user_net_flow_eth_log"]
-    ).round(2)
 
     eth_features_address = (
         eth_features.groupby("address")
@@ -468,44 +643,23 @@ def preprocess_assets_distribution(
                 "user_sent_eth": "sum",
                 "max_received_eth": "max",
                 "max_sent_eth": "max",
-                "user_net_flow_eth_log_abs_norm": "max",
             }
         )
         .round(2)
     )
 
-    features_address = features_address.merge(
-        eth_features_address, left_index=True, right_index=True, how="left"
-    )
+    return eth_features_address, eth_features["user_net_flow_eth_log"]
 
-    balance_norm_columns = []
-    for col in balance_usd_columns:
-        norm_col = f"{col}_norm"
-        features_address[norm_col] = (
-            features_address[col] - features_address[col].min()
-        ) / (features_address[col].max() - features_address[col].min())
-        features_address[norm_col] = features_address[norm_col].fillna(0).round(2)
-        balance_norm_columns.append(norm_col)
 
-    eth_norm_columns = []
-    for col in [
-        "user_received_eth",
-        "user_sent_eth",
-        "max_received_eth",
-        "max_sent_eth",
-    ]:
-        norm_col = f"{col}_norm"
-        features_address[norm_col] = (
-            features_address[col] - features_address[col].min()
-        ) / (features_address[col].max() - features_address[col].min())
-        features_address[norm_col] = features_address[norm_col].fillna(0).round(2)
-        eth_norm_columns.append(norm_col)
-
-    features_address["whale_score"] = sum(
-        whale_score_settings.get(col, 0) * features_address.get(col, 0)
-        for col in whale_score_settings
-    )
-    features_address["whale_score"] = (features_address["whale_score"] * 100).round(2)
+def add_balance_features(
+    features_address: pd.DataFrame, features_chain: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Adds the asset counts, totals and ratios to the per-address balances, from the
+    per (address, chain_id) mean balances.
+    """
+    features_chain = features_chain.copy()
+    balance_usd_columns = list(features_chain.columns)
     features_chain["has_1000usd"] = (
         features_chain[balance_usd_columns].sum(axis=1) > 1000
     )
@@ -565,286 +719,427 @@ def preprocess_assets_distribution(
         features_address["eth_balance_usd"] / features_address["total_assets_usd"], 2
     )
 
-    # at least 1 tx in the last 30 days
-    timestamp_threshold = pd.Timestamp.now() - pd.Timedelta(days=30)
-    tx_count_threshold = 1
-    df_recent = df[df["timestamp_dt"] > timestamp_threshold]
-    group_tx_counts = (
-        df_recent.groupby(["address", "chain_id"]).size().reset_index(name="tx_count")
-    )
-    group_tx_counts["is_active"] = group_tx_counts["tx_count"] > tx_count_threshold
-    features_chain = features_chain.merge(
-        group_tx_counts[["address", "chain_id", "is_active"]],
-        on=["address", "chain_id"],
-        how="left",
+    return features_address
+
+
+def calc_weighted_score(features: pd.DataFrame, weights: dict) -> pd.Series:
+    """
+    Weighted sum of the feature columns in weights (0 for the missing ones), in
+    percent.
+    """
+    score = sum(
+        (weights.get(col, 0) * features.get(col, 0) for col in weights),
+        pd.Series(0, index=features.index),
     )
-    features_chain["is_active"] = (
-        features_chain["is_active"].fillna(False).infer_objects(copy=False)
+    return (score * 100).round(2)
+
+
+def normalize_assets_distribution(
+    features_address: pd.DataFrame,
+    net_flow_log: pd.Series,
+    whale_score_settings: dict = None,
+    blocks: frozenset = ALL_BLOCKS,
+) -> pd.DataFrame:
+    """
+    Population-dependent part of the assets distribution features: min-max norms,
+    the ETH net flow abs norm and whale_score, over all addresses at once.
+    Norms are added for the columns present; net_flow_log is None without eth_flows.
+    """
+    columns = list(features_address.columns)
+    balance_usd_columns = [col for col in columns if col.endswith("balance_usd")]
+    eth_columns = [
+        col
+        for col in [
+            "user_received_eth",
+            "user_sent_eth",
+            "max_received_eth",
+            "max_sent_eth",
+        ]
+        if col in columns
+    ]
+    split = (
+        max(
+            columns.index(col)
+            for col in ["address"] + balance_usd_columns + eth_columns
+        )
+        + 1
     )
-    features_address["n_chains_with_activity"] = features_chain.groupby("address")[
-        "is_active"
-    ].sum()
+    abs_norm_columns = []
+    if net_flow_log is not None:
+        abs_norm = abs_minmax(net_flow_log).round(2).groupby("address").max().round(2)
+        features_address["user_net_flow_eth_log_abs_norm"] = features_address[
+            "address"
+        ].map(abs_norm)
+        abs_norm_columns.append("user_net_flow_eth_log_abs_norm")
 
-    event_logs_df = event_logs_df.copy()
-    event_logs_df["timestamp_dt"] = pd.to_datetime(event_logs_df["timestamp"], unit="s")
-    cutoff = pd.Timestamp.now() - pd.DateOffset(months=lookback_months)
-    event_logs_df = event_logs_df[event_logs_df["timestamp_dt"] >= cutoff]
-    event_logs_df["year_month"] = event_logs_df["timestamp_dt"].dt.to_period("M")
+    balance_norm_columns = []
+    for col in balance_usd_columns:
+        norm_col = f"{col}_norm"
+        features_address[norm_col] = (
+            features_address[col] - features_address[col].min()
+        ) / (features_address[col].max() - features_address[col].min())
+        features_address[norm_col] = features_address[norm_col].fillna(0).round(2)
+        balance_norm_columns.append(norm_col)
 
-    for token in ["WBTC", "WETH"]:
-        token_df = filter_token_df(event_logs_df, token, TOKENS)
-        positive_inflow = calc_positive_inflow_months(token_df, token.lower())
-        features_address = features_address.merge(
-            positive_inflow, on="address", how="left"
+    eth_norm_columns = []
+    for col in eth_columns:
+        norm_col = f"{col}_norm"
+        features_address[norm_col] = (
+            features_address[col] - features_address[col].min()
+        ) / (features_address[col].max() - features_address[col].min())
+        features_address[norm_col] = features_address[norm_col].fillna(0).round(2)
+        eth_norm_columns.append(norm_col)
+
+    score_columns = []
+    if "whale_score" in blocks:
+        features_address["whale_score"] = calc_weighted_score(
+            features_address, whale_score_settings
         )
-        col = f"{token.lower()}_positive_inflow_months"
-        features_address[col] = features_address[col].fillna(0).astype(int)
+        score_columns.append("whale_score")
+
+    return features_address[
+        columns[:split]
+        + abs_norm_columns
+        + balance_norm_columns
+        + eth_norm_columns
+        + score_columns
+        + columns[split:]
+    ]
+
 
-    features_address.to_csv("ml/data/processed/assets_distribution.csv")
+def preprocess_assets_distribution(
+    df: pd.DataFrame,
+    event_logs_df: pd.DataFrame,
+    lookback_months: int = 12,
+    whale_score_settings: dict = None,
+    blocks: frozenset = ALL_BLOCKS,
+) -> pd.DataFrame:
+    features_address, net_flow_log = calc_assets_distribution(
+        df, event_logs_df, lookback_months, blocks
+    )
+    features_address = normalize_assets_distribution(
+        features_address, net_flow_log, whale_score_settings, blocks
+    )
+    save_features(features_address, "assets_distribution")
 
     return features_address
 
 
-def calc_avg_tx_usd_value(group, flow_type="inflow"):
-    address = group.name[0]
-    chain_id = group.name[1]
-    if flow_type == "inflow":
-        filtered_txs = group[group["to"] == address]
-    elif flow_type == "outflow":
-        filtered_txs = group[group["from"] == address]
-    else:
-        raise ValueError("flow_type only allows 'inflow' or 'outflow'")
-    if len(filtered_txs) == 0:
-        return 0
-
-    total_usd_value = 0
-    for _, tx in filtered_txs.iterrows():
-        eth_price = TOKENS.get(chain_id, {}).get("ETH", {}).get("price", 0)
-        if eth_price > 0:
-            eth_value = tx["value"] / 1e18
-            usd_value = eth_value * eth_price
-            total_usd_value += usd_value
-
-    avg_usd_value = total_usd_value / len(filtered_txs)
-    return round(avg_usd_value, 2)
-
-
-def calc_total_tx_usd_value(group, flow_type="inflow"):
-    address = group.name[0]
-    chain_id = group.name[1]
-    if flow_type == "inflow":
-        filtered_txs = group[group["to"] == address]
-    elif flow_type == "outflow":
-        filtered_txs = group[group["from"] == address]
-    else:
-        raise ValueError("flow_type only allows 'inflow' or 'outflow'")
+def get_eth_prices(df: pd.DataFrame) -> pd.Series:
+    """
+    Current ETH price of each row's chain, from the token catalog.
+    """
+    eth_prices = {
+        chain_id: tokens.get("ETH", {}).get("price", 0)
+        for chain_id, tokens in load_tokens().items()
+    }
+    return df["chain_id"].map(eth_prices).fillna(0)
 
-    if len(filtered_txs) == 0:
-        return 0
 
-    total_usd_value = 0
-    for _, tx in filtered_txs.iterrows():
-        eth_price = TOKENS.get(chain_id, {}).get("ETH", {}).get("price", 0)
-        if eth_price > 0:
-            eth_value = tx["value"] / 1e18
-            usd_value = eth_value * eth_price
-            total_usd_value += usd_value
+def calc_flow_usd_values(
+    df: pd.DataFrame, eth_prices: pd.Series = None
+) -> pd.DataFrame:
+    """
+    Inflow / outflow tx count, total and average USD value per (address, chain_id),
+    for all groups at once. eth_prices is the ETH price of each row of df
+    (e.g. the price at the tx timestamp); defaults to the current catalog prices.
+    """
+    if eth_prices is None:
+        eth_prices = get_eth_prices(df)
+    usd_values = df["value"] / 1e18 * eth_prices
+    is_inflow = df["to"] == df["address"]
+    is_outflow = df["from"] == df["address"]
+    flows = pd.DataFrame(
+        {
+            "address": df["address"],
+            "chain_id": df["chain_id"],
+            "inflow_count": is_inflow.astype(int),
+            "outflow_count": is_outflow.astype(int),
+            "inflow_usd": usd_values.where(is_inflow, 0),
+            "outflow_usd": usd_values.where(is_outflow, 0),
+        }
+    )
 
-    return round(total_usd_value, 2)
+    return summarize_flow_usd_values(flows.groupby(["address", "chain_id"]).sum())
 
 
-def calc_max_tx_burst(df, interval_hours=24):
-    df = df.copy()
-    
-    # Create time intervals
-    df['interval_start'] = df['timestamp_dt'].dt.floor(f'{interval_hours}h')
-    
+def summarize_flow_usd_values(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flow features from the per-group inflow / outflow counts and USD sums
+    (columns inflow_count, outflow_count, inflow_usd, outflow_usd).
+    """
+    result = pd.DataFrame(index=sums.index)
+    for flow_type in ["inflow", "outflow"]:
+        count = sums[f"{flow_type}_count"]
+        total = sums[f"{flow_type}_usd"]
+        result[f"{flow_type}_count"] = count
+        result[f"total_tx_usd_value_{flow_type}"] = total.round(2)
+        result[f"avg_tx_usd_value_{flow_type}"] = (
+            (total / count).where(count > 0, 0).round(2)
+        )
+
+    return result
+
+
+def calc_max_tx_burst(df, interval_hours=24, weight_col=None):
+    # Create time intervals (a key Series, no copy of df)
+    interval_start = df["timestamp_dt"].dt.floor(f"{interval_hours}h")
+    interval_start = interval_start.rename("interval_start")
+
     # Count transactions per user per interval
-    interval_counts = (
-        df.groupby(['address', 'interval_start'])
-        .size()
-        .reset_index(name='tx_count_in_interval')
-    )
-    
+    interval_counts = group_weights(
+        df, ["address", interval_start], weight_col
+    ).reset_index(name="tx_count_in_interval")
+
     # Find the maximum burst for each user
     max_burst = (
-        interval_counts.groupby('address')['tx_count_in_interval']
+        interval_counts.groupby("address")["tx_count_in_interval"]
         .max()
-        .reset_index(name='max_tx_burst')
+        .rename("max_tx_burst")
     )
-    
+
     return max_burst
 
 
-def calc_tx_timing_features(group):
-    min_time = group["timestamp_dt"].min()
-    max_time = group["timestamp_dt"].max()
-    lifetime_days = (max_time - min_time).days + 1
-    if lifetime_days <= 0:
-        return pd.Series(
-            {
-                "first_timestamp_dt": min_time,
-                "last_timestamp_dt": max_time,
-                "lifetime_days": 0,
-                "lifetime_daily_txs": 0,
-                "lifetime_weekly_txs": 0,
-                "lifetime_monthly_txs": 0,
-            }
-        )
-    tx_count = len(group)
-    min_week_days = max(lifetime_days, 7)
-    min_month_days = max(lifetime_days, 30)
-    return pd.Series(
+def calc_tx_timing(
+    first_timestamp_dt: pd.Series, last_timestamp_dt: pd.Series, tx_count: pd.Series
+) -> pd.DataFrame:
+    """
+    Lifetime features of each address from its first / last tx time and tx count
+    (Series indexed by address).
+    """
+    lifetime_days = (last_timestamp_dt - first_timestamp_dt).dt.days + 1
+    has_lifetime = lifetime_days > 0
+    lifetime_days = lifetime_days.where(has_lifetime, 0)
+    min_week_days = lifetime_days.clip(lower=7)
+    min_month_days = lifetime_days.clip(lower=30)
+    tx_timing = pd.DataFrame(
         {
-            "first_timestamp_dt": min_time,
-            "last_timestamp_dt": max_time,
+            "first_timestamp_dt": first_timestamp_dt,
+            "last_timestamp_dt": last_timestamp_dt,
             "lifetime_days": lifetime_days,
-            "lifetime_daily_txs": round(tx_count / lifetime_days, 2),
-            "lifetime_weekly_txs": round(tx_count / (min_week_days / 7), 2),
-            "lifetime_monthly_txs": round(tx_count / (min_month_days / 30), 2),
+            "lifetime_daily_txs": (tx_count / lifetime_days).round(2),
+            "lifetime_weekly_txs": (tx_count / (min_week_days / 7)).round(2),
+            "lifetime_monthly_txs": (tx_count / (min_month_days / 30)).round(2),
         }
     )
+    for col in ["lifetime_daily_txs", "lifetime_weekly_txs", "lifetime_monthly_txs"]:
+        tx_timing[col] = tx_timing[col].where(has_lifetime, 0)
 
+    return tx_timing.rename_axis("address")
 
-def preprocess_tx_behavior(
+
+def max_tx_burst_column(interval_name: str, interval_hours: int) -> str:
+    if interval_name == "n_hours":
+        return f"max_tx_burst_{str(interval_hours)}h"
+    return f"max_tx_burst_{interval_name}"
+
+
+def calc_tx_behavior(
     df: pd.DataFrame,
     active_days_threshold: int = 730,
-    active_score_settings: dict = None,
     max_tx_burst_intervals: dict = None,
+    protocol_types: list = None,
+    chain_ids: list = None,
+    blocks: frozenset = ALL_BLOCKS,
+    method_classifier: MethodClassifier = None,
 ) -> pd.DataFrame:
-    pd.set_option("display.max_rows", None)
-    pd.set_option("display.max_columns", None)
+    """
+    Per-address part of the tx behavior features. protocol_types / chain_ids fix the
+    per-type and per-chain columns, see calc_protocol_type_focus. Only the feature
+    blocks in blocks are computed (see feature_registry).
+    """
+    method_classifier = method_classifier or MethodClassifier()
+    if blocks & PROTOCOL_BLOCKS:
+        protocol_index = get_protocol_index()
+        flat_name_map = {key: meta["name"] for key, meta in protocol_index.items()}
+        flat_type_map = {key: meta["type"] for key, meta in protocol_index.items()}
+        keys = list(zip(df["chain_id"], df["to"]))
+
+        df["protocol_name"] = list(map(lambda k: flat_name_map.get(k, "Unknown"), keys))
+        df["protocol_type"] = list(map(lambda k: flat_type_map.get(k, "Unknown"), keys))
+    if "method_counts" in blocks:
+        df["method_name"], df["method_weight"] = method_classifier.classify_column(
+            df["functionName"]
+        )
+        df["n_methods"] = df["functionName"].nunique()
 
-    features_address = pd.DataFrame()  # features_address: index=['address']
-    features_chain = pd.DataFrame()  # features_chain: index=['address', 'chain_id']
-    flat_name_map = {
-        (chain_id, address): meta["name"]
-        for chain_id, addr_map in PROTOCOLS.items()
-        for address, meta in addr_map.items()
-    }
-    flat_type_map = {
-        (chain_id, address): meta["type"]
-        for chain_id, addr_map in PROTOCOLS.items()
-        for address, meta in addr_map.items()
-    }
-    keys = list(zip(df["chain_id"], df["to"]))
+    group = df.groupby(["address", "chain_id"])
+    # features_chain: index=['address', 'chain_id']
+    features_chain = pd.DataFrame(index=group.size().index)
+    if "protocol_counts" in blocks:
+        features_chain["n_protocol_names"] = group["protocol_name"].nunique()
+        features_chain["n_protocol_types"] = group["protocol_type"].nunique()
+    if "method_counts" in blocks:
+        features_chain["n_methods"] = group["n_methods"].nunique()
+    if "tx_counts" in blocks:
+        features_chain["tx_count"] = group["hash"].nunique()
+    if "method_counts" in blocks:
+        method_shares = grouped_shares(
+            df, ["address", "chain_id"], "functionName", "method_weight"
+        )
+        features_chain["method_diversity"] = (
+            calc_grouped_normalized_entropy(method_shares, ["address", "chain_id"])
+            .round(2)
+            .reindex(features_chain.index, fill_value=0)
+        )
+    if "flow_usd" in blocks:
+        flow_usd_values = calc_flow_usd_values(df)
+        for col in [
+            "avg_tx_usd_value_inflow",
+            "avg_tx_usd_value_outflow",
+            "total_tx_usd_value_inflow",
+            "total_tx_usd_value_outflow",
+        ]:
+            features_chain[col] = flow_usd_values[col]
+
+    active_days, active_tx_count = None, None
+    if "activity" in blocks:
+        active_days_dt = pd.Timestamp.now() - pd.Timedelta(days=active_days_threshold)
+        df_recent = df[df["timestamp_dt"] >= active_days_dt].copy()
+        df_recent["date"] = df_recent["timestamp_dt"].dt.date
+        active_days = df_recent.groupby("address")["date"].nunique()
+        active_tx_count = df_recent.groupby("address").size()
+
+    max_tx_bursts = {}
+    if "max_tx_bursts" in blocks:
+        max_tx_bursts = {
+            max_tx_burst_column(interval_name, interval_hours): calc_max_tx_burst(
+                df, interval_hours=interval_hours
+            )
+            for interval_name, interval_hours in max_tx_burst_intervals.items()
+        }
+    protocol_focus_df = calc_protocol_type_focus(
+        df, protocol_types=protocol_types, blocks=blocks
+    )
+    chain_focus_df = None
+    if "chain_focus" in blocks:
+        chain_focus_df = calc_chain_focus_and_ratios(df, chain_ids)
+    tx_timing = None
+    if "tx_timing" in blocks:
+        timestamps = df.groupby("address")["timestamp_dt"]
+        tx_timing = calc_tx_timing(
+            timestamps.min(), timestamps.max(), timestamps.size()
+        )
 
-    df["protocol_name"] = list(map(lambda k: flat_name_map.get(k, "Unknown"), keys))
-    df["protocol_type"] = list(map(lambda k: flat_type_map.get(k, "Unknown"), keys))
-    df["method_weight"] = df["functionName"].apply(get_method_weight)
-    df["method_name"] = df["functionName"].apply(get_method_name)
-    df["n_methods"] = df["functionName"].nunique()
+    return assemble_tx_behavior(
+        features_chain,
+        active_days,
+        active_tx_count,
+        active_days_threshold,
+        max_tx_bursts,
+        protocol_focus_df,
+        chain_focus_df,
+        tx_timing,
+    )
+
+
+def assemble_tx_behavior(
+    features_chain: pd.DataFrame,
+    active_days: pd.Series,
+    active_tx_count: pd.Series,
+    active_days_threshold: int,
+    max_tx_bursts: dict,
+    protocol_focus_df: pd.DataFrame,
+    chain_focus_df: pd.DataFrame,
+    tx_timing: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Per-address tx behavior features from their per (address, chain_id) aggregates
+    and per-address blocks. Shared by the raw rows and the incremental state modes.
+    Blocks left out of the feature selection come as None / missing columns.
+    """
+    group = features_chain.groupby("address")
+    # features_address: index=['address']
+    features_address = pd.DataFrame(index=group.size().index)
+    for col, name, aggregate in [
+        ("n_protocol_names", "total_protocol_count", "sum"),
+        ("n_protocol_types", "total_protocol_type", "sum"),
+        ("n_methods", "total_methods", "sum"),
+        ("tx_count", "total_tx_count", "sum"),
+        ("method_diversity", "method_diversity", "max"),
+    ]:
+        if col in features_chain.columns:
+            features_address[name] = group[col].agg(aggregate)
+    if "avg_tx_usd_value_inflow" in features_chain.columns:
+        features_address["avg_tx_usd_value_inflow"] = (
+            group["avg_tx_usd_value_inflow"].mean().round(2)
+        )
+        features_address["avg_tx_usd_value_outflow"] = (
+            group["avg_tx_usd_value_outflow"].mean().round(2)
+        )
+        features_address["total_tx_usd_value_inflow"] = (
+            group["total_tx_usd_value_inflow"].sum().round(2)
+        )
+        features_address["total_tx_usd_value_outflow"] = (
+            group["total_tx_usd_value_outflow"].sum().round(2)
+        )
 
-    group = df.groupby(["address", "chain_id"])
-    features_chain["n_protocol_names"] = group["protocol_name"].nunique()
-    features_chain["n_protocol_types"] = group["protocol_type"].nunique()
-    features_chain["n_methods"] = group["n_methods"].nunique()
-    features_chain["tx_count"] = group["hash"].nunique()
-    features_chain["method_diversity"] = group.apply(
-        calc_weighted_method_entropy, include_groups=False
-    )
-    features_chain["avg_tx_usd_value_inflow"] = group.apply(
-        calc_avg_tx_usd_value, flow_type="inflow", include_groups=False
-    )
-    features_chain["avg_tx_usd_value_outflow"] = group.apply(
-        calc_avg_tx_usd_value, flow_type="outflow", include_groups=False
-    )
-    features_chain["total_tx_usd_value_inflow"] = group.apply(
-        calc_total_tx_usd_value, flow_type="inflow", include_groups=False
-    )
-    features_chain["total_tx_usd_value_outflow"] = group.apply(
-        calc_total_tx_usd_value, flow_type="outflow", include_groups=False
-    )
-    features_address["total_protocol_count"] = features_chain.groupby("address")[
-        "n_protocol_names"
-    ].sum()
-    features_address["total_protocol_type"] = features_chain.groupby("address")[
-        "n_protocol_types"
-    ].sum()
-    features_address["total_methods"] = features_chain.groupby("address")[
-        "n_methods"
-    ].sum()
-    features_address["total_tx_count"] = features_chain.groupby("address")[
-        "tx_count"
-    ].sum()
-    features_address["method_diversity"] = features_chain.groupby("address")[
-        "method_diversity"
-    ].max()
-    features_address["avg_tx_usd_value_inflow"] = (
-        features_chain.groupby("address")["avg_tx_usd_value_inflow"].mean().round(2)
-    )
-    features_address["avg_tx_usd_value_outflow"] = (
-        features_chain.groupby("address")["avg_tx_usd_value_outflow"].mean().round(2)
-    )
-    features_address["total_tx_usd_value_inflow"] = (
-        features_chain.groupby("address")["total_tx_usd_value_inflow"].sum().round(2)
-    )
-    features_address["total_tx_usd_value_outflow"] = (
-        features_chain.groupby("address")["total_tx_usd_value_outflow"].sum().round(2)
-    )
-
-    active_days_dt = pd.Timestamp.now() - pd.Timedelta(days=active_days_threshold)
-    df_recent = df[df["timestamp_dt"] >= active_days_dt].copy()
-    df_recent["date"] = df_recent["timestamp_dt"].dt.date
-    active_days = (
-        df_recent.groupby("address")["date"].nunique().reset_index(name="active_days")
-    )
-    active_tx_count = (
-        df_recent.groupby("address").size().reset_index(name="active_tx_count")
-    )
-    
-    features_address = features_address.merge(active_days, on="address", how="left")
-    features_address = features_address.merge(active_tx_count, on="address", how="left")
-    
-    features_address["active_days"] = (
-        features_address["active_days"].fillna(0).astype(int)
-    )
-    features_address["active_tx_count"] = (
-        features_address["active_tx_count"].fillna(0).astype(int)
-    )
-    
-    features_address["active_days_ratio"] = round(
-        features_address["active_days"] / active_days_threshold, 2
-    )
-    features_address["active_daily_txs"] = features_address.apply(
-        lambda row: (
-            round(row["active_tx_count"] / row["active_days"], 2)
-            if row["active_days"] > 0
-            else 0
-        ),
-        axis=1,
-    )
+    # the shared index of all the blocks, each aligned to it before assembly
+    index = features_address.index
+    if active_days is not None:
+        features_address["active_days"] = (
+            active_days.reindex(index).fillna(0).astype(int)
+        )
+        features_address["active_tx_count"] = (
+            active_tx_count.reindex(index).fillna(0).astype(int)
+        )
 
-    for interval_name, interval_hours in max_tx_burst_intervals.items():
-        if interval_name == "n_hours":
-            column_name = f"max_tx_burst_{str(interval_hours)}h"
-        else:
-            column_name = f"max_tx_burst_{interval_name}"
-        max_burst_df = calc_max_tx_burst(df, interval_hours=interval_hours)
-        max_burst_df = max_burst_df.rename(columns={"max_tx_burst": column_name})
-        features_address = features_address.merge(max_burst_df, on="address", how="left")
-        features_address[column_name] = features_address[column_name].fillna(0).astype(int)
-
-    protocol_focus_df = calc_protocol_type_focus(df)
-    features_address = features_address.merge(
-        protocol_focus_df, on="address", how="left"
-    )
-    chain_focus_df = calc_chain_focus_and_ratios(df)
-    features_address = features_address.merge(chain_focus_df, on="address", how="left")
-    tx_timing = (
-        df.groupby("address")
-        .apply(calc_tx_timing_features, include_groups=False)
-        .reset_index()
-    )
-    features_address = features_address.merge(tx_timing, on="address", how="left")
+        features_address["active_days_ratio"] = round(
+            features_address["active_days"] / active_days_threshold, 2
+        )
+        # Python round() on Python numbers, like the row-wise version did
+        features_address["active_daily_txs"] = [
+            round(tx_count / days, 2) if days > 0 else 0
+            for tx_count, days in zip(
+                features_address["active_tx_count"].tolist(),
+                features_address["active_days"].tolist(),
+            )
+        ]
 
-    features_address["first_timestamp_dt"] = pd.to_datetime(
-        features_address["first_timestamp_dt"]
-    )
-    features_address["last_timestamp_dt"] = pd.to_datetime(
-        features_address["last_timestamp_dt"]
+    max_tx_bursts = pd.DataFrame(
+        {
+            column_name: max_burst.reindex(index).fillna(0).astype(int)
+            for column_name, max_burst in max_tx_bursts.items()
+        },
+        index=index,
     )
 
+    features_address = align_blocks(
+        index,
+        [
+            block
+            for block in [
+                features_address,
+                max_tx_bursts,
+                protocol_focus_df,
+                chain_focus_df,
+                tx_timing,
+            ]
+            if block is not None
+        ],
+    ).reset_index()
+
+    if tx_timing is not None:
+        features_address["first_timestamp_dt"] = pd.to_datetime(
+            features_address["first_timestamp_dt"]
+        )
+        features_address["last_timestamp_dt"] = pd.to_datetime(
+            features_address["last_timestamp_dt"]
+        )
+
+    return features_address
+
+
+def normalize_tx_behavior(
+    features_address: pd.DataFrame,
+    active_score_settings: dict = None,
+    blocks: frozenset = ALL_BLOCKS,
+) -> pd.DataFrame:
+    """
+    Population-dependent part of the tx behavior features: log min-max norms and
+    active_score, over all addresses at once. Only the columns present are normed.
+    """
     for col in [
         "total_protocol_count",
         "total_protocol_type",
@@ -856,43 +1151,767 @@ def preprocess_tx_behavior(
         "active_tx_count",
         "active_daily_txs",
     ]:
-        features_address = calc_minmax_norm(features_address, col)
+        if col in features_address.columns:
+            features_address = calc_minmax_norm(features_address, col)
+
+    if "active_score" in blocks:
+        features_address["active_score"] = calc_weighted_score(
+            features_address, active_score_settings
+        )
+
+    return features_address
 
-    features_address["active_score"] = sum(
-        active_score_settings.get(col, 0) * features_address.get(col, 0)
-        for col in active_score_settings
+
+def preprocess_tx_behavior(
+    df: pd.DataFrame,
+    active_days_threshold: int = 730,
+    active_score_settings: dict = None,
+    max_tx_burst_intervals: dict = None,
+    blocks: frozenset = ALL_BLOCKS,
+) -> pd.DataFrame:
+    pd.set_option("display.max_rows", None)
+    pd.set_option("display.max_columns", None)
+
+    features_address = calc_tx_behavior(
+        df, active_days_threshold, max_tx_burst_intervals, blocks=blocks
+    )
+    features_address = normalize_tx_behavior(
+        features_address, active_score_settings, blocks
     )
-    features_address["active_score"] = (features_address["active_score"] * 100).round(2)
-    features_address.to_csv("ml/data/processed/tx_behavior.csv")
+    save_features(features_address, "tx_behavior")
 
     return features_address
 
 
-if __name__ == "__main__":
-    logging.info("Loading raw transaction data...")
-    df = pd.read_csv("ml/data/raw/collected_txs_all.csv", low_memory=False)
-    event_logs_df = pd.read_csv("ml/data/raw/event_logs_all.csv", low_memory=False)
+def compute_shard_features(
+    shard: dict,
+    settings: dict,
+    protocol_types: list,
+    chain_ids: list,
+) -> tuple:
+    """
+    Worker of the sharded mode: per-address features of the addresses of one shard,
+    and the method classes it found, cached by the driver.
+    """
+    blocks = settings.get("blocks", ALL_BLOCKS)
+    df, event_logs_df = read_shard(shard)
+    df = parse_transaction_columns(df)
+    if settings["use_balance_snapshot"]:
+        df = join_balance_snapshot(df, load_balance_snapshot())
+    assets_distribution, net_flow_log = calc_assets_distribution(
+        df, event_logs_df, settings["assets_lookback_months"], blocks
+    )
+    method_classifier = MethodClassifier(read_only=True)
+    tx_behavior = calc_tx_behavior(
+        df,
+        settings["active_days_threshold"],
+        settings["max_tx_burst_intervals"],
+        protocol_types,
+        chain_ids,
+        blocks,
+        method_classifier,
+    )
+    return (
+        assets_distribution,
+        net_flow_log,
+        tx_behavior,
+        method_classifier.new_classes,
+    )
+
+
+def preprocess_sharded(
+    txs_path: str,
+    event_logs_path: str,
+    settings: dict,
+    n_jobs: int = 2,
+) -> tuple:
+    """
+    Computes the per-address features in a process pool, one address-hash shard
+    per task, then the population-dependent norms and scores over the merged result.
+    Returns the same (assets_distribution, tx_behavior) as the single-process mode.
+    """
+    blocks = settings.get("blocks", ALL_BLOCKS)
+    partition = partition_raw_data(txs_path, event_logs_path, n_jobs)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = list(
+            executor.map(
+                compute_shard_features,
+                partition["shards"],
+                [settings] * len(partition["shards"]),
+                [partition["protocol_types"]] * len(partition["shards"]),
+                [partition["chain_ids"]] * len(partition["shards"]),
+            )
+        )
+    method_classifier = MethodClassifier()
+    for result in results:
+        method_classifier.update(result[3])
+    method_classifier.save_cache()
+
+    assets_distribution = (
+        pd.concat([result[0] for result in results])
+        .sort_values("address")
+        .reset_index(drop=True)
+    )
+    net_flow_log = None
+    if "eth_flows" in blocks:
+        net_flow_log = pd.concat([result[1] for result in results])
+    assets_distribution = normalize_assets_distribution(
+        assets_distribution,
+        net_flow_log,
+        settings["whale_score_settings"],
+        blocks,
+    )
+    save_features(assets_distribution, "assets_distribution")
+
+    tx_behavior = (
+        pd.concat([result[2] for result in results])
+        .sort_values("address")
+        .reset_index(drop=True)
+    )
+    tx_behavior = normalize_tx_behavior(
+        tx_behavior, settings["active_score_settings"], blocks
+    )
+    save_features(tx_behavior, "tx_behavior")
+
+    return assets_distribution, tx_behavior
+
+
+def _aggregation(col: str) -> str:
+    if col in ("first_timestamp", "first_seq"):
+        return "min"
+    if col == "last_timestamp" or col.endswith("_max"):
+        return "max"
+    return "sum"
+
+
+def merge_aggregates(frames: List[pd.DataFrame], keys: List[str]) -> pd.DataFrame:
+    """
+    Merges partial aggregates sharing the same keys: counts and sums add up,
+    first_* / *_max columns keep their min / max.
+    """
+    frame = pd.concat([f for f in frames if f is not None], ignore_index=True)
+    values = [col for col in frame.columns if col not in keys]
+    return (
+        frame.groupby(keys, dropna=False, sort=False)
+        .agg({col: _aggregation(col) for col in values})
+        .reset_index()
+    )
 
-    logging.info("Loading features engineering config...")
-    columns_to_features = get_config_value("features")
-    active_days_threshold = get_config_value("active_days_threshold")
-    assets_lookback_months = get_config_value("assets_lookback_months")
-    whale_score_settings = get_config_value("whale_score_settings")
-    active_score_settings = get_config_value("active_score_settings")
-    max_tx_burst_intervals = get_config_value("max_tx_burst_intervals")
+
+def summarize_transactions(
+    df: pd.DataFrame, first_seq: int = 0
+) -> Dict[str, pd.DataFrame]:
+    """
+    Partial aggregates of a batch of raw transactions: the chains, protocols, methods
+    and activity tables of AGGREGATE_TABLES. first_seq is the position of the batch's
+    first row in the raw CSV, kept per protocol to break most-used ties like the raw
+    rows mode.
+    """
+    df = parse_transaction_columns(df)
+    value = df["value"].astype(float)
+    is_inflow = df["to"] == df["address"]
+    is_outflow = df["from"] == df["address"]
+    received = value.where(is_inflow)
+    sent = value.where(is_outflow)
+    chains = pd.DataFrame(
+        {
+            "address": df["address"],
+            "chain_id": df["chain_id"],
+            "tx_count": 1,
+            "received_wei": received,
+            "sent_wei": sent,
+            "received_wei_max": received,
+            "sent_wei_max": sent,
+            "inflow_count": is_inflow.astype(int),
+            "outflow_count": is_outflow.astype(int),
+            "first_timestamp": df["timeStamp"],
+            "last_timestamp": df["timeStamp"],
+        }
+    )
+    for col in [col for col in df.columns if col.endswith("balance_usd")]:
+        chains[f"{col}_sum"] = df[col]
+        chains[f"{col}_count"] = df[col].notna().astype(int)
+
+    frames = {
+        "chains": chains,
+        "protocols": pd.DataFrame(
+            {
+                "address": df["address"],
+                "chain_id": df["chain_id"],
+                "to": df["to"],
+                "tx_count": 1,
+                "first_seq": range(first_seq, first_seq + len(df)),
+            },
+            index=df.index,
+        ),
+        "methods": pd.DataFrame(
+            {
+                "address": df["address"],
+                "chain_id": df["chain_id"],
+                "functionName": df["functionName"],
+                "tx_count": 1,
+            }
+        ),
+        "activity": pd.DataFrame(
+            {
+                "address": df["address"],
+                "chain_id": df["chain_id"],
+                "hour_start": df["timestamp_dt"].dt.floor("h"),
+                "tx_count": 1,
+            }
+        ),
+    }
+    return {
+        name: merge_aggregates([frame], AGGREGATE_TABLES[name])
+        for name, frame in frames.items()
+    }
+
+
+def summarize_event_logs(event_logs_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Hourly WBTC / WETH flows of a batch of raw event logs (token_flows table).
+    """
+    event_logs_df = event_logs_df.copy()
+    event_logs_df["hour_start"] = pd.to_datetime(
+        event_logs_df["timestamp"], unit="s"
+    ).dt.floor("h")
+    token_flows = [
+        calc_token_flows(
+            filter_token_df(event_logs_df, token, load_tokens()), "hour_start"
+        ).assign(token=token)
+        for token in INFLOW_TOKENS
+    ]
+    return {
+        "token_flows": merge_aggregates(token_flows, AGGREGATE_TABLES["token_flows"])
+    }
+
+
+def _since(hourly: pd.DataFrame, timestamp: pd.Timestamp) -> pd.DataFrame:
+    """
+    Rows of an hourly table for the hours overlapping [timestamp, now); windows
+    relative to now are evaluated on whole hours.
+    """
+    return hourly[hourly["hour_start"] >= timestamp.floor("h")]
+
+
+def derive_assets_distribution(
+    tables: Dict[str, pd.DataFrame],
+    lookback_months: int = 12,
+    use_balance_snapshot: bool = False,
+    blocks: frozenset = ALL_BLOCKS,
+) -> tuple:
+    """
+    Same as calc_assets_distribution, from the aggregate tables (see
+    summarize_transactions) instead of the raw rows. token_flows is only read by
+    inflow_months.
+    """
+    chains = tables["chains"].set_index(["address", "chain_id"]).sort_index()
+    if "balances" not in blocks:
+        features_chain = pd.DataFrame(index=chains.index)
+    elif use_balance_snapshot:
+        balances = join_balance_snapshot(
+            chains.index.to_frame(index=False), load_balance_snapshot()
+        ).set_index(["address", "chain_id"])
+        balance_usd_columns = [
+            col for col in balances.columns if col.endswith("balance_usd")
+        ]
+        features_chain = balances[balance_usd_columns].reindex(chains.index)
+    else:
+        balance_usd_columns = [
+            col[: -len("_sum")]
+            for col in chains.columns
+            if col.endswith("balance_usd_sum")
+        ]
+        features_chain = pd.DataFrame(
+            {
+                col: chains[f"{col}_sum"] / chains[f"{col}_count"]
+                for col in balance_usd_columns
+            },
+            index=chains.index,
+        )
+
+    eth_features = None
+    if "eth_flows" in blocks:
+        eth_features = chains[
+            ["received_wei", "sent_wei", "received_wei_max", "sent_wei_max"]
+        ].set_axis(
+            ["user_received_eth", "user_sent_eth", "max_received_eth", "max_sent_eth"],
+            axis=1,
+        )
+        eth_features = (eth_features / 1e18).round(2).fillna(0)
+
+    recent_tx_counts = None
+    if "recent_activity" in blocks:
+        recent = _since(tables["activity"], pd.Timestamp.now() - pd.Timedelta(days=30))
+        recent_tx_counts = recent.groupby(["address", "chain_id"])["tx_count"].sum()
+
+    monthly_flows = {}
+    if "inflow_months" in blocks:
+        token_flows = _since(
+            tables["token_flows"],
+            pd.Timestamp.now() - pd.DateOffset(months=lookback_months),
+        )
+        token_flows = token_flows.assign(
+            year_month=token_flows["hour_start"].dt.to_period("M")
+        )
+        monthly_flows = {
+            token: token_flows[token_flows["token"] == token]
+            .groupby(["address", "year_month"])[["in_amount", "out_amount"]]
+            .sum()
+            .reset_index()
+            for token in INFLOW_TOKENS
+        }
+
+    return assemble_assets_distribution(
+        features_chain, eth_features, recent_tx_counts, monthly_flows
+    )
+
+
+def derive_tx_behavior(
+    tables: Dict[str, pd.DataFrame],
+    active_days_threshold: int = 730,
+    max_tx_burst_intervals: dict = None,
+    blocks: frozenset = ALL_BLOCKS,
+) -> pd.DataFrame:
+    """
+    Same as calc_tx_behavior, from the aggregate tables (see
+    summarize_transactions) instead of the raw rows.
+    """
+    chains = tables["chains"].set_index(["address", "chain_id"]).sort_index()
+    # first-seen order, so most-used ties resolve like the raw rows mode
+    protocols = tables["protocols"].sort_values("first_seq").reset_index(drop=True)
+    if blocks & PROTOCOL_BLOCKS:
+        protocol_index = get_protocol_index()
+        keys = list(zip(protocols["chain_id"], protocols["to"]))
+        protocols["protocol_name"] = [
+            protocol_index.get(key, {}).get("name", "Unknown") for key in keys
+        ]
+        protocols["protocol_type"] = [
+            protocol_index.get(key, {}).get("type", "Unknown") for key in keys
+        ]
+
+    features_chain = pd.DataFrame(index=chains.index)
+    if "protocol_counts" in blocks:
+        group = protocols.groupby(["address", "chain_id"])
+        features_chain["n_protocol_names"] = group["protocol_name"].nunique()
+        features_chain["n_protocol_types"] = group["protocol_type"].nunique()
+    if "method_counts" in blocks:
+        features_chain["n_methods"] = 1
+    if "tx_counts" in blocks:
+        features_chain["tx_count"] = chains["tx_count"]
+
+    if "method_counts" in blocks:
+        methods = tables["methods"].copy()
+        _, method_weights = MethodClassifier().classify_column(methods["functionName"])
+        methods["method_weight"] = methods["tx_count"] * method_weights
+        method_shares = grouped_shares(
+            methods, ["address", "chain_id"], "functionName", "method_weight"
+        )
+        features_chain["method_diversity"] = (
+            calc_grouped_normalized_entropy(method_shares, ["address", "chain_id"])
+            .round(2)
+            .reindex(features_chain.index, fill_value=0)
+        )
+
+    if "flow_usd" in blocks:
+        eth_prices = get_eth_prices(chains.reset_index()).to_numpy()
+        flow_usd_values = summarize_flow_usd_values(
+            pd.DataFrame(
+                {
+                    "inflow_count": chains["inflow_count"],
+                    "outflow_count": chains["outflow_count"],
+                    "inflow_usd": chains["received_wei"] / 1e18 * eth_prices,
+                    "outflow_usd": chains["sent_wei"] / 1e18 * eth_prices,
+                }
+            )
+        )
+        for col in [
+            "avg_tx_usd_value_inflow",
+            "avg_tx_usd_value_outflow",
+            "total_tx_usd_value_inflow",
+            "total_tx_usd_value_outflow",
+        ]:
+            features_chain[col] = flow_usd_values[col]
+
+    activity = tables["activity"]
+    active_days, active_tx_count = None, None
+    if "activity" in blocks:
+        recent = _since(
+            activity, pd.Timestamp.now() - pd.Timedelta(days=active_days_threshold)
+        )
+        active_days = (
+            recent.assign(date=recent["hour_start"].dt.date)
+            .groupby("address")["date"]
+            .nunique()
+        )
+        active_tx_count = recent.groupby("address")["tx_count"].sum()
+
+    activity = add_time_features(
+        activity.rename(columns={"hour_start": "timestamp_dt"})
+    )
+    max_tx_bursts = {}
+    if "max_tx_bursts" in blocks:
+        max_tx_bursts = {
+            max_tx_burst_column(interval_name, interval_hours): calc_max_tx_burst(
+                activity, interval_hours=interval_hours, weight_col="tx_count"
+            )
+            for interval_name, interval_hours in max_tx_burst_intervals.items()
+        }
+    chain_counts = chains[["tx_count"]].reset_index()
+    protocol_focus_df = combine_protocol_type_focus(
+        (
+            calc_protocol_type_ratios(protocols, weight_col="tx_count")
+            if "protocol_type_ratios" in blocks
+            else None
+        ),
+        (
+            calc_protocol_focus(protocols, weight_col="tx_count")
+            if "protocol_focus" in blocks
+            else None
+        ),
+        (
+            calc_most_used_protocols(protocols, weight_col="tx_count")
+            if "most_used_protocols" in blocks
+            else None
+        ),
+        (
+            calc_most_active_time_features(activity, weight_col="tx_count")
+            if "most_active_times" in blocks
+            else None
+        ),
+        (
+            calc_most_active_chain(chain_counts, weight_col="tx_count")
+            if "most_active_chain" in blocks
+            else None
+        ),
+    )
+    chain_focus_df = None
+    if "chain_focus" in blocks:
+        chain_focus_df = calc_chain_focus_and_ratios(
+            chain_counts, weight_col="tx_count"
+        )
+
+    tx_timing = None
+    if "tx_timing" in blocks:
+        timestamps = chains.groupby("address")
+        tx_timing = calc_tx_timing(
+            pd.to_datetime(timestamps["first_timestamp"].min(), unit="s"),
+            pd.to_datetime(timestamps["last_timestamp"].max(), unit="s"),
+            timestamps["tx_count"].sum(),
+        )
+
+    return assemble_tx_behavior(
+        features_chain,
+        active_days,
+        active_tx_count,
+        active_days_threshold,
+        max_tx_bursts,
+        protocol_focus_df,
+        chain_focus_df,
+        tx_timing,
+    )
+
+
+def fold_aggregates(
+    tables: Dict[str, pd.DataFrame],
+    chunks,
+    summarize: Callable,
+    first_row: int = 0,
+    compact_every: int = 8,
+) -> int:
+    """
+    Folds the partial aggregates of each chunk of raw rows into tables, in place.
+    summarize(chunk, first_row) returns the partial tables of a chunk. Partials are
+    merged every compact_every chunks, so memory stays bounded by the tables plus a
+    few chunks whatever the size of the raw data. Returns the number of rows folded.
+    """
+    rows = first_row
+    partials = []
+
+    def compact():
+        if not partials:
+            return
+        for name in partials[0]:
+            frames = [tables.get(name)] + [partial[name] for partial in partials]
+            tables[name] = merge_aggregates(frames, AGGREGATE_TABLES[name])
+        partials.clear()
+
+    for chunk in chunks:
+        partials.append(summarize(chunk, rows))
+        rows += len(chunk)
+        if len(partials) >= compact_every:
+            compact()
+    compact()
+
+    return rows - first_row
+
+
+def preprocess_chunked(
+    txs_path: str,
+    event_logs_path: str,
+    settings: dict,
+    chunksize: int = 200_000,
+) -> tuple:
+    """
+    Out-of-core mode: streams the raw CSVs in chunks of chunksize rows into mergeable
+    per-address aggregates, then derives the features from them. The aggregates merge
+    in any order, so chunks need no sorting by address; peak memory is bounded by the
+    aggregates and a few chunks instead of the whole raw data.
+    Returns the same (assets_distribution, tx_behavior) as the single-process mode.
+    """
+    tables = {}
+    n_txs = fold_aggregates(
+        tables,
+        pd.read_csv(txs_path, chunksize=chunksize, low_memory=False),
+        summarize_transactions,
+    )
+    n_logs = 0
+    if "event_logs" in required_inputs(settings.get("blocks", ALL_BLOCKS)):
+        n_logs = fold_aggregates(
+            tables,
+            pd.read_csv(event_logs_path, chunksize=chunksize, low_memory=False),
+            lambda chunk, _: summarize_event_logs(chunk),
+        )
+    logging.info(f"Aggregated {n_txs} transactions and {n_logs} event logs")
+
+    return preprocess_aggregates(tables, settings)
+
+
+def preprocess_duckdb(txs_path: str, event_logs_path: str, settings: dict) -> tuple:
+    """
+    DuckDB backend: the aggregate tables are computed by the embedded SQL engine
+    straight from the raw files (parallel, spilling to disk), then the features are
+    derived from them like in the out-of-core mode.
+    Returns the same (assets_distribution, tx_behavior) as the single-process mode.
+    """
+    token_contracts = {
+        token: get_token_contracts(token, load_tokens()) for token in INFLOW_TOKENS
+    }
+    if "event_logs" not in required_inputs(settings.get("blocks", ALL_BLOCKS)):
+        event_logs_path = None
+    tables = aggregate_tables(txs_path, event_logs_path, token_contracts)
+    return preprocess_aggregates(tables, settings)
+
+
+def preprocess_aggregates(tables: Dict[str, pd.DataFrame], settings: dict) -> tuple:
+    """
+    Derives, normalizes and saves the features from the aggregate tables.
+    """
+    blocks = settings.get("blocks", ALL_BLOCKS)
+    assets_distribution, net_flow_log = derive_assets_distribution(
+        tables,
+        settings["assets_lookback_months"],
+        settings["use_balance_snapshot"],
+        blocks,
+    )
+    assets_distribution = normalize_assets_distribution(
+        assets_distribution,
+        net_flow_log,
+        settings["whale_score_settings"],
+        blocks,
+    )
+    save_features(assets_distribution, "assets_distribution")
+
+    tx_behavior = derive_tx_behavior(
+        tables,
+        settings["active_days_threshold"],
+        settings["max_tx_burst_intervals"],
+        blocks,
+    )
+    tx_behavior = normalize_tx_behavior(
+        tx_behavior, settings["active_score_settings"], blocks
+    )
+    save_features(tx_behavior, "tx_behavior")
+
+    return assets_distribution, tx_behavior
+
+
+def preprocess_features(
+    txs_path: str,
+    event_logs_path: str,
+    settings: dict,
+    backend: str = "pandas",
+    chunksize: int = None,
+    n_jobs: int = 1,
+) -> tuple:
+    """
+    Computes, normalizes and saves (assets_distribution, tx_behavior) with the mode
+    set by backend, chunksize and n_jobs, in that order of precedence.
+    """
+    blocks = settings.get("blocks", ALL_BLOCKS)
+    if backend == "duckdb":
+        logging.info("Preprocessing features with the DuckDB backend...")
+        return preprocess_duckdb(txs_path, event_logs_path, settings)
+    if chunksize:
+        logging.info(f"Preprocessing features out of core, {chunksize} rows a batch...")
+        return preprocess_chunked(txs_path, event_logs_path, settings, chunksize)
+    if n_jobs > 1:
+        logging.info(f"Preprocessing features in {n_jobs} address shards...")
+        return preprocess_sharded(txs_path, event_logs_path, settings, n_jobs)
+
+    logging.info("Loading raw transaction data...")
+    df = pd.read_csv(txs_path, low_memory=False)
+    event_logs_df = None
+    if "event_logs" in required_inputs(blocks):
+        event_logs_df = pd.read_csv(event_logs_path, low_memory=False)
 
     logging.info("Preprocessing transaction data...")
     df = parse_transaction_columns(df)
 
+    if settings["use_balance_snapshot"] and "balances" in blocks:
+        logging.info("Joining balance snapshot...")
+        df = join_balance_snapshot(df, load_balance_snapshot())
+
     logging.info("Preprocessing assets distribution...")
-    assets_distribution_df = preprocess_assets_distribution(
-        df, event_logs_df, assets_lookback_months, whale_score_settings
+    assets_distribution = preprocess_assets_distribution(
+        df,
+        event_logs_df,
+        settings["assets_lookback_months"],
+        settings["whale_score_settings"],
+        blocks,
     )
 
     logging.info("Preprocessing tx behavior...")
-    tx_behavior_df = preprocess_tx_behavior(
-        df, active_days_threshold, active_score_settings, max_tx_burst_intervals
-    )
+    tx_behavior = preprocess_tx_behavior(
+        df,
+        settings["active_days_threshold"],
+        settings["active_score_settings"],
+        settings["max_tx_burst_intervals"],
+        blocks,
+    )
+    return assets_distribution, tx_behavior
+
+
+def split_feature_blocks(
+    features: pd.DataFrame, blocks: set
+) -> Dict[str, pd.DataFrame]:
+    """
+    Columns of each of blocks in the per-address features, indexed by address.
+    """
+    features = features.set_index("address")
+    columns = {name: [] for name in blocks}
+    for col in features.columns:
+        name = find_block(col)
+        if name not in columns:
+            raise ValueError(f"{col} is not computed by the blocks {sorted(blocks)}")
+        columns[name].append(col)
+    return {name: features[cols] for name, cols in columns.items()}
+
+
+def preprocess_cached(compute: Callable, settings: dict, cache: FeatureCache) -> tuple:
+    """
+    Same as compute(settings), the mode computing (assets_distribution,
+    tx_behavior), but the feature blocks whose cache key is unchanged load from
+    cache and only the others are computed. Missing scores are recomputed from the
+    columns of their stage, so changing their weights recomputes nothing else.
+    Columns are in FEATURE_BLOCKS order.
+    """
+    blocks = settings.get("blocks", ALL_BLOCKS)
+    frames = cache.load(blocks)
+    missing = set(blocks) - set(frames) - SCORE_BLOCKS
+    if missing or not frames:
+        logging.info(f"Computing feature blocks: {', '.join(sorted(missing))}")
+        assets_distribution, tx_behavior = compute(dict(settings, blocks=missing))
+        computed = {
+            **split_feature_blocks(
+                assets_distribution, missing & ASSETS_DISTRIBUTION_BLOCKS
+            ),
+            **split_feature_blocks(tx_behavior, missing - ASSETS_DISTRIBUTION_BLOCKS),
+        }
+        cache.store(computed)
+        frames.update(computed)
+        index = assets_distribution.set_index("address").index
+    else:
+        index = next(iter(frames.values())).index
+
+    stages = []
+    for name, stage_blocks in [
+        ("assets_distribution", ASSETS_DISTRIBUTION_BLOCKS),
+        ("tx_behavior", ALL_BLOCKS - ASSETS_DISTRIBUTION_BLOCKS),
+    ]:
+        stage_blocks = [
+            block for block in FEATURE_BLOCKS if block in stage_blocks & set(blocks)
+        ]
+        columns = align_blocks(
+            index,
+            [pd.DataFrame(index=index)]
+            + [frames[block] for block in stage_blocks if block in frames],
+        )
+        for score in [block for block in stage_blocks if block not in frames]:
+            score_settings = settings[FEATURE_BLOCKS[score]["settings"]]
+            frames[score] = calc_weighted_score(columns, score_settings).to_frame(score)
+            cache.store({score: frames[score]})
+
+        features = align_blocks(
+            index,
+            [pd.DataFrame(index=index)] + [frames[block] for block in stage_blocks],
+        ).reset_index()
+        save_features(features, name)
+        stages.append(features)
+
+    return tuple(stages)
+
+
+if __name__ == "__main__":
+    logging.info("Loading features engineering config...")
+    columns_to_features = get_config_value("features")
+    active_days_threshold = get_config_value("active_days_threshold")
+    assets_lookback_months = get_config_value("assets_lookback_months")
+    whale_score_settings = get_config_value("whale_score_settings")
+    active_score_settings = get_config_value("active_score_settings")
+    max_tx_burst_intervals = get_config_value("max_tx_burst_intervals")
+    use_balance_snapshot = get_config_value("use_balance_snapshot")
+    check_balance_source(use_balance_snapshot)
+    n_jobs = get_config_value("n_jobs")
+    chunksize = get_config_value("chunksize")
+    backend = get_config_value("backend")
+    settings = {
+        "active_days_threshold": active_days_threshold,
+        "assets_lookback_months": assets_lookback_months,
+        "whale_score_settings": whale_score_settings,
+        "active_score_settings": active_score_settings,
+        "max_tx_burst_intervals": max_tx_burst_intervals,
+        "use_balance_snapshot": use_balance_snapshot,
+    }
+    # only the feature blocks the selected features depend on, see feature_registry
+    blocks = set(ALL_BLOCKS)
+    if get_config_value("lazy_features"):
+        blocks = resolve_blocks(columns_to_features, settings)
+        logging.info(f"Computing feature blocks: {', '.join(sorted(blocks))}")
+    settings["blocks"] = blocks
+
+    txs_path = "ml/data/raw/collected_txs_all.csv"
+    event_logs_path = "ml/data/raw/event_logs_all.csv"
+
+    compute = partial(
+        preprocess_features,
+        txs_path,
+        event_logs_path,
+        backend=backend,
+        chunksize=chunksize,
+        n_jobs=n_jobs,
+    )
+
+    if get_config_value("feature_cache"):
+        cache = FeatureCache(
+            {
+                "txs": txs_path,
+                "event_logs": event_logs_path,
+                "protocols": PROTOCOLS_PATH,
+                "tokens": TOKENS_PATH,
+                "method_weights": "ml/config/method_weights.py",
+                "balance_snapshot": (
+                    BALANCE_SNAPSHOT_PATH if use_balance_snapshot else None
+                ),
+            },
+            settings,
+            "aggregates" if backend == "duckdb" or chunksize else "rows",
+        )
+        assets_distribution_df, tx_behavior_df = preprocess_cached(
+            compute, settings, cache
+        )
+    else:
+        assets_distribution_df, tx_behavior_df = compute(settings)
 
     logging.info("Merging and saving features...")
     merge_and_save_features(assets_distribution_df, tx_behavior_df, columns_to_features)
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml.config.method_weights import METHOD_WEIGHTS
+from ml.src.utils.json_io import dumps, loads
+
+METHOD_CLASSES_CACHE_PATH = "ml/data/raw/cache/method_classes.json"
+
+
+class MethodClassifier:
+    """
+    Maps a functionName to its METHOD_WEIGHTS key and weight: the first key (in
+    METHOD_WEIGHTS order) contained in the lowercased name, or (None, 0).
+    Each distinct name is classified once, and the results are kept across runs
+    in a cache invalidated whenever METHOD_WEIGHTS changes. A read_only classifier
+    (e.g. in a worker process) never writes the cache; its new_classes are saved
+    by the driver instead.
+    """
+
+    def __init__(
+        self,
+        method_weights: Dict[str, float] = METHOD_WEIGHTS,
+        cache_path: str = METHOD_CLASSES_CACHE_PATH,
+        read_only: bool = False,
+    ):
+        self.method_weights = method_weights
+        self.cache_path = cache_path
+        self.read_only = read_only
+        self._priority = {key: i for i, key in enumerate(method_weights)}
+        # one scan finds every key at every position; at a given position the
+        # alternation returns the highest-priority key, as keys are in priority order
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(key) for key in method_weights) + "))"
+        )
+        self._fingerprint = hashlib.sha1(dumps(method_weights)).hexdigest()
+        self._classes = self._load_cache()
+        self.new_classes: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def _load_cache(self) -> Dict[str, Tuple[Optional[str], float]]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached = loads(f.read())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable method classes cache: {e}")
+            return {}
+        if cached.get("fingerprint") != self._fingerprint:
+            logging.info("METHOD_WEIGHTS changed, dropping the method classes cache.")
+            return {}
+        return {name: tuple(value) for name, value in cached["classes"].items()}
+
+    def update(self, classes: Dict[str, Tuple[Optional[str], float]]):
+        """
+        Adds classes found elsewhere, e.g. the new_classes of worker classifiers.
+        """
+        self._classes.update(classes)
+        self.new_classes.update(classes)
+
+    def save_cache(self):
+        """
+        Writes the cache to a temp file and swaps it in, so a concurrent reader never
+        sees a truncated file.
+        """
+        if not self.cache_path or self.read_only or not self.new_classes:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dumps({"fingerprint": self._fingerprint, "classes": self._classes}))
+        os.replace(tmp_path, self.cache_path)
+        self.new_classes = {}
+
+    def classify(self, function_name) -> Tuple[Optional[str], float]:
+        name = str(function_name)
+        if name in self._classes:
+            return self._classes[name]
+        matches = self._pattern.findall(name.lower())
+        if matches:
+            key = min(matches, key=self._priority.__getitem__)
+            method_class = (key, self.method_weights[key])
+        else:
+            method_class = (None, 0)
+        self._classes[name] = method_class
+        self.new_classes[name] = method_class
+        return method_class
+
+    def classify_column(self, function_names: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """
+        Returns the (method_name, method_weight) columns of a functionName column,
+        classifying its distinct values only and mapping them back by their codes.
+        """
+        codes, uniques = pd.factorize(function_names, use_na_sentinel=False)
+        classes = [self.classify(name) for name in uniques]
+        self.save_cache()
+        names = np.array([name for name, _ in classes], dtype=object)
+        weights = np.array([weight for _, weight in classes], dtype=float)
+        return (
+            pd.Series(names[codes], index=function_names.index),
+            pd.Series(weights[codes], index=function_names.index),
+        )
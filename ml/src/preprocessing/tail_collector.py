@@ -0,0 +1,265 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+import requests
+
+from ml.config.endpoints import ENDPOINTS
+from ml.src.preprocessing.block_index import get_block_by_timestamp
+from ml.src.preprocessing.collect_raw_data import (
+    append_to_csv,
+    get_config_value,
+    normalize_transactions,
+    project_transactions,
+    token_transfers_to_event_logs,
+)
+from ml.src.utils.json_io import decode_response, dumps, loads
+
+TAIL_DIR = "ml/data/raw/tail"
+WATCHLIST_PATH = f"{TAIL_DIR}/watchlist.json"
+
+
+def load_watchlist(
+    chain_ids: List[int], timestamp_threshold: int = 0, path: str = WATCHLIST_PATH
+) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    Loads the tracked addresses and their cursors: {chain_id: {address: {"txs_block", "logs_block"}}}.
+    The addresses in the raw store are tracked too, and every cursor is moved up to the
+    last block collected for its address in the transactions and event logs (new
+    addresses start at the timestamp_threshold block). So rows appended by a round
+    that stopped before saving its cursors are not collected twice.
+    """
+    watchlist = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            watchlist = loads(f.read())
+
+    for chain_id in chain_ids:
+        cursors = watchlist.setdefault(str(chain_id), {})
+        csv_path = f"ml/data/raw/collected_txs_{chain_id}.csv"
+        if not os.path.exists(csv_path):
+            continue
+        txs = pd.read_csv(csv_path, usecols=["address", "blockNumber"])
+        start_block = get_block_by_timestamp(chain_id, timestamp_threshold)
+        add_to_watchlist(watchlist, txs["address"].unique(), chain_id, start_block)
+        # resume after the last block already in the raw store
+        for key, last_blocks in [
+            ("txs_block", txs.groupby("address")["blockNumber"].max()),
+            ("logs_block", last_log_blocks(chain_id)),
+        ]:
+            for address, block in last_blocks.items():
+                cursor = cursors.get(address.lower())
+                if cursor is not None:
+                    cursor[key] = max(cursor[key], int(block))
+        logging.info(
+            f"Tail watchlist tracks {len(cursors)} addresses on chain {chain_id}."
+        )
+    save_watchlist(watchlist, path)
+
+    return watchlist
+
+
+def last_log_blocks(chain_id: int) -> pd.Series:
+    """
+    Last block of the Transfer logs collected per address in the raw store.
+    """
+    logs_path = f"ml/data/raw/event_logs_{chain_id}.csv"
+    try:
+        logs = pd.read_csv(logs_path, usecols=["address", "block_number"])
+    except (FileNotFoundError, pd.errors.EmptyDataError, ValueError):
+        return pd.Series(dtype="int64")
+    logs["block_number"] = pd.to_numeric(logs["block_number"], errors="coerce")
+    return logs.dropna().groupby("address")["block_number"].max()
+
+
+def save_watchlist(watchlist: Dict[str, Dict[str, Dict[str, int]]], path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(watchlist))
+    os.replace(tmp_path, path)
+
+
+def add_to_watchlist(
+    watchlist: Dict[str, Dict[str, Dict[str, int]]],
+    addresses: List[str],
+    chain_id: int,
+    start_block: int = 0,
+):
+    cursors = watchlist.setdefault(str(chain_id), {})
+    for address in addresses:
+        cursors.setdefault(
+            address.lower(), {"txs_block": start_block, "logs_block": start_block}
+        )
+
+
+def fetch_since(
+    action: str,
+    address: str,
+    chain_id: int,
+    from_block: int,
+    api_url: str = None,
+    max_pages: int = 5,
+    offset: int = 1000,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches txlist/tokentx rows of an address strictly after from_block, oldest first,
+    so the cursor can advance page by page without gaps. Unless the last page was
+    reached, the rows may stop halfway through their last block, so that block is
+    left to the next poll.
+    """
+    results = []
+    reached_end = False
+    for page in range(1, max_pages + 1):
+        params = {
+            "chainid": chain_id,
+            "module": "account",
+            "action": action,
+            "address": address,
+            "startblock": from_block + 1,
+            "endblock": 99999999,
+            "page": page,
+            "offset": offset,
+            "sort": "asc",
+            "apikey": ENDPOINTS[chain_id]["api_key"],
+        }
+        try:
+            resp = requests.get(
+                api_url or ENDPOINTS[chain_id]["api_url"], params=params, timeout=10
+            )
+            resp = decode_response(resp)
+            if resp.get("status") != "1" or not resp.get("result"):
+                reached_end = resp.get("message") == "No transactions found"
+                break
+            results.extend(resp["result"])
+            if len(resp["result"]) < offset:
+                reached_end = True
+                break
+        except requests.exceptions.RequestException as e:
+            logging.error(f"tail {action} failed for {address} page {page}: {e}")
+            break
+
+    if not reached_end and results:
+        last_block = max(int(row["blockNumber"]) for row in results)
+        # a single block past max_pages * offset rows is kept whole, or the cursor
+        # would never move
+        complete = [row for row in results if int(row["blockNumber"]) < last_block]
+        results = complete or results
+    return results
+
+
+def poll_address(
+    address: str,
+    chain_id: int,
+    cursor: Dict[str, int],
+    api_url: str = None,
+) -> Tuple[List[Dict[str, Any]], pd.DataFrame, Dict[str, int]]:
+    """
+    Fetches the new transactions and Transfer logs of an address since its cursor,
+    and returns them with the advanced cursor.
+    """
+    txs = fetch_since("txlist", address, chain_id, cursor["txs_block"], api_url)
+    transfers = fetch_since("tokentx", address, chain_id, cursor["logs_block"], api_url)
+    for tx in txs:
+        tx["address"] = address
+        tx["chain_id"] = chain_id
+
+    new_cursor = dict(cursor)
+    if txs:
+        new_cursor["txs_block"] = max(int(tx["blockNumber"]) for tx in txs)
+        txs = project_transactions(txs, get_config_value("tx_columns"))
+    if transfers:
+        new_cursor["logs_block"] = max(int(t["blockNumber"]) for t in transfers)
+    logs = token_transfers_to_event_logs(transfers, chain_id, address)
+
+    return txs, logs, new_cursor
+
+
+def poll_chain(
+    watchlist: Dict[str, Dict[str, Dict[str, int]]],
+    chain_id: int,
+    batch_size: int = 50,
+    max_workers: int = 3,
+    api_url: str = None,
+) -> Tuple[int, int]:
+    """
+    Runs one polling round on a chain, in micro-batches of batch_size addresses:
+    each batch's new rows are appended to the raw store and its cursors persisted.
+    """
+    cursors = watchlist.get(str(chain_id), {})
+    addresses = list(cursors)
+    new_txs_count = new_logs_count = 0
+    for i in range(0, len(addresses), batch_size):
+        batch = addresses[i : i + batch_size]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    lambda address: poll_address(
+                        address, chain_id, cursors[address], api_url
+                    ),
+                    batch,
+                )
+            )
+
+        batch_txs = [tx for txs, _, _ in results for tx in txs]
+        batch_logs = [logs for _, logs, _ in results if not logs.empty]
+        if batch_txs:
+            txs_df = normalize_transactions(pd.DataFrame(batch_txs))
+            append_to_csv(txs_df, f"ml/data/raw/collected_txs_{chain_id}.csv")
+            append_to_csv(txs_df, "ml/data/raw/collected_txs_all.csv")
+            new_txs_count += len(txs_df)
+        if batch_logs:
+            logs_df = pd.concat(batch_logs, ignore_index=True)
+            append_to_csv(logs_df, f"ml/data/raw/event_logs_{chain_id}.csv")
+            append_to_csv(logs_df, "ml/data/raw/event_logs_all.csv")
+            new_logs_count += len(logs_df)
+
+        for address, (_, _, new_cursor) in zip(batch, results):
+            cursors[address] = new_cursor
+        save_watchlist(watchlist, WATCHLIST_PATH)
+
+    return new_txs_count, new_logs_count
+
+
+def run_tail(
+    chain_ids: List[int],
+    poll_seconds: int = 60,
+    batch_size: int = 50,
+    max_workers: int = 3,
+    api_url: str = None,
+    max_rounds: int = None,
+):
+    """
+    Long-running tail mode: polls every tracked address for new transactions and
+    Transfer logs since its cursor and appends them to the raw store.
+    """
+    timestamp_threshold = get_config_value("timestamp_threshold")
+    watchlist = load_watchlist(chain_ids, timestamp_threshold)
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+        started = time.time()
+        for chain_id in chain_ids:
+            new_txs, new_logs = poll_chain(
+                watchlist, chain_id, batch_size, max_workers, api_url
+            )
+            logging.info(
+                f"Tail round {rounds} on chain {chain_id}: "
+                f"{new_txs} new transactions, {new_logs} new event logs."
+            )
+        rounds += 1
+        if max_rounds is not None and rounds >= max_rounds:
+            break
+        time.sleep(max(0, poll_seconds - (time.time() - started)))
+
+
+if __name__ == "__main__":
+    run_tail(
+        chain_ids=get_config_value("chain_ids"),
+        poll_seconds=get_config_value("tail_poll_seconds"),
+        batch_size=get_config_value("tail_batch_size"),
+        max_workers=get_config_value("max_workers"),
+        api_url=get_config_value("tail_api_url"),
+    )
@@ -0,0 +1,76 @@
+import os
+from typing import List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+
+def _arrow_type(series: pd.Series) -> pa.DataType:
+    kind = series.dtype.kind
+    if kind == "b":
+        return pa.bool_()
+    if kind in "iu":
+        return pa.int64()
+    if kind == "f":
+        return pa.float64()
+    if kind == "M":
+        return pa.timestamp("ns")
+    return pa.string()
+
+
+def write_arrow(df: pd.DataFrame, path: str):
+    """
+    Writes df as an uncompressed Arrow IPC file, which readers memory-map instead of
+    parsing. A named index (e.g. address) is written as a column, a default one is
+    dropped. Column types follow the dtype kind only (bool, int64, float64,
+    timestamp[ns], string), so the schema of an artifact is stable across runs.
+    """
+    if df.index.name is not None:
+        df = df.reset_index()
+    arrays = []
+    for col in df.columns:
+        arrow_type = _arrow_type(df[col])
+        values = df[col]
+        if arrow_type == pa.string():
+            values = values.where(values.isna(), values.astype(str))
+        arrays.append(pa.array(values, type=arrow_type, from_pandas=True))
+    table = pa.Table.from_arrays(arrays, names=[str(col) for col in df.columns])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    feather.write_feather(table, path, compression="uncompressed")
+
+
+def read_arrow(path: str, columns: List[str] = None) -> pa.Table:
+    """
+    Memory-maps an Arrow IPC file: the columns reference the mapped pages, nothing
+    is parsed or copied.
+    """
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def fill_nulls(table: pa.Table, value) -> pa.Table:
+    """
+    Fills the nulls of the numeric columns that have any; the other columns keep
+    referencing the original buffers.
+    """
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        is_numeric = pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        if is_numeric and column.null_count:
+            table = table.set_column(i, field, pc.fill_null(column, value))
+    return table
+
+
+def read_arrow_frame(
+    path: str, columns: List[str] = None, fill_null=None
+) -> pd.DataFrame:
+    """
+    DataFrame view of a memory-mapped Arrow IPC file. Numeric columns without nulls
+    are zero-copy, read-only arrays over the file; fill_null fills the nulls of the
+    numeric columns first (like fillna).
+    """
+    table = read_arrow(path, columns)
+    if fill_null is not None:
+        table = fill_nulls(table, fill_null)
+    return table.to_pandas(split_blocks=True)
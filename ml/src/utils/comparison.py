@@ -1,8 +1,8 @@
 import json
 
 import pandas as pd
-from pyarrow import feather
 
+from ml.src.utils.arrow_io import read_arrow_frame
 from ml.src.utils.logger import get_logger_with_timestamp
 
 BASE_PATH = "ml/data/models/kmeans"
@@ -10,8 +10,8 @@ BASE_PATH = "ml/data/models/kmeans"
 
 def load_predictions(features_path, predictions_path):
     """Load the predictions and features dataframes and merge them"""
-    users = feather.read_table(features_path).to_pandas()
-    result = feather.read_table(predictions_path).to_pandas()
+    users = read_arrow_frame(features_path)
+    result = read_arrow_frame(predictions_path)
     df = pd.merge(users, result, on="address", how="left")
 
     return df
@@ -0,0 +1,59 @@
+import gzip
+import json
+from typing import Any, Iterable, Iterator
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib parser
+    orjson = None
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def decode_response(resp) -> Any:
+    """
+    Decodes a requests response body, replacing resp.json() with the fast parser.
+    A malformed body raises requests' JSONDecodeError, as resp.json() does, so it is
+    handled as a RequestException.
+    """
+    try:
+        return loads(resp.content)
+    except ValueError as e:  # orjson.JSONDecodeError / json.JSONDecodeError
+        raise requests.exceptions.JSONDecodeError(
+            getattr(e, "msg", str(e)), getattr(e, "doc", ""), getattr(e, "pos", 0)
+        ) from e
+
+
+def write_jsonl_gz(path: str, records: Iterable[Any]) -> int:
+    """
+    Streams records to a gzip-compressed line-delimited JSON file.
+    Returns the number of records written.
+    """
+    count = 0
+    with gzip.open(path, "wb", compresslevel=1) as f:
+        for record in records:
+            f.write(dumps(record) + b"\n")
+            count += 1
+    return count
+
+
+def iter_jsonl_gz(path: str) -> Iterator[Any]:
+    """
+    Lazily yields the records of a gzip-compressed line-delimited JSON file.
+    """
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
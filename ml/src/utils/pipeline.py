@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Tuple
+
+_DONE = object()
+
+
+class PipelineError(Exception):
+    """
+    Raised by run_pipeline once every item went through, when a stage failed on some
+    of them. failures lists the (stage name, exception) of each failed item.
+    """
+
+    def __init__(self, failures: List[Tuple[str, Exception]]):
+        self.failures = failures
+        stages = sorted({name for name, _ in failures})
+        super().__init__(
+            f"{len(failures)} item(s) failed in pipeline stage(s) {', '.join(stages)}: "
+            f"{failures[0][1]}"
+        )
+
+
+class Stage:
+    """
+    One step of a staged pipeline: fn is applied to every item by `workers` threads,
+    or by a pool of `workers` processes when processes is True (fn must be picklable).
+    Returning None from fn drops the item.
+    """
+
+    def __init__(
+        self, name: str, fn: Callable, workers: int = 1, processes: bool = False
+    ):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.processes = processes
+
+
+def run_pipeline(
+    items: Iterable[Any], stages: List[Stage], queue_size: int = 64
+) -> List[Any]:
+    """
+    Runs items through the stages, connected by bounded queues so a slow stage
+    blocks its producers instead of buffering everything in memory.
+    All stages run at the same time; returns the outputs of the last stage.
+    An item whose stage raises goes no further, and the failures are raised as a
+    PipelineError after the queues drain, so no item is lost silently.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    remaining = [stage.workers for stage in stages]
+    lock = threading.Lock()
+    results = []
+    failures = []
+
+    def feed():
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+
+    def work(i: int, stage: Stage, pool: ProcessPoolExecutor = None):
+        while True:
+            item = queues[i].get()
+            if item is _DONE:
+                # hand the marker to the sibling workers, the last one closes the stage
+                queues[i].put(_DONE)
+                with lock:
+                    remaining[i] -= 1
+                    is_last = remaining[i] == 0
+                if is_last and i + 1 < len(stages):
+                    queues[i + 1].put(_DONE)
+                return
+            try:
+                if pool is not None:
+                    out = pool.submit(stage.fn, item).result()
+                else:
+                    out = stage.fn(item)
+            except Exception as e:
+                logging.error(f"Pipeline stage '{stage.name}' failed on an item: {e}")
+                with lock:
+                    failures.append((stage.name, e))
+                continue
+            if out is None:
+                continue
+            if i + 1 < len(stages):
+                queues[i + 1].put(out)
+            else:
+                with lock:
+                    results.append(out)
+
+    pools = [
+        ProcessPoolExecutor(max_workers=stage.workers) if stage.processes else None
+        for stage in stages
+    ]
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for i, stage in enumerate(stages):
+        threads.extend(
+            threading.Thread(target=work, args=(i, stage, pools[i]), daemon=True)
+            for _ in range(stage.workers)
+        )
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown()
+
+    if failures:
+        raise PipelineError(failures) from failures[0][1]
+    return results
@@ -0,0 +1,64 @@
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Merges identical in-flight calls: the first caller of a key runs the function,
+    concurrent callers of the same key wait for it and share its result (or exception).
+    Nothing is kept once the call returns, so this only saves duplicate work within a run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.merged = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.merged += 1
+                is_leader = False
+            else:
+                call = Future()
+                self._calls[key] = call
+                is_leader = True
+
+        if not is_leader:
+            return call.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return result
+
+
+_group = SingleFlight()
+
+
+def single_flight(fn: Callable) -> Callable:
+    """
+    Decorator coalescing concurrent calls of fn with the same (hashable) arguments.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        return _group.do(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+def merged_calls_count() -> int:
+    return _group.merged
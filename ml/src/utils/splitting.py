@@ -1,9 +1,10 @@
 from typing import Dict, Tuple
 
 import pandas as pd
-import pyarrow.feather as feather
 from sklearn.model_selection import train_test_split
 
+from ml.src.utils.arrow_io import read_arrow_frame
+
 # from joblib import dump, load
 
 
@@ -49,9 +50,8 @@ def splitting():
     # except FileNotFoundError:
     #     print("No cached dataset found, creating a new one...")
 
-    df = pd.read_csv("ml/data/processed/user_features.csv")
-
-    df.fillna(0, inplace=True)
+    # memory-mapped, nulls filled with 0 in Arrow rather than by a fillna copy
+    df = read_arrow_frame("ml/data/features/user_features.arrow", fill_null=0)
 
     dataset = split_dataframe(
         df=df, train_size=0.7, validation_size=0.15, random_state=42
@@ -1,12 +1,13 @@
-import pprint
+import copy
 
 import requests
 
-from ml.config.tokens import TOKENS
+from ml.config.catalogs import TOKENS_PATH, load_tokens, save_tokens
 
 
 def update_token_prices():
-    for chain_id, chain_tokens in TOKENS.items():
+    tokens = copy.deepcopy(load_tokens())
+    for chain_id, chain_tokens in tokens.items():
         for symbol, info in chain_tokens.items():
             addr = (
                 info["address"]
@@ -17,18 +18,9 @@ def update_token_prices():
             params = {"addresses": addr}
             resp = requests.get(url, params=params).json()
             print(f"chain_id: {chain_id} symbol: {symbol} price: {resp[addr]}")
-            TOKENS[chain_id][symbol]["price"] = float(resp[addr])
-    save_tokens_to_py(TOKENS)
-
-
-def save_tokens_to_py(tokens, path="ml/config/tokens.py"):
-    with open(path, "w") as f:
-        f.write("TOKENS = ")
-        pprint.pprint(tokens, stream=f, indent=4, width=40, sort_dicts=False)
-        f.write(
-            '\n\nDEFAULT_TOKENS = [\n    "USDC",\n    "USDT",\n    "WETH",\n    "WBTC",\n    "DAI",\n    "ETH",\n]\n'
-        )
-    print(f"Successfully updated token prices to {path}")
+            tokens[chain_id][symbol]["price"] = float(resp[addr])
+    save_tokens(tokens)
+    print(f"Successfully updated token prices to {TOKENS_PATH}")
 
 
 if __name__ == "__main__":
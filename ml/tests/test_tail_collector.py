@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import pandas as pd
+import pytest
+
+from ml.config.catalogs import load_tokens
+from ml.src.preprocessing.collect_raw_data import (
+    TX_COLUMNS,
+    normalize_transactions,
+    token_transfers_to_event_logs,
+)
+from ml.src.preprocessing.tail_collector import (
+    WATCHLIST_PATH,
+    fetch_since,
+    load_watchlist,
+    poll_chain,
+)
+
+CHAIN_ID = 1
+ADDRESS = "0x00000000000000000000000000000000000000aa"
+OTHER = "0x00000000000000000000000000000000000000bb"
+WETH = load_tokens()[CHAIN_ID]["WETH"]["address"]
+
+
+def make_tx(block: int, n: int = 0) -> dict:
+    return {
+        "hash": f"0xtx{block}_{n}",
+        "blockNumber": str(block),
+        "timeStamp": str(1_700_000_000 + block),
+        "nonce": str(block),
+        "transactionIndex": str(n),
+        "from": ADDRESS,
+        "to": OTHER,
+        "value": "0",
+        "gas": "21000",
+        "gasPrice": "1",
+        "gasUsed": "21000",
+        "isError": "0",
+        "txreceipt_status": "1",
+        "contractAddress": "",
+        "methodId": "0x",
+        "functionName": "",
+    }
+
+
+def make_transfer(block: int, n: int = 0) -> dict:
+    return {
+        "hash": f"0xlog{block}_{n}",
+        "blockNumber": str(block),
+        "timeStamp": str(1_700_000_000 + block),
+        "from": OTHER,
+        "to": ADDRESS,
+        "value": str(10**18),
+        "contractAddress": WETH,
+        "tokenDecimal": "18",
+    }
+
+
+class FakeEtherscanHandler(BaseHTTPRequestHandler):
+    """
+    Serves account txlist / tokentx from server.rows, paginated like Etherscan.
+    """
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlparse(self.path).query))
+        rows = sorted(
+            (
+                row
+                for row in self.server.rows.get(
+                    (params["action"], params["address"].lower()), []
+                )
+                if int(row["blockNumber"]) >= int(params["startblock"])
+            ),
+            key=lambda row: int(row["blockNumber"]),
+        )
+        page, offset = int(params["page"]), int(params["offset"])
+        rows = rows[(page - 1) * offset : page * offset]
+        if rows:
+            body = {"status": "1", "message": "OK", "result": rows}
+        else:
+            body = {"status": "0", "message": "No transactions found", "result": []}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def etherscan():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEtherscanHandler)
+    server.rows = {}
+    server.url = f"http://127.0.0.1:{server.server_port}/api"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def raw_store(tmp_path, monkeypatch):
+    """
+    A raw store with one collected transaction (block 10) and one Transfer log
+    (block 12) of ADDRESS.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("ml/data/raw")
+    tx = {"address": ADDRESS, "chain_id": CHAIN_ID, **make_tx(10)}
+    txs = normalize_transactions(pd.DataFrame([{col: tx[col] for col in TX_COLUMNS}]))
+    txs.to_csv(f"ml/data/raw/collected_txs_{CHAIN_ID}.csv", index=False)
+    logs = token_transfers_to_event_logs([make_transfer(12)], CHAIN_ID, ADDRESS)
+    logs.to_csv(f"ml/data/raw/event_logs_{CHAIN_ID}.csv", index=False)
+    return tmp_path
+
+
+def read_raw(name: str) -> pd.DataFrame:
+    return pd.read_csv(f"ml/data/raw/{name}_{CHAIN_ID}.csv")
+
+
+def test_load_watchlist_seeds_both_cursors(raw_store):
+    watchlist = load_watchlist([CHAIN_ID])
+
+    assert watchlist[str(CHAIN_ID)] == {ADDRESS: {"txs_block": 10, "logs_block": 12}}
+    assert os.path.exists(WATCHLIST_PATH)
+
+
+def test_fetch_since_leaves_truncated_block_to_next_poll(etherscan):
+    etherscan.rows[("txlist", ADDRESS)] = [
+        make_tx(block, n) for n, block in enumerate([1, 2, 3, 3, 3, 4])
+    ]
+
+    # the page limit cuts block 3 after two of its three txs
+    first = fetch_since(
+        "txlist", ADDRESS, CHAIN_ID, 0, etherscan.url, max_pages=2, offset=2
+    )
+    assert [int(tx["blockNumber"]) for tx in first] == [1, 2]
+
+    rest = fetch_since("txlist", ADDRESS, CHAIN_ID, 2, etherscan.url, offset=2)
+    assert [int(tx["blockNumber"]) for tx in rest] == [3, 3, 3, 4]
+
+
+def test_fetch_since_keeps_a_block_larger_than_the_page_limit(etherscan):
+    etherscan.rows[("txlist", ADDRESS)] = [make_tx(5, n) for n in range(5)]
+
+    txs = fetch_since(
+        "txlist", ADDRESS, CHAIN_ID, 0, etherscan.url, max_pages=2, offset=2
+    )
+    assert len(txs) == 4
+
+
+def test_poll_advances_cursors_without_duplicates_across_restarts(raw_store, etherscan):
+    # the chain history includes the tx (block 10) and log (block 12) already stored
+    etherscan.rows[("txlist", ADDRESS)] = [
+        make_tx(block, n) for n, block in enumerate([10, 11, 13, 13])
+    ]
+    etherscan.rows[("tokentx", ADDRESS)] = [
+        make_transfer(block, n) for n, block in enumerate([12, 14, 14])
+    ]
+
+    watchlist = load_watchlist([CHAIN_ID])
+    assert poll_chain(watchlist, CHAIN_ID, api_url=etherscan.url) == (3, 2)
+    assert watchlist[str(CHAIN_ID)][ADDRESS] == {"txs_block": 13, "logs_block": 14}
+
+    # restart from the saved watchlist, with one new tx on the chain
+    etherscan.rows[("txlist", ADDRESS)].append(make_tx(15))
+    watchlist = load_watchlist([CHAIN_ID])
+    assert poll_chain(watchlist, CHAIN_ID, api_url=etherscan.url) == (1, 0)
+
+    # restart with the watchlist lost: reseeded from the raw store
+    os.remove(WATCHLIST_PATH)
+    watchlist = load_watchlist([CHAIN_ID])
+    assert watchlist[str(CHAIN_ID)][ADDRESS] == {"txs_block": 15, "logs_block": 14}
+    assert poll_chain(watchlist, CHAIN_ID, api_url=etherscan.url) == (0, 0)
+
+    txs = read_raw("collected_txs")
+    logs = read_raw("event_logs")
+    assert len(txs) == 5 and txs["hash"].is_unique
+    assert len(logs) == 3 and logs["tx_hash"].is_unique
+
+
+def test_rows_appended_before_a_crash_are_not_collected_again(raw_store, etherscan):
+    etherscan.rows[("txlist", ADDRESS)] = [make_tx(10), make_tx(11), make_tx(12)]
+    etherscan.rows[("tokentx", ADDRESS)] = [make_transfer(12), make_transfer(13)]
+    watchlist = load_watchlist([CHAIN_ID])
+    with open(WATCHLIST_PATH, "rb") as f:
+        saved_before_round = f.read()
+    assert poll_chain(watchlist, CHAIN_ID, api_url=etherscan.url) == (2, 1)
+
+    # the round appended its rows but stopped before saving the cursors
+    with open(WATCHLIST_PATH, "wb") as f:
+        f.write(saved_before_round)
+    watchlist = load_watchlist([CHAIN_ID])
+    assert watchlist[str(CHAIN_ID)][ADDRESS] == {"txs_block": 12, "logs_block": 13}
+    assert poll_chain(watchlist, CHAIN_ID, api_url=etherscan.url) == (0, 0)
+
+    assert read_raw("collected_txs")["hash"].is_unique
+    assert read_raw("event_logs")["tx_hash"].is_unique